@@ -0,0 +1,63 @@
+"""Compare overhead of CSRF validation as app dependency and as ASGI middleware.
+
+Run from the `/backend` directory with `uv run -m benchmarks.csrf`.
+"""
+
+import asyncio
+from argparse import ArgumentParser
+
+from fastapi import Depends, FastAPI, Request, Response
+
+from benchmarks.util import time_requests
+from src.csrf import SAFE_METHODS, CsrfMiddleware, csrf_protect
+
+
+async def verify_csrf(request: Request) -> bool:
+    """CSRF validation as it was done by app dependency."""
+    if request.method in SAFE_METHODS:
+        return True
+    await csrf_protect.validate_csrf(request)
+    return True
+
+
+def create_app(middleware: bool) -> FastAPI:
+    if middleware:
+        app = FastAPI()
+        app.add_middleware(CsrfMiddleware)
+    else:
+        app = FastAPI(dependencies=[Depends(verify_csrf)])
+
+    @app.get("/")
+    async def get():
+        return None
+
+    @app.post("/")
+    async def post():
+        return None
+
+    return app
+
+
+def csrf_headers() -> list[tuple[bytes, bytes]]:
+    token, signed_token = csrf_protect.generate_csrf_tokens()
+    response = Response()
+    csrf_protect.set_csrf_cookie(signed_token, response)
+    cookie = response.headers["set-cookie"].split(";")[0]
+    return [(b"cookie", cookie.encode()), (b"x-csrf-token", token.encode())]
+
+
+async def main(requests: int):
+    for method in ("GET", "POST"):
+        for name, middleware in (("dependency", False), ("middleware", True)):
+            app = create_app(middleware)
+            headers = csrf_headers()
+            await time_requests(app, method, "/", 100, headers)
+            elapsed = await time_requests(app, method, "/", requests, headers)
+            print(f"{method:4} {name:10} {elapsed:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--requests", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,40 @@
+"""Compare building pages of ideas from documents through odmantic models and
+directly.
+
+Run from the `/backend` directory with `uv run -m benchmarks.read_path`.
+"""
+
+import time
+from argparse import ArgumentParser
+
+from benchmarks.serialization import PAGE_SIZES, create_ideas
+from src.api.ideas import idea_list_adapter, to_idea_public_list
+from src.models import Idea
+
+
+def through_models(documents):
+    ideas = [Idea.model_validate_doc(document) for document in documents]
+    return idea_list_adapter.validate_python(ideas, from_attributes=True)
+
+
+def time_calls(func, documents, calls: int) -> float:
+    """Average time of call of `func`, in microseconds."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        func(documents)
+    return (time.perf_counter() - start) / calls * 1_000_000
+
+
+def main(calls: int):
+    for size in PAGE_SIZES:
+        documents = [idea.model_dump_doc() for idea in create_ideas(size)]
+        for func in (through_models, to_idea_public_list):
+            elapsed = time_calls(func, documents, calls)
+            print(f"{size:3} ideas {func.__name__:20} {elapsed:9.1f} us/page")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--calls", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.calls)
@@ -0,0 +1,65 @@
+"""Compare serializing pages of ideas through `response_model` and ModelResponse.
+
+Run from the `/backend` directory with `uv run -m benchmarks.serialization`.
+"""
+
+import asyncio
+from argparse import ArgumentParser
+
+from fastapi import FastAPI
+from odmantic import ObjectId
+
+from benchmarks.util import time_requests
+from src.api.ideas import to_idea_public_list
+from src.api.responses import ModelResponse
+from src.models import Idea, IdeasPublic
+
+PAGE_SIZES = (20, 100, 500)
+
+
+def create_app(ideas: list[Idea]) -> FastAPI:
+    app = FastAPI()
+    documents = [idea.model_dump_doc() for idea in ideas]
+
+    def page() -> IdeasPublic:
+        data = to_idea_public_list(documents)
+        return IdeasPublic(data=data, count=len(data))
+
+    @app.get("/response-model", response_model=IdeasPublic)
+    async def response_model():
+        return page()
+
+    @app.get("/model-response", response_model=IdeasPublic)
+    async def model_response():
+        return ModelResponse(page())
+
+    return app
+
+
+def create_ideas(count: int) -> list[Idea]:
+    return [
+        Idea(
+            name=f"Idea {i}",
+            description="Description of the idea " * 10,
+            upvote_count=i,
+            downvote_count=i // 2,
+            creator_id=ObjectId(),
+        )
+        for i in range(count)
+    ]
+
+
+async def main(requests: int):
+    for size in PAGE_SIZES:
+        app = create_app(create_ideas(size))
+        for path in ("/response-model", "/model-response"):
+            await time_requests(app, "GET", path, 10)
+            elapsed = await time_requests(app, "GET", path, requests)
+            print(f"{size:3} ideas {path:16} {elapsed:9.1f} us/request")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--requests", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
@@ -0,0 +1,41 @@
+import time
+from collections.abc import Sequence
+
+from starlette.types import ASGIApp
+
+
+async def time_requests(
+    app: ASGIApp,
+    method: str,
+    path: str,
+    requests: int,
+    headers: Sequence[tuple[bytes, bytes]] = (),
+) -> float:
+    """Average time of request to `app`, in microseconds.
+
+    Requests are sent to the ASGI app directly, without HTTP client and server.
+    """
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "scheme": "http",
+        "query_string": b"",
+        "headers": list(headers),
+        "server": ("test", 80),
+        "client": ("client", 1234),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1_000_000
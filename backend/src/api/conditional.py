@@ -0,0 +1,83 @@
+import hashlib
+from collections.abc import Callable
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any
+
+from fastapi import Request, Response
+
+# Cache-Control of routes. Clients may store responses, but must revalidate
+# them with the ETag before reuse, as ideas change with every vote. Responses
+# depending on the logged in user are only stored by the client.
+PUBLIC_CACHE_CONTROL = "public, no-cache"
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any, weak: bool = False) -> str:
+    """ETag of a representation identified by `parts`.
+
+    `parts` must change with every change of the representation, ie. id,
+    `modified_at` and counters of the document, and values computed per viewer.
+    """
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of `etag` with tags in `If-None-Match` header."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == opaque_tag for tag in if_none_match.split(",")
+    )
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.astimezone(UTC), usegmt=True)
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: datetime | None = None
+) -> bool:
+    """Whether client's copy is current, by `If-None-Match` or, only without it,
+    by `If-Modified-Since`."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if last_modified is None or if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=UTC)
+    # HTTP dates have only whole seconds.
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional_response(
+    request: Request,
+    build: Callable[[], Response],
+    etag: str,
+    cache_control: str,
+    last_modified: datetime | None = None,
+    vary: str | None = None,
+) -> Response:
+    """Respond 304 if client's copy is current, otherwise respond with `build()`.
+
+    `build` is called only for modified resources, so responses of unchanged
+    ones are never serialized.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if vary is not None:
+        headers["Vary"] = vary
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response = build()
+    response.headers.update(headers)
+    return response
@@ -1,13 +1,44 @@
 from typing import Annotated
 
-from fastapi import Depends
+from fastapi import Depends, HTTPException, Query, Request
+from odmantic import ObjectId
 from pydantic import BaseModel
 
+from src.api.fields import Fields, parse_fields
 from src.api.util import idea_or_404, user_or_404
-from src.auth import get_current_active_admin, get_current_active_user
+from src.auth import (
+    get_current_active_admin,
+    get_current_active_principal,
+    get_current_active_user,
+    get_optional_current_user,
+    login_ip_limiter,
+    refresh_limiter,
+    register_limiter,
+)
+from src.config import get_settings
+from src.models import IdeaPublic, UserAdmin
+from src.rate_limit import RateLimiter
+
+settings = get_settings()
 
 AdminUser = Depends(get_current_active_admin)
 LoggedInUser = Depends(get_current_active_user)
+LoggedInPrincipal = Depends(get_current_active_principal)
+OptionalUser = Depends(get_optional_current_user)
+
+
+def client_rate_limit(limiter: RateLimiter):
+    """Dependency limiting requests of each client address by `limiter`."""
+
+    async def limit(request: Request):
+        await limiter.hit(request.client.host if request.client else "unknown")
+
+    return Depends(limit)
+
+
+LoginRateLimit = client_rate_limit(login_ip_limiter)
+RegisterRateLimit = client_rate_limit(register_limiter)
+RefreshRateLimit = client_rate_limit(refresh_limiter)
 
 IdeaFromPathId = Depends(idea_or_404)
 UserFromPathId = Depends(user_or_404)
@@ -16,10 +47,57 @@ UserFromPathId = Depends(user_or_404)
 class PaginationData(BaseModel):
     limit: int
     skip: int
+    cursor: str | None = None
+    include_count: bool = True
+
 
+def pagination_params(
+    skip: Annotated[int, Query(ge=0, le=settings.max_page_skip)] = 0,
+    limit: Annotated[int, Query(ge=1, le=settings.max_page_limit)] = 20,
+    cursor: str | None = None,
+    include_count: bool = True,
+) -> PaginationData:
+    """Pagination by `cursor` returned with the previous page, or by `skip`.
 
-def pagination_params(skip: int = 0, limit: int = 20) -> PaginationData:
-    return PaginationData(limit=limit, skip=skip)
+    When `cursor` is given, `skip` is ignored. Total count is not computed
+    with `include_count=false`. `limit` and `skip` over the maxima in settings
+    are rejected with 422, deep pages should be read by `cursor`.
+    """
+    return PaginationData(
+        limit=limit, skip=skip, cursor=cursor, include_count=include_count
+    )
 
 
 PaginationParams = Annotated[PaginationData, Depends(pagination_params)]
+
+
+def idea_fields_params(fields: str | None = None) -> Fields | None:
+    """Comma separated fields of ideas to return, all fields by default."""
+    return parse_fields(fields, IdeaPublic)
+
+
+def user_fields_params(fields: str | None = None) -> Fields | None:
+    """Comma separated fields of users to return, all fields by default."""
+    return parse_fields(fields, UserAdmin)
+
+
+def ids_params(ids: str) -> list[ObjectId]:
+    """Comma separated ids, up to `max_batch_ids` of them, without duplicates."""
+    values = list(dict.fromkeys(id.strip() for id in ids.split(",") if id.strip()))
+    invalid = [value for value in values if not ObjectId.is_valid(value)]
+    if not values or invalid:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Invalid ids: {', '.join(invalid) or ids!r}",
+        )
+    if len(values) > settings.max_batch_ids:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Too many ids, at most {settings.max_batch_ids} are allowed",
+        )
+    return [ObjectId(value) for value in values]
+
+
+IdeaFieldsParams = Annotated[Fields | None, Depends(idea_fields_params)]
+UserFieldsParams = Annotated[Fields | None, Depends(user_fields_params)]
+IdsParams = Annotated[list[ObjectId], Depends(ids_params)]
@@ -0,0 +1,73 @@
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import Any
+
+from fastapi import HTTPException
+from pydantic import BaseModel, create_model
+
+from src.models import IdeaPublic, UserAdmin
+
+Fields = frozenset[str]
+
+# Fields not stored in the documents, computed for each response.
+COMPUTED_FIELDS: dict[type[BaseModel], Fields] = {
+    IdeaPublic: frozenset({"my_vote"}),
+    UserAdmin: frozenset(),
+}
+
+
+def parse_fields(fields: str | None, model: type[BaseModel]) -> Fields | None:
+    """Parse comma separated `fields` parameter, allowing only fields of `model`."""
+    if fields is None:
+        return None
+    names = frozenset(name.strip() for name in fields.split(",") if name.strip())
+    unknown = names - model.model_fields.keys()
+    if not names or unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Invalid fields: {', '.join(sorted(unknown)) or fields!r}. "
+            f"Allowed fields: {', '.join(model.model_fields)}",
+        )
+    return names
+
+
+def get_projection(model: type[BaseModel], fields: Fields) -> dict[str, bool]:
+    return {
+        "_id" if name == "id" else name: True
+        for name in fields - COMPUTED_FIELDS[model]
+    }
+
+
+@lru_cache
+def partial_model(model: type[BaseModel], fields: Fields) -> type[BaseModel]:
+    """Model with only `fields` of `model`."""
+    return create_model(
+        f"Partial{model.__name__}",
+        **{
+            name: (field.annotation, field)
+            for name, field in model.model_fields.items()
+            if name in fields
+        },
+    )
+
+
+@lru_cache
+def partial_list_model(
+    model: type[BaseModel], items_field: str, item_model: type[BaseModel]
+) -> type[BaseModel]:
+    """Subclass of list `model`, with `items_field` holding `item_model` items."""
+    return create_model(
+        f"Partial{model.__name__}",
+        __base__=model,
+        **{items_field: (list[item_model], ...)},  # type: ignore[valid-type]
+    )
+
+
+def to_partial(
+    model: type[BaseModel], documents: Iterable[dict[str, Any]], fields: Fields
+) -> list[BaseModel]:
+    item_model = partial_model(model, fields)
+    return [
+        item_model.model_validate({"id": document["_id"], **document})
+        for document in documents
+    ]
@@ -1,58 +1,345 @@
-from collections import namedtuple
-from collections.abc import Mapping, Sequence
-from contextlib import suppress
-from typing import Any, Literal
+from collections.abc import AsyncIterator
+from typing import Any, Literal, NamedTuple
 
-from odmantic import query
+from odmantic import AIOEngine, ObjectId
 from pydantic import TypeAdapter
+from pymongo import ASCENDING, ReturnDocument
 
+from src.api.conditional import make_etag
+from src.api.fields import (
+    Fields,
+    get_projection,
+    partial_list_model,
+    partial_model,
+    to_partial,
+)
+from src.api.pagination import (
+    find_documents_page,
+    page_query,
+    split_page,
+    with_count,
+)
+from src.api.util import find_by_ids
+from src.cache import StaleWhileRevalidateCache, TTLCache
+from src.coalesce import SingleFlight
+from src.config import get_settings
 from src.dependencies import Db
-from src.models import Idea, IdeaDownvote, IdeaPublic, IdeasPublic, IdeaUpvote, User
+from src.metrics import register_metrics
+from src.models import (
+    Idea,
+    IdeaDownvote,
+    IdeaPublic,
+    IdeasBatch,
+    IdeasPublic,
+    IdeaUpvote,
+    IdeaVoters,
+    Principal,
+    User,
+    Vote,
+    VoteDirection,
+)
+from src.util import datetime_now
 
 idea_list_adapter = TypeAdapter(list[IdeaPublic])
+# Lists of ideas are read as raw documents with only these fields, building
+# `IdeaPublic` from them directly, without `Idea` models in between.
+IDEA_PUBLIC_PROJECTION = get_projection(IdeaPublic, frozenset(IdeaPublic.model_fields))
+# Fields identifying version of an idea, read for ETags of lists.
+IDEA_VERSION_PROJECTION = {
+    "modified_at": True,
+    "upvote_count": True,
+    "downvote_count": True,
+}
+
+settings = get_settings()
+# Count of all ideas is cached under None, counts of ideas of creator under its id.
+idea_counts: TTLCache[ObjectId | None, int] = TTLCache(
+    maxsize=settings.idea_count_cache_size, ttl=settings.idea_count_cache_ttl
+)
+register_metrics("idea_counts", idea_counts.stats)
+
 
+async def count_ideas(engine: AIOEngine, user: User | None = None) -> int:
+    """Count all ideas, or ideas created by `user`, caching the result.
 
-async def count_ideas(db: Db, user: User | None = None) -> int:
+    With `estimate_idea_count` setting, count of all ideas is taken from
+    collection metadata instead of counting documents.
+    """
+    key = user.id if user is not None else None
+    count = idea_counts.get(key)
+    if count is not None:
+        return count
     if user is not None:
-        return await db.count(Idea, Idea.creator_id == user.id)
-    return await db.count(Idea)
+        count = await engine.count(Idea, Idea.creator_id == user.id)
+    elif settings.estimate_idea_count:
+        count = await engine.get_collection(Idea).estimated_document_count()
+    else:
+        count = await engine.count(Idea)
+    idea_counts.set(key, count)
+    return count
 
 
-async def get_ideas_by_upvotes(db: Db, skip: int, limit: int, ascending=False):
-    collection = db.engine.get_collection(Idea)
-    aggregates: Sequence[Mapping[str, Any]] = [
-        {
-            "$addFields": {
-                "upvotes": {"$size": "$upvoted_by"},
-            }
-        },
-        {"$sort": {"upvotes": 1 if ascending else -1}},
-        {"$skip": skip},
-        {"$limit": limit},
-    ]
-    results = await collection.aggregate(aggregates).to_list(length=None)
-    return (Idea.model_validate_doc(result) for result in results)
+def invalidate_idea_counts(creator_id: ObjectId):
+    idea_counts.delete(None)
+    idea_counts.delete(creator_id)
 
 
-async def get_ideas(
-    db: Db, skip: int, limit: int, sort: str | None = None, ascending: bool = True
-):
-    if sort == "trending":
-        ideas = await get_ideas_by_upvotes(
-            db, skip=skip, limit=limit, ascending=not ascending
+class RenderedPage(NamedTuple):
+    body: bytes
+    etag: str
+
+
+# Pages of ideas for anonymous visitors are the same for all of them, they're
+# cached serialized, by sort and pagination parameters.
+anonymous_idea_pages: StaleWhileRevalidateCache[tuple, RenderedPage] = (
+    StaleWhileRevalidateCache(
+        maxsize=settings.idea_page_cache_size,
+        ttl=settings.idea_page_cache_ttl,
+        stale_ttl=settings.idea_page_cache_stale_ttl,
+    )
+)
+register_metrics("anonymous_idea_pages", anonymous_idea_pages.stats)
+
+# Raw documents of pages of ideas, with count and next cursor, shared by
+# concurrent requests. They're only read, each request builds its own models.
+idea_page_flights: SingleFlight[
+    tuple, tuple[tuple[list[dict[str, Any]], str | None], int | None]
+] = SingleFlight()
+register_metrics("idea_page_flights", idea_page_flights.stats)
+
+
+def invalidate_idea_pages():
+    """Make cached pages stale after ideas or their votes change.
+
+    Only this worker's pages are invalidated, others serve theirs until
+    `idea_page_cache_ttl` passes.
+    """
+    anonymous_idea_pages.invalidate()
+
+
+async def get_viewer_votes(
+    db: Db, viewer: User, idea_ids: list[ObjectId]
+) -> dict[ObjectId, VoteDirection]:
+    cursor = db.engine.get_collection(Vote).find(
+        {"user_id": viewer.id, "idea_id": {"$in": idea_ids}},
+        {"_id": False, "idea_id": True, "direction": True},
+    )
+    return {vote["idea_id"]: vote["direction"] async for vote in cursor}
+
+
+def to_idea_public_list(documents: list[dict[str, Any]]) -> list[IdeaPublic]:
+    return idea_list_adapter.validate_python(
+        [{"id": document["_id"], **document} for document in documents]
+    )
+
+
+async def to_ideas_public(
+    db: Db,
+    ideas: list[dict[str, Any]],
+    count: int | None,
+    next_cursor: str | None,
+    viewer: User | None = None,
+    fields: Fields | None = None,
+) -> IdeasPublic:
+    """Build list of ideas from documents found by `find_ideas_page`, with
+    `my_vote` of the `viewer` on each of them.
+
+    With `fields`, list of partial ideas with only these fields is returned.
+    The page gets weak ETag from versions of the ideas on it.
+    """
+    ids = [document["_id"] for document in ideas]
+    votes: dict[ObjectId, VoteDirection] = {}
+    if fields is None:
+        data = to_idea_public_list(ideas)
+        page_model: type[IdeasPublic] = IdeasPublic
+    else:
+        data = to_partial(IdeaPublic, ideas, fields)
+        page_model = partial_list_model(
+            IdeasPublic, "data", partial_model(IdeaPublic, fields)
+        )
+    if viewer is not None and ids and (fields is None or "my_vote" in fields):
+        votes = await get_viewer_votes(db, viewer, ids)
+        for idea, id in zip(data, ids, strict=True):
+            idea.my_vote = votes.get(id)
+    page = page_model(data=data, count=count, next_cursor=next_cursor)
+    page._etag = make_etag(
+        sorted(fields) if fields is not None else None,
+        count,
+        next_cursor,
+        [idea_version(document, votes.get(document["_id"])) for document in ideas],
+        weak=True,
+    )
+    return page
+
+
+def idea_version(idea: dict[str, Any], my_vote: VoteDirection | None) -> tuple:
+    return (
+        idea["_id"],
+        idea["modified_at"],
+        idea["upvote_count"],
+        idea["downvote_count"],
+        my_vote,
+    )
+
+
+async def find_ideas_page(
+    db: Db, *queries: Any, fields: Fields | None = None, **page_params: Any
+) -> tuple[list[dict[str, Any]], str | None]:
+    """Find page of raw idea documents, with fields of `IdeaPublic` or `fields`,
+    and fields of `IDEA_VERSION_PROJECTION`."""
+    return await find_documents_page(
+        db,
+        Idea,
+        *queries,
+        projection=(
+            IDEA_PUBLIC_PROJECTION
+            if fields is None
+            else get_projection(IdeaPublic, fields)
         )
-    elif sort == "newest":
-        sorter = query.desc if ascending else query.asc
-        ideas = await db.find(
-            Idea, limit=limit, skip=skip, sort=sorter(Idea.created_at)
+        | IDEA_VERSION_PROJECTION,
+        **page_params,
+    )
+
+
+async def export_ideas(engine: AIOEngine, batch_size: int) -> AsyncIterator[bytes]:
+    """Serialize all ideas as newline delimited JSON, in order of their ids.
+
+    Documents are read from the cursor `batch_size` at a time, each batch is
+    yielded as one chunk, so memory use doesn't grow with the collection.
+    """
+    cursor = engine.get_collection(Idea).find(
+        {}, IDEA_PUBLIC_PROJECTION, sort=[("_id", ASCENDING)], batch_size=batch_size
+    )
+    while documents := await cursor.to_list(length=batch_size):
+        yield b"".join(
+            idea.__pydantic_serializer__.to_json(idea) + b"\n"
+            for idea in to_idea_public_list(documents)
         )
-    else:
-        sorter = query.asc if ascending else query.desc
-        ideas = await db.find(Idea, limit=limit, skip=skip, sort=sorter(Idea.name))
-    return IdeasPublic(
-        data=idea_list_adapter.validate_python(ideas, from_attributes=True),
-        count=await count_ideas(db),
+
+
+async def get_ideas_by_ids(
+    db: Db, ids: list[ObjectId], viewer: User | None = None
+) -> IdeasBatch:
+    """Get ideas with `ids` in their order, with `my_vote` of the `viewer`."""
+    documents, missing = await find_by_ids(db, Idea, ids, IDEA_PUBLIC_PROJECTION)
+    data = to_idea_public_list(documents)
+    if viewer is not None and data:
+        votes = await get_viewer_votes(db, viewer, [idea.id for idea in data])
+        for idea in data:
+            idea.my_vote = votes.get(idea.id)
+    return IdeasBatch(data=data, missing=missing)
+
+
+VOTERS_LISTS: dict[VoteDirection, str] = {
+    "downvote": "downvoted_by",
+    "upvote": "upvoted_by",
+}
+
+
+async def get_idea(db: Db, idea: Idea, viewer: User | None = None, voters=False):
+    """Get idea with `my_vote` of the `viewer`, and with ids of voters if `voters`."""
+    public = IdeaPublic.model_validate(idea, from_attributes=True)
+    if viewer is not None:
+        votes = await get_viewer_votes(db, viewer, [idea.id])
+        public.my_vote = votes.get(idea.id)
+    if not voters:
+        return public
+    idea_voters: dict[str, list[ObjectId]] = {
+        voters_list: [] for voters_list in VOTERS_LISTS.values()
+    }
+    cursor = db.engine.get_collection(Vote).find(
+        {"idea_id": idea.id}, {"_id": False, "user_id": True, "direction": True}
+    )
+    async for vote in cursor:
+        idea_voters[VOTERS_LISTS[vote["direction"]]].append(vote["user_id"])
+    return IdeaVoters(**public.model_dump(), **idea_voters)
+
+
+IDEA_SORTS: dict[str | None, tuple[Any, bool]] = {
+    "trending": (Idea.upvote_count, False),
+    "newest": (Idea.created_at, False),
+    None: (Idea.name, True),
+}
+
+
+async def get_ideas(
+    db: Db,
+    skip: int,
+    limit: int,
+    sort: str | None = None,
+    ascending: bool = True,
+    cursor: str | None = None,
+    include_count: bool = True,
+    viewer: User | None = None,
+    fields: Fields | None = None,
+):
+    """Get page of ideas in `sort` order, reversed if not `ascending`.
+
+    Concurrent requests for the same page share the query for its documents,
+    `my_vote` of each viewer is queried separately.
+    """
+    sort_by, default_ascending = IDEA_SORTS.get(sort, IDEA_SORTS[None])
+    (ideas, next_cursor), count = await idea_page_flights.run(
+        (
+            +sort_by,
+            ascending == default_ascending,
+            skip,
+            limit,
+            cursor,
+            include_count,
+            fields,
+        ),
+        lambda: with_count(
+            find_ideas_page(
+                db,
+                fields=fields,
+                sort_by=sort_by,
+                ascending=ascending == default_ascending,
+                skip=skip,
+                limit=limit,
+                cursor=cursor,
+            ),
+            count_ideas(db.engine) if include_count else None,
+        ),
     )
+    return await to_ideas_public(db, ideas, count, next_cursor, viewer, fields)
+
+
+async def get_anonymous_ideas_page(
+    engine: AIOEngine,
+    skip: int,
+    limit: int,
+    sort: str | None = None,
+    cursor: str | None = None,
+    include_count: bool = True,
+    fields: Fields | None = None,
+) -> RenderedPage:
+    """Get serialized page of ideas as seen by anonymous visitors, from cache.
+
+    Pages are loaded in their own session, as stale ones are reloaded after
+    the request which found them ends.
+    """
+
+    async def load() -> RenderedPage:
+        async with engine.session() as session:
+            page = await get_ideas(
+                session,
+                skip,
+                limit,
+                sort,
+                cursor=cursor,
+                include_count=include_count,
+                fields=fields,
+            )
+        assert page._etag is not None
+        return RenderedPage(page.__pydantic_serializer__.to_json(page), page._etag)
+
+    if sort not in IDEA_SORTS:
+        sort = None
+    if cursor is not None:
+        skip = 0
+    key = (sort, skip, limit, cursor, include_count, fields)
+    return await anonymous_idea_pages.get(key, load)
 
 
 async def get_user_ideas(
@@ -60,15 +347,31 @@ async def get_user_ideas(
     user: User,
     skip: int,
     limit: int,
+    cursor: str | None = None,
+    include_count: bool = True,
+    viewer: User | None = None,
+    fields: Fields | None = None,
 ):
-    ideas = await db.find(
-        Idea, Idea.creator_id == user.id, skip=skip, limit=limit, sort=Idea.name
+    (ideas, next_cursor), count = await with_count(
+        find_ideas_page(
+            db,
+            Idea.creator_id == user.id,
+            fields=fields,
+            sort_by=Idea.name,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+        ),
+        count_ideas(db.engine, user) if include_count else None,
     )
-    count = await count_ideas(db, user)
+    return await to_ideas_public(db, ideas, count, next_cursor, viewer, fields)
 
-    return IdeasPublic(
-        data=idea_list_adapter.validate_python(ideas, from_attributes=True), count=count
-    )
+
+VOTED_DIRECTIONS: dict[str, VoteDirection] = {
+    "downvotes": "downvote",
+    "upvotes": "upvote",
+}
+VOTED_LISTS = {direction: which for which, direction in VOTED_DIRECTIONS.items()}
 
 
 async def get_voted_ideas(
@@ -77,58 +380,130 @@ async def get_voted_ideas(
     skip: int,
     limit: int,
     which: Literal["downvotes", "upvotes"],
+    cursor: str | None = None,
+    include_count: bool = True,
 ):
-    votes = set(getattr(user, which))
-    ideas = await db.find(
-        Idea, query.in_(Idea.id, votes), limit=limit, skip=skip, sort=Idea.name
+    """Get page of ideas voted by `user` in direction `which`, sorted by name.
+
+    The page is aggregated from the votes of the user, joined with their ideas,
+    so ids of all voted ideas never leave the database.
+    """
+    direction = VOTED_DIRECTIONS[which]
+    votes_query = {"user_id": user.id, "direction": direction}
+    (ideas, next_cursor), count = await with_count(
+        find_voted_ideas_page(db, votes_query, skip, limit, cursor),
+        db.engine.get_collection(Vote).count_documents(votes_query)
+        if include_count
+        else None,
+    )
+    data = to_idea_public_list(ideas)
+    for idea in data:
+        idea.my_vote = direction
+    return IdeasPublic(data=data, count=count, next_cursor=next_cursor)
+
+
+async def find_voted_ideas_page(
+    db: Db,
+    votes_query: dict[str, Any],
+    skip: int,
+    limit: int,
+    cursor: str | None = None,
+) -> tuple[list[dict[str, Any]], str | None]:
+    """Find page of raw documents of ideas of votes matching `votes_query`,
+    sorted by name, like `find_ideas_page`."""
+    field = +Idea.name
+    queries, skip = page_query((), field, str, True, skip, cursor)
+    pipeline: list[dict[str, Any]] = [
+        {"$match": votes_query},
+        {
+            "$lookup": {
+                "from": Idea.__collection__,
+                "localField": "idea_id",
+                "foreignField": "_id",
+                "as": "idea",
+            }
+        },
+        {"$unwind": "$idea"},
+        {"$replaceRoot": {"newRoot": "$idea"}},
+        {"$project": IDEA_PUBLIC_PROJECTION | IDEA_VERSION_PROJECTION},
+        *({"$match": query} for query in queries),
+        {"$sort": {field: ASCENDING, "_id": ASCENDING}},
+        {"$skip": skip},
+        {"$limit": limit + 1},
+    ]
+    documents = (
+        await db.engine.get_collection(Vote)
+        .aggregate(pipeline, allowDiskUse=True)
+        .to_list(length=None)
     )
-    return IdeasPublic(
-        data=idea_list_adapter.validate_python(ideas, from_attributes=True),
-        count=len(votes),
+    return split_page(
+        documents, limit, field, lambda found: (found[field], found["_id"])
     )
 
 
-vote_attributes = namedtuple(
-    "vote_attributes", "idea_add_to user_add_to idea_remove_from user_remove_from"
-)
-VOTE_ATTRIBUTES = {
-    IdeaDownvote: vote_attributes(
-        idea_add_to="downvoted_by",
-        user_add_to="downvotes",
-        idea_remove_from="upvoted_by",
-        user_remove_from="upvotes",
-    ),
-    IdeaUpvote: vote_attributes(
-        idea_add_to="upvoted_by",
-        user_add_to="upvotes",
-        idea_remove_from="downvoted_by",
-        user_remove_from="downvotes",
-    ),
+async def get_user_votes(db: Db, user: User) -> dict[str, list[ObjectId]]:
+    """Get ids of ideas voted by user, grouped as `upvotes` and `downvotes`."""
+    user_votes: dict[str, list[ObjectId]] = {which: [] for which in VOTED_DIRECTIONS}
+    cursor = db.engine.get_collection(Vote).find(
+        {"user_id": user.id}, {"_id": False, "idea_id": True, "direction": True}
+    )
+    async for vote in cursor:
+        user_votes[VOTED_LISTS[vote["direction"]]].append(vote["idea_id"])
+    return user_votes
+
+
+VOTE_DIRECTIONS: dict[type[IdeaDownvote | IdeaUpvote], VoteDirection] = {
+    IdeaDownvote: "downvote",
+    IdeaUpvote: "upvote",
+}
+VOTE_COUNTERS: dict[VoteDirection, str] = {
+    "downvote": "downvote_count",
+    "upvote": "upvote_count",
 }
 
 
+def vote_increments(
+    direction: VoteDirection, previous_direction: VoteDirection | None
+) -> dict[str, int]:
+    increments = {VOTE_COUNTERS[direction]: 1}
+    if previous_direction is not None:
+        increments[VOTE_COUNTERS[previous_direction]] = -1
+    return increments
+
+
 async def vote(
     db: Db,
-    user: User,
+    user: User | Principal,
     idea: Idea,
     vote_data: IdeaUpvote | IdeaDownvote,
 ):
-    attributes = VOTE_ATTRIBUTES[type(vote_data)]
-
-    already_voted = user.id in getattr(
-        idea, attributes.idea_add_to
-    ) or idea.id in getattr(user, attributes.user_add_to)
-    if already_voted:
-        return idea
+    """Record the vote in votes collection, and adjust vote counters of the idea.
 
-    with suppress(ValueError):
-        getattr(user, attributes.user_remove_from).remove(idea.id)
-    with suppress(ValueError):
-        getattr(idea, attributes.idea_remove_from).remove(user.id)
+    Vote is upserted atomically, returning the previous direction, counters are
+    updated only if the vote changed.
+    """
+    direction = VOTE_DIRECTIONS[type(vote_data)]
 
-    getattr(user, attributes.user_add_to).append(idea.id)
-    getattr(idea, attributes.idea_add_to).append(user.id)
+    previous_vote = await db.engine.get_collection(Vote).find_one_and_update(
+        {"user_id": user.id, "idea_id": idea.id},
+        {
+            "$set": {"direction": direction},
+            "$setOnInsert": {"created_at": datetime_now()},
+        },
+        projection={"_id": False, "direction": True},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE,
+    )
+    previous_direction = previous_vote["direction"] if previous_vote else None
+    if previous_direction == direction:
+        return idea
 
-    await db.save(idea)
-    await db.save(user)
-    return idea
+    updated_idea = await db.engine.get_collection(Idea).find_one_and_update(
+        {"_id": idea.id},
+        {"$inc": vote_increments(direction, previous_direction)},
+        return_document=ReturnDocument.AFTER,
+    )
+    invalidate_idea_pages()
+    if updated_idea is None:
+        return idea
+    return Idea.model_validate_doc(updated_idea)
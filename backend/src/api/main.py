@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from src.api.routes import auth, csrf, ideas, me, users
+from src.api.routes import auth, csrf, ideas, me, metrics, users
 
 api_router = APIRouter()
 api_router.include_router(ideas.router)
@@ -8,3 +8,4 @@ api_router.include_router(users.router)
 api_router.include_router(csrf.router, tags=["CSRF"])
 api_router.include_router(auth.router)
 api_router.include_router(me.router)
+api_router.include_router(metrics.router)
@@ -0,0 +1,171 @@
+import asyncio
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+from typing import Any
+
+import bson
+from bson import json_util
+from bson.errors import BSONError
+from fastapi import HTTPException
+from odmantic import ObjectId, engine, query
+from odmantic.field import FieldProxy
+from pymongo import ASCENDING, DESCENDING
+
+from src.dependencies import Db
+
+
+def encode_cursor(field: str, value: Any, id: ObjectId) -> str:
+    """Encode position after the document with `value` of `field` and `id`."""
+    encoded = urlsafe_b64encode(json_util.dumps([field, value, id]).encode())
+    return encoded.rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, field: str, value_type: type) -> tuple[Any, ObjectId]:
+    """Decode position encoded by `encode_cursor`, with value of `value_type`.
+
+    Value goes to the query as it is, so anything else, ie. a dict with query
+    operators, is rejected.
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        cursor_field, value, id = json_util.loads(urlsafe_b64decode(cursor + padding))
+    except (binascii.Error, BSONError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+    if (
+        cursor_field != field
+        or not isinstance(id, bson.ObjectId)
+        or not isinstance(value, value_type)
+        # bool is int too.
+        or (isinstance(value, bool) and value_type is not bool)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, ObjectId(id)
+
+
+def sort_value_type(model: type[engine.ModelType], field: str) -> type:
+    """Type of values of `model` field sorted by, to validate cursors with."""
+    annotation = model.model_fields[field].annotation
+    assert isinstance(annotation, type)
+    # odmantic replaces `datetime` by its subclass, decoded values are datetime.
+    return datetime if issubclass(annotation, datetime) else annotation
+
+
+def keyset_query(field: str, value: Any, id: ObjectId, ascending: bool) -> dict:
+    """Match documents sorted after `value` and `id`, with `_id` as tie-breaker."""
+    operator = "$gt" if ascending else "$lt"
+    return {
+        "$or": [
+            {field: {operator: value}},
+            {field: value, "_id": {operator: id}},
+        ]
+    }
+
+
+def page_query(
+    queries: tuple[Any, ...],
+    field: str,
+    value_type: type,
+    ascending: bool,
+    skip: int,
+    cursor: str | None,
+) -> tuple[tuple[Any, ...], int]:
+    """Add keyset query for `cursor` to `queries`, ignoring `skip` if there's one."""
+    if cursor is None:
+        return queries, skip
+    value, id = decode_cursor(cursor, field, value_type)
+    return (*queries, keyset_query(field, value, id, ascending)), 0
+
+
+def split_page[T](
+    documents: list[T], limit: int, field: str, key: Callable[[T], tuple[Any, Any]]
+) -> tuple[list[T], str | None]:
+    """Split `limit` + 1 documents to page, and cursor if there's next page."""
+    if limit <= 0 or len(documents) <= limit:
+        return documents[:limit], None
+    value, id = key(documents[limit - 1])
+    return documents[:limit], encode_cursor(field, value, id)
+
+
+async def find_page(
+    db: Db,
+    model: type[engine.ModelType],
+    *queries: Any,
+    sort_by: FieldProxy,
+    ascending: bool = True,
+    skip: int = 0,
+    limit: int = 20,
+    cursor: str | None = None,
+) -> tuple[list[engine.ModelType], str | None]:
+    """Find page of documents sorted by `sort_by`, and cursor for the next page.
+
+    With `cursor`, page starts right after the document it points to, using
+    index on `sort_by` and `_id`, instead of scanning `skip` documents.
+    """
+    field = +sort_by
+    queries, skip = page_query(
+        queries, field, sort_value_type(model, field), ascending, skip, cursor
+    )
+    sorter = query.asc if ascending else query.desc
+    documents = await db.find(
+        model,
+        *queries,
+        sort=(sorter(sort_by), sorter(model.id)),
+        skip=skip,
+        limit=limit + 1,
+    )
+    return split_page(
+        documents, limit, field, lambda found: (getattr(found, field), found.id)
+    )
+
+
+async def find_documents_page(
+    db: Db,
+    model: type[engine.ModelType],
+    *queries: Any,
+    projection: dict[str, bool],
+    sort_by: FieldProxy,
+    ascending: bool = True,
+    skip: int = 0,
+    limit: int = 20,
+    cursor: str | None = None,
+) -> tuple[list[dict[str, Any]], str | None]:
+    """Like `find_page`, but returns raw documents with only `projection` fields.
+
+    `_id` and `sort_by` fields are always included, as they are needed for
+    the cursor.
+    """
+    field = +sort_by
+    queries, skip = page_query(
+        queries, field, sort_value_type(model, field), ascending, skip, cursor
+    )
+    direction = ASCENDING if ascending else DESCENDING
+    documents = (
+        await db.engine.get_collection(model)
+        .find(
+            query.and_(*queries) if queries else {},
+            projection | {field: True, "_id": True},
+            sort=[(field, direction), ("_id", direction)],
+            skip=skip,
+            limit=limit + 1,
+        )
+        .to_list(length=None)
+    )
+    return split_page(
+        documents, limit, field, lambda found: (found[field], found["_id"])
+    )
+
+
+async def with_count[T](
+    page: Awaitable[T], count: Awaitable[int] | None
+) -> tuple[T, int | None]:
+    """Await `page` and `count` concurrently, without counting if `count` is None.
+
+    `count` can't use the session of `page`, as session doesn't support
+    concurrent operations.
+    """
+    if count is None:
+        return await page, None
+    page_result, count_result = await asyncio.gather(page, count)
+    return page_result, count_result
@@ -3,9 +3,12 @@ from typing import Annotated
 from fastapi import APIRouter, Cookie, Depends, HTTPException, Response
 from fastapi.security import OAuth2PasswordRequestForm
 
+from src.api.dependencies import LoginRateLimit, RefreshRateLimit
+from src.api.ideas import get_user_votes
 from src.auth import (
     authenticate_user,
     create_tokens,
+    login_username_limiter,
     refresh_access_token,
     set_refresh_token_cookie,
 )
@@ -15,12 +18,13 @@ from src.models import LoginData, RefreshToken, Token, UserMe
 router = APIRouter()
 
 
-@router.post("/auth")
+@router.post("/auth", dependencies=[LoginRateLimit])
 async def login_for_access_token(
     db: Db,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     response: Response,
 ) -> LoginData:
+    await login_username_limiter.hit(form_data.username)
     user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
@@ -28,16 +32,16 @@ async def login_for_access_token(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    (access_token, refresh_token, token_expiration) = create_tokens(str(user.id))
+    (access_token, refresh_token, token_expiration) = create_tokens(user)
     set_refresh_token_cookie(response, refresh_token, token_expiration)
 
     return LoginData(
-        user_data=UserMe(**user.model_dump()),
+        user_data=UserMe(**user.model_dump(), **await get_user_votes(db, user)),
         token=Token(access_token=access_token, token_type="bearer"),
     )
 
 
-@router.get("/refresh")
+@router.get("/refresh", dependencies=[RefreshRateLimit])
 async def get_new_access_token(
     db: Db, refresh_token: Annotated[RefreshToken, Cookie()]
 ) -> Token:
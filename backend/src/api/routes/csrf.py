@@ -1,14 +1,12 @@
 from fastapi import APIRouter, Response
-from fastapi_csrf_protect import CsrfProtect
-
-router = APIRouter(prefix="/csrf")
 
+from src.csrf import csrf_protect
 
-_csrf_protect = CsrfProtect()
+router = APIRouter(prefix="/csrf")
 
 
 @router.get("/get-token")
 async def get_csrf_token(response: Response):
-    csrf_token, signed_token = _csrf_protect.generate_csrf_tokens()
-    _csrf_protect.set_csrf_cookie(signed_token, response)
+    csrf_token, signed_token = csrf_protect.generate_csrf_tokens()
+    csrf_protect.set_csrf_cookie(signed_token, response)
     return {"csrf_token": csrf_token}
@@ -1,14 +1,37 @@
 from typing import Annotated
 
-from fastapi import APIRouter, HTTPException
-
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from src.api.conditional import (
+    PRIVATE_CACHE_CONTROL,
+    PUBLIC_CACHE_CONTROL,
+    conditional_response,
+    make_etag,
+)
 from src.api.dependencies import (
     AdminUser,
+    IdeaFieldsParams,
     IdeaFromPathId,
+    IdsParams,
+    LoggedInPrincipal,
     LoggedInUser,
+    OptionalUser,
     PaginationParams,
 )
-from src.api.ideas import count_ideas, get_ideas, vote
+from src.api.ideas import (
+    count_ideas,
+    export_ideas,
+    get_anonymous_ideas_page,
+    get_idea,
+    get_ideas,
+    get_ideas_by_ids,
+    invalidate_idea_counts,
+    invalidate_idea_pages,
+    vote,
+)
+from src.api.responses import ModelResponse
+from src.config import get_settings
 from src.dependencies import Db
 from src.models import (
     Idea,
@@ -16,44 +39,126 @@ from src.models import (
     IdeaDownvote,
     IdeaEditPatch,
     IdeaPublic,
+    IdeasBatch,
     IdeasPublic,
     IdeaUpvote,
+    IdeaVoters,
     Message,
+    Principal,
     User,
+    Vote,
 )
 
+settings = get_settings()
+
 router = APIRouter(prefix="/ideas")
 IdeaFromPath = Annotated[Idea, IdeaFromPathId]
 
 
 @router.post("/", response_model=IdeaPublic)
 async def create_idea(
-    db: Db, current_user: Annotated[User, LoggedInUser], idea_data: IdeaCreate
+    db: Db, current_user: Annotated[Principal, LoggedInPrincipal], idea_data: IdeaCreate
 ):
     idea = Idea(**idea_data.model_dump(), creator_id=current_user.id)
     await db.save(idea)
+    invalidate_idea_counts(idea.creator_id)
+    invalidate_idea_pages()
     return idea
 
 
+def ideas_cache_control(viewer: User | None) -> str:
+    return PUBLIC_CACHE_CONTROL if viewer is None else PRIVATE_CACHE_CONTROL
+
+
 @router.get("/", response_model=IdeasPublic)
-async def list_ideas(db: Db, pagination: PaginationParams, sort: str | None = None):
-    return await get_ideas(db, **pagination.model_dump(), sort=sort)
+async def list_ideas(
+    request: Request,
+    db: Db,
+    viewer: Annotated[User | None, OptionalUser],
+    pagination: PaginationParams,
+    fields: IdeaFieldsParams,
+    sort: str | None = None,
+):
+    if viewer is None:
+        page = await get_anonymous_ideas_page(
+            db.engine, **pagination.model_dump(), sort=sort, fields=fields
+        )
+        return conditional_response(
+            request,
+            lambda: Response(page.body, media_type="application/json"),
+            page.etag,
+            PUBLIC_CACHE_CONTROL,
+            vary="Authorization",
+        )
+    ideas = await get_ideas(
+        db, **pagination.model_dump(), sort=sort, viewer=viewer, fields=fields
+    )
+    assert ideas._etag is not None
+    return conditional_response(
+        request,
+        lambda: ModelResponse(ideas),
+        ideas._etag,
+        PRIVATE_CACHE_CONTROL,
+        vary="Authorization",
+    )
 
 
 @router.get("/count")
 async def count(db: Db) -> int:
-    return await count_ideas(db)
+    return await count_ideas(db.engine)
 
 
-@router.get("/{id}", response_model=IdeaPublic)
-async def get_idea_by_id(idea: IdeaFromPath):
-    return idea
+@router.get("/export", dependencies=[LoggedInUser])
+async def export(db: Db) -> StreamingResponse:
+    """All ideas as newline delimited JSON, for bulk consumers of ideas."""
+    # Streamed after the session of request ends, reading from the engine.
+    return StreamingResponse(
+        export_ideas(db.engine, settings.export_batch_size),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.get("/batch", response_model=IdeasBatch)
+async def get_ideas_batch(
+    db: Db, viewer: Annotated[User | None, OptionalUser], ids: IdsParams
+):
+    """Ideas with comma separated `ids`, in their order, and ids not found."""
+    return ModelResponse(await get_ideas_by_ids(db, ids, viewer))
+
+
+@router.get("/{id}", response_model=IdeaVoters | IdeaPublic)
+async def get_idea_by_id(
+    request: Request,
+    db: Db,
+    viewer: Annotated[User | None, OptionalUser],
+    idea: IdeaFromPath,
+    voters: bool = False,
+):
+    public = await get_idea(db, idea, viewer, voters)
+    # Votes don't change `modified_at` of the idea, so there's no
+    # `Last-Modified`, only ETag covering the counters and voters.
+    return conditional_response(
+        request,
+        lambda: ModelResponse(public),
+        make_etag(
+            idea.id,
+            idea.modified_at,
+            idea.upvote_count,
+            idea.downvote_count,
+            public.my_vote,
+            (public.upvoted_by, public.downvoted_by)
+            if isinstance(public, IdeaVoters)
+            else None,
+        ),
+        ideas_cache_control(viewer),
+        vary="Authorization",
+    )
 
 
 @router.patch("/{id}", response_model=IdeaPublic)
 async def update_idea(
     db: Db,
-    current_user: Annotated[User, LoggedInUser],
+    current_user: Annotated[Principal, LoggedInPrincipal],
     idea: IdeaFromPath,
     update_data: IdeaEditPatch,
 ):
@@ -61,30 +166,36 @@ async def update_idea(
         raise HTTPException(status_code=403, detail="Not enough permissions")
     idea.model_update(update_data)
     await db.save(idea)
+    invalidate_idea_pages()
     return idea
 
 
 @router.delete("/{id}", dependencies=[AdminUser])
 async def delete_idea_by_id(db: Db, idea: IdeaFromPath) -> Message:
+    await db.remove(Vote, Vote.idea_id == idea.id)
     await db.delete(idea)
+    invalidate_idea_counts(idea.creator_id)
+    invalidate_idea_pages()
     return Message(message="Idea deleted successfully")
 
 
 @router.put("/{id}/upvote", response_model=IdeaPublic)
 async def upvote_idea(
     db: Db,
-    current_user: Annotated[User, LoggedInUser],
+    current_user: Annotated[Principal, LoggedInPrincipal],
     idea: IdeaFromPath,
     upvote_data: IdeaUpvote,
 ):
-    return await vote(db, current_user, idea, upvote_data)
+    idea = await vote(db, current_user, idea, upvote_data)
+    return IdeaPublic(**idea.model_dump(), my_vote="upvote")
 
 
 @router.put("/{id}/downvote", response_model=IdeaPublic)
 async def downvote_idea(
     db: Db,
-    current_user: Annotated[User, LoggedInUser],
+    current_user: Annotated[Principal, LoggedInPrincipal],
     idea: IdeaFromPath,
     downvote_data: IdeaDownvote,
 ):
-    return await vote(db, current_user, idea, downvote_data)
+    idea = await vote(db, current_user, idea, downvote_data)
+    return IdeaPublic(**idea.model_dump(), my_vote="downvote")
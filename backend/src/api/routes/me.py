@@ -1,19 +1,40 @@
 from typing import Annotated
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 
-from src.api.dependencies import LoggedInUser, PaginationParams
-from src.api.ideas import get_user_ideas, get_voted_ideas
-from src.auth import get_password_hash, verify_password
+from src.api.conditional import (
+    PRIVATE_CACHE_CONTROL,
+    conditional_response,
+    make_etag,
+)
+from src.api.dependencies import IdeaFieldsParams, LoggedInUser, PaginationParams
+from src.api.ideas import get_user_ideas, get_user_votes, get_voted_ideas
+from src.api.responses import ModelResponse
+from src.auth import (
+    create_tokens,
+    get_password_hash,
+    invalidate_user,
+    password_hashing,
+    set_refresh_token_cookie,
+    verify_password,
+)
 from src.dependencies import Db
 from src.models import IdeasPublic, User, UserEditPatch, UserEditPatchInput, UserMe
 
 router = APIRouter(prefix="/me")
 
 
-@router.get("")
-async def get_me(current_user: Annotated[User, LoggedInUser]):
-    return UserMe(**current_user.model_dump())
+@router.get("", response_model=UserMe)
+async def get_me(request: Request, db: Db, current_user: Annotated[User, LoggedInUser]):
+    votes = await get_user_votes(db, current_user)
+    # Votes of the user don't change its `modified_at`, so there's no
+    # `Last-Modified`, only ETag covering them.
+    return conditional_response(
+        request,
+        lambda: ModelResponse(UserMe(**current_user.model_dump(), **votes)),
+        make_etag(current_user.id, current_user.modified_at, votes),
+        PRIVATE_CACHE_CONTROL,
+    )
 
 
 @router.patch("", response_model=UserMe)
@@ -21,39 +42,62 @@ async def patch_me(
     db: Db,
     current_user: Annotated[User, LoggedInUser],
     update_input: UserEditPatchInput,
+    response: Response,
 ):
+    """Update the logged in user.
+
+    Changing the password revokes all tokens of the user, including the one
+    of this request. Refresh token cookie is replaced with a new one, so the
+    client gets a new access token from `/refresh` without logging in again.
+    """
     update_data = UserEditPatch(**update_input.model_dump())
     if update_input.new_password:
-        if not update_input.old_password or not verify_password(
-            update_input.old_password, current_user.hashed_password
+        if not update_input.old_password or not await password_hashing.run(
+            verify_password, update_input.old_password, current_user.hashed_password
         ):
             raise HTTPException(status_code=403, detail="Invalid password")
-        update_data.hashed_password = get_password_hash(update_input.new_password)
+        update_data.hashed_password = await password_hashing.run(
+            get_password_hash, update_input.new_password
+        )
     current_user.model_update(update_data, exclude_none=True)
+    if update_input.new_password:
+        current_user.token_version += 1
     await db.save(current_user)
-    return current_user
+    invalidate_user(current_user.id)
+    if update_input.new_password:
+        _, refresh_token, token_expiration = create_tokens(current_user)
+        set_refresh_token_cookie(response, refresh_token, token_expiration)
+    return UserMe(**current_user.model_dump(), **await get_user_votes(db, current_user))
 
 
 @router.get("/ideas/", response_model=IdeasPublic)
 async def get_ideas(
-    db: Db, current_user: Annotated[User, LoggedInUser], pagination: PaginationParams
+    db: Db,
+    current_user: Annotated[User, LoggedInUser],
+    pagination: PaginationParams,
+    fields: IdeaFieldsParams,
 ):
-    return await get_user_ideas(db, current_user, **pagination.model_dump())
+    ideas = await get_user_ideas(
+        db, current_user, **pagination.model_dump(), viewer=current_user, fields=fields
+    )
+    return ModelResponse(ideas)
 
 
 @router.get("/upvotes/", response_model=IdeasPublic)
 async def get_upvotes(
     db: Db, current_user: Annotated[User, LoggedInUser], pagination: PaginationParams
 ):
-    return await get_voted_ideas(
+    ideas = await get_voted_ideas(
         db, current_user, **pagination.model_dump(), which="upvotes"
     )
+    return ModelResponse(ideas)
 
 
 @router.get("/downvotes/", response_model=IdeasPublic)
 async def get_downvotes(
     db: Db, current_user: Annotated[User, LoggedInUser], pagination: PaginationParams
 ):
-    return await get_voted_ideas(
+    ideas = await get_voted_ideas(
         db, current_user, **pagination.model_dump(), which="downvotes"
     )
+    return ModelResponse(ideas)
@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+
+from src.api.dependencies import AdminUser
+from src.metrics import Stats, collect_metrics
+
+router = APIRouter(prefix="/metrics")
+
+
+@router.get("", dependencies=[AdminUser])
+async def get_metrics() -> dict[str, Stats]:
+    return collect_metrics()
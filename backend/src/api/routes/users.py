@@ -1,14 +1,37 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Form, HTTPException, Response
+from fastapi import APIRouter, Form, HTTPException, Request, Response
 from odmantic.exceptions import DuplicateKeyError
 from pydantic import TypeAdapter
 
-from src.api.dependencies import AdminUser, PaginationParams, UserFromPathId
+from src.api.conditional import (
+    PRIVATE_CACHE_CONTROL,
+    conditional_response,
+    make_etag,
+)
+from src.api.dependencies import (
+    AdminUser,
+    IdsParams,
+    PaginationParams,
+    RegisterRateLimit,
+    UserFieldsParams,
+    UserFromPathId,
+)
+from src.api.fields import (
+    get_projection,
+    partial_list_model,
+    partial_model,
+    to_partial,
+)
 from src.api.ideas import get_user_ideas
+from src.api.pagination import find_documents_page, find_page, with_count
+from src.api.responses import ModelResponse
+from src.api.util import find_by_ids
 from src.auth import (
     create_tokens,
     get_password_hash,
+    invalidate_user,
+    password_hashing,
     set_refresh_token_cookie,
 )
 from src.dependencies import Db
@@ -20,22 +43,25 @@ from src.models import (
     LoginData,
     Token,
     User,
+    UserAdmin,
     UserMe,
     UserPublic,
     UserRegister,
     UsersAdmin,
+    UsersPublic,
 )
 
 router = APIRouter(prefix="/users")
+user_list_adapter = TypeAdapter(list[UserAdmin])
+user_public_list_adapter = TypeAdapter(list[UserPublic])
+USER_PUBLIC_PROJECTION = {"name": True}
 UserFromPath = Annotated[User, UserFromPathId]
 
 
 async def add_user(db: Db, data: Annotated[AdminUserCreate | UserRegister, Form()]):
+    hashed_password = await password_hashing.run(get_password_hash, data.password)
     try:
-        user = User(
-            **data.model_dump(),
-            hashed_password=get_password_hash(data.password),
-        )
+        user = User(**data.model_dump(), hashed_password=hashed_password)
         await db.save(user)
     except DuplicateKeyError as e:
         raise HTTPException(
@@ -51,16 +77,16 @@ async def add_user(db: Db, data: Annotated[AdminUserCreate | UserRegister, Form(
     return user
 
 
-@router.post("/", response_model=LoginData)
+@router.post("/", response_model=LoginData, dependencies=[RegisterRateLimit])
 async def register(
     db: Db, register_data: Annotated[UserRegister, Form()], response: Response
 ):
     user = await add_user(db, register_data)
-    (access_token, refresh_token, token_expiration) = create_tokens(str(user.id))
+    (access_token, refresh_token, token_expiration) = create_tokens(user)
     set_refresh_token_cookie(response, refresh_token, token_expiration)
 
     return LoginData(
-        user_data=UserMe(**user.model_dump()),
+        user_data=UserMe(**user.model_dump(), upvotes=[], downvotes=[]),
         token=Token(access_token=access_token, token_type="bearer"),
     )
 
@@ -75,37 +101,92 @@ async def create_user(db: Db, create_data: Annotated[AdminUserCreate, Form()]):
     response_model=UsersAdmin,
     dependencies=[AdminUser],
 )
-async def list_users(db: Db, pagination: PaginationParams):
-    users = await db.find(User, **pagination.model_dump(), sort=User.name)
-    count = await db.count(User)
-    user_list_adapter = TypeAdapter(list[UserMe])
-    return UsersAdmin(
-        users=user_list_adapter.validate_python(users, from_attributes=True),
-        count=count,
+async def list_users(db: Db, pagination: PaginationParams, fields: UserFieldsParams):
+    page_params = pagination.model_dump(exclude={"include_count"})
+    if fields is None:
+        page = find_page(db, User, sort_by=User.name, **page_params)
+    else:
+        page = find_documents_page(
+            db,
+            User,
+            projection=get_projection(UserAdmin, fields),
+            sort_by=User.name,
+            **page_params,
+        )
+    (users, next_cursor), count = await with_count(
+        page, db.engine.count(User) if pagination.include_count else None
+    )
+    if fields is not None:
+        partial = partial_list_model(
+            UsersAdmin, "users", partial_model(UserAdmin, fields)
+        )
+        return ModelResponse(
+            partial(
+                users=to_partial(UserAdmin, users, fields),
+                count=count,
+                next_cursor=next_cursor,
+            )
+        )
+    return ModelResponse(
+        UsersAdmin(
+            users=user_list_adapter.validate_python(users, from_attributes=True),
+            count=count,
+            next_cursor=next_cursor,
+        )
     )
 
 
-@router.get("/{id}", response_model=UserMe, dependencies=[AdminUser])
-async def get_user(user: UserFromPath):
-    return user
+@router.get("/public", response_model=UsersPublic)
+async def get_users_public(db: Db, ids: IdsParams):
+    """Public data of users with comma separated `ids`, in their order, and ids
+    not found."""
+    documents, missing = await find_by_ids(db, User, ids, USER_PUBLIC_PROJECTION)
+    users = user_public_list_adapter.validate_python(
+        [{"id": document["_id"], **document} for document in documents]
+    )
+    return ModelResponse(UsersPublic(users=users, count=len(users), missing=missing))
+
+
+@router.get("/{id}", response_model=UserAdmin, dependencies=[AdminUser])
+async def get_user(request: Request, user: UserFromPath):
+    return conditional_response(
+        request,
+        lambda: ModelResponse(UserAdmin.model_validate(user, from_attributes=True)),
+        make_etag(user.id, user.modified_at),
+        PRIVATE_CACHE_CONTROL,
+        last_modified=user.modified_at,
+    )
 
 
 @router.get("/{id}/ideas/", response_model=AdminUserIdeas, dependencies=[AdminUser])
 async def get_ideas(db: Db, user: UserFromPath, pagination: PaginationParams):
     ideas = await get_user_ideas(db, user, **pagination.model_dump())
 
-    return AdminUserIdeas(
-        data=ideas.data,
-        count=ideas.count,
-        username=user.username,
+    return ModelResponse(
+        AdminUserIdeas(
+            data=ideas.data,
+            count=ideas.count,
+            next_cursor=ideas.next_cursor,
+            username=user.username,
+        )
     )
 
 
-@router.patch("/{id}", response_model=UserMe, dependencies=[AdminUser])
+@router.patch("/{id}", response_model=UserAdmin, dependencies=[AdminUser])
 async def update_user(db: Db, user: UserFromPath, input_data: AdminUserEditPatchInput):
     update_data = AdminUserEditPatch(**input_data.model_dump())
     if input_data.new_password:
-        update_data.hashed_password = get_password_hash(input_data.new_password)
+        update_data.hashed_password = await password_hashing.run(
+            get_password_hash, input_data.new_password
+        )
+    # Claims of issued tokens are outdated, when roles or password change.
+    roles = input_data.model_dump(include={"is_active", "is_admin"}, exclude_none=True)
+    revokes_tokens = bool(input_data.new_password) or any(
+        value != getattr(user, name) for name, value in roles.items()
+    )
     user.model_update(update_data, exclude_none=True)
+    if revokes_tokens:
+        user.token_version += 1
     await db.save(user)
+    invalidate_user(user.id)
     return user
@@ -1,17 +1,36 @@
+from typing import Any
+
 from fastapi import HTTPException
-from odmantic import ObjectId, engine
+from odmantic import Model, ObjectId, engine
 
+from src.coalesce import SingleFlight
 from src.dependencies import Db
+from src.metrics import register_metrics
 from src.models import Idea, User
+from src.util import mark_unmodified
+
+# Raw documents are shared, as the models built from them are modified by routes.
+find_one_flights: SingleFlight[tuple[type[Model], ObjectId], dict[str, Any] | None] = (
+    SingleFlight()
+)
+register_metrics("find_one_flights", find_one_flights.stats)
 
 
 async def find_one_or_404(
     db: Db, model: type[engine.ModelType], id: ObjectId, error_text="Not found"
 ):
-    result = await db.find_one(model, model.id == id)
-    if result is None:
+    """Find document of `model` by `id`, raising 404 if there's none.
+
+    Concurrent lookups of the same document share one query, each of them
+    builds its own instance of `model`. Instance is marked unmodified, so saving
+    it doesn't overwrite fields changed meanwhile, ie. vote counters.
+    """
+    document = await find_one_flights.run(
+        (model, id), lambda: db.engine.get_collection(model).find_one({"_id": id})
+    )
+    if document is None:
         raise HTTPException(status_code=404, detail=error_text)
-    return result
+    return mark_unmodified(model.model_validate_doc(document))
 
 
 async def idea_or_404(db: Db, id: ObjectId, error_text="Idea not found"):
@@ -20,3 +39,21 @@ async def idea_or_404(db: Db, id: ObjectId, error_text="Idea not found"):
 
 async def user_or_404(db: Db, id: ObjectId, error_text="User not found"):
     return await find_one_or_404(db, User, id, error_text)
+
+
+async def find_by_ids(
+    db: Db,
+    model: type[engine.ModelType],
+    ids: list[ObjectId],
+    projection: dict[str, bool],
+) -> tuple[list[dict[str, Any]], list[ObjectId]]:
+    """Find raw documents of `model` with `ids` in one query.
+
+    Returns documents in order of `ids`, and ids without document.
+    """
+    cursor = db.engine.get_collection(model).find({"_id": {"$in": ids}}, projection)
+    found = {document["_id"]: document async for document in cursor}
+    return (
+        [found[id] for id in ids if id in found],
+        [id for id in ids if id not in found],
+    )
@@ -1,23 +1,96 @@
+import time
 from datetime import UTC, datetime, timedelta
+from functools import partial
 from typing import Annotated, Literal
 
 import jwt
 from fastapi import Depends, HTTPException, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
+from odmantic import AIOEngine, ObjectId
 from passlib.context import CryptContext
 
+from src.cache import TTLCache
 from src.config import get_settings
+from src.deferred import DeferredWrites
 from src.dependencies import Db
-from src.models import TokenData, User
+from src.hashing import HashingPool
+from src.metrics import register_metrics
+from src.models import Principal, TokenData, User
+from src.rate_limit import MemoryBackend, MongoBackend, Rate, RateLimiter
+from src.util import mark_unmodified
 
 JWT_ALGORITHM = "HS256"
 ACCESS_TOKEN_DELTA = timedelta(minutes=30)
 REFRESH_TOKEN_DELTA = timedelta(minutes=60 * 24 * 7)
 
 password_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated=["auto"])
+config = get_settings()
+
+password_hashing = HashingPool(
+    max_workers=config.password_hashing_workers,
+    max_queue=config.password_hashing_max_queue,
+    use_processes=config.password_hashing_processes,
+)
+register_metrics("password_hashing", password_hashing.stats)
+deferred_writes = DeferredWrites(
+    retries=config.deferred_write_retries,
+    backoff=config.deferred_write_backoff,
+    max_pending=config.deferred_write_max_pending,
+)
+register_metrics("deferred_writes", deferred_writes.stats)
+
+# Users authenticated by token, to not look them up on every request.
+user_cache: TTLCache[ObjectId, User] = TTLCache(
+    maxsize=config.user_cache_size, ttl=config.user_cache_ttl
+)
+register_metrics("user_cache", user_cache.stats)
+token_versions: TTLCache[ObjectId, int] = TTLCache(
+    maxsize=config.user_cache_size, ttl=config.user_cache_ttl
+)
+register_metrics("token_versions", token_versions.stats)
+# Tokens already verified, keyed by secret key too, so rotating it drops them.
+verified_tokens: TTLCache[tuple[str, str], TokenData] = TTLCache(
+    maxsize=config.token_cache_size, ttl=config.token_cache_ttl
+)
+register_metrics("verified_tokens", verified_tokens.stats)
+
+rate_limit_backend = (
+    MongoBackend()
+    if config.rate_limit_backend == "mongodb"
+    else MemoryBackend(maxsize=config.rate_limit_memory_size)
+)
+if isinstance(rate_limit_backend, MemoryBackend):
+    register_metrics("rate_limit_backend", rate_limit_backend.stats)
+# Logins are limited by client and by username, so attempts spread over many
+# usernames, or coming from many clients, are limited too.
+login_ip_limiter = RateLimiter(
+    "login_ip", Rate.parse(config.login_rate_limit_per_ip), rate_limit_backend
+)
+login_username_limiter = RateLimiter(
+    "login_username",
+    Rate.parse(config.login_rate_limit_per_username),
+    rate_limit_backend,
+)
+register_limiter = RateLimiter(
+    "register", Rate.parse(config.register_rate_limit), rate_limit_backend
+)
+refresh_limiter = RateLimiter(
+    "refresh", Rate.parse(config.refresh_rate_limit), rate_limit_backend
+)
+rate_limiters = (
+    login_ip_limiter,
+    login_username_limiter,
+    register_limiter,
+    refresh_limiter,
+)
+for limiter in rate_limiters:
+    register_metrics(f"rate_limit_{limiter.name}", limiter.stats)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth", refreshUrl="refresh")
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl="auth", refreshUrl="refresh", auto_error=False
+)
 
 
 def verify_password(plain_password, hashed_password):
@@ -36,22 +109,48 @@ async def authenticate_user(db, username, plain_password) -> User | Literal[Fals
     user = await db.find_one(User, User.username == username)
     if not user:
         return False
-    is_valid, maybe_new_hash = verify_and_update_password(
-        plain_password, user.hashed_password
+    is_valid, maybe_new_hash = await password_hashing.run(
+        verify_and_update_password, plain_password, user.hashed_password
     )
     if not is_valid:
         return False
     if maybe_new_hash:
+        deferred_writes.submit(
+            partial(
+                update_password_hash,
+                db.engine,
+                user.id,
+                user.hashed_password,
+                maybe_new_hash,
+            )
+        )
         user.hashed_password = maybe_new_hash
-        await db.save(user)
     return user
 
 
-config = get_settings()
+async def update_password_hash(
+    engine: AIOEngine, user_id: ObjectId, old_hash: str, new_hash: str
+):
+    """Replace hash of the password in outdated scheme, unless it was changed."""
+    await engine.get_collection(User).update_one(
+        {"_id": user_id, "hashed_password": old_hash},
+        {"$set": {"hashed_password": new_hash}},
+    )
+    invalidate_user(user_id)
+
+
+def token_claims(user: User) -> dict:
+    """Claims identifying `user`, with roles, valid until `token_version` changes."""
+    return {
+        "sub": str(user.id),
+        "is_admin": user.is_admin,
+        "is_active": user.is_active,
+        "ver": user.token_version,
+    }
 
 
-def create_tokens(user_id: str):
-    data = {"sub": user_id}
+def create_tokens(user: User):
+    data = token_claims(user)
     access_token = create_access_token(data)
     (refresh_token, token_expiration) = create_refresh_token(data)
     return access_token, refresh_token, token_expiration
@@ -88,17 +187,29 @@ credentials_exception = HTTPException(
 )
 
 
-def decode_token(token: Annotated[str, Depends(oauth2_scheme)]):
+def decode_token(token: Annotated[str, Depends(oauth2_scheme)]) -> TokenData:
+    key = (config.secret_key, token)
+    token_data = verified_tokens.get(key)
+    if token_data is not None:
+        return token_data
     try:
         decoded_jwt = jwt.decode(token, config.secret_key, algorithms=[JWT_ALGORITHM])
         id = decoded_jwt.get("sub")
         if id is None:
             raise credentials_exception
 
-        token_data = TokenData(id=id)
-        return token_data
+        token_data = TokenData(
+            id=id,
+            is_admin=decoded_jwt.get("is_admin"),
+            is_active=decoded_jwt.get("is_active"),
+            token_version=decoded_jwt.get("ver"),
+        )
     except InvalidTokenError as err:
         raise credentials_exception from err
+    # Tokens without expiration aren't created here, don't keep them.
+    if "exp" in decoded_jwt:
+        verified_tokens.set(key, token_data, ttl=decoded_jwt["exp"] - time.time())
+    return token_data
 
 
 async def refresh_access_token(
@@ -106,7 +217,7 @@ async def refresh_access_token(
     refresh_token: Annotated[str, Depends(oauth2_scheme)],
 ):
     user = await get_current_user(db, refresh_token)
-    access_token = create_access_token(data={"sub": str(user.id)})
+    access_token = create_access_token(data=token_claims(user))
     return {"access_token": access_token, "token_type": "bearer"}
 
 
@@ -116,10 +227,64 @@ async def get_current_user(
 ):
     token_data = decode_token(token)
 
-    user = await db.find_one(User, User.id == token_data.id)
+    user = user_cache.get(token_data.id)
     if user is None:
+        user = await db.find_one(User, User.id == token_data.id)
+        if user is None:
+            raise credentials_exception
+        user_cache.set(user.id, user)
+        token_versions.set(user.id, user.token_version)
+    if token_data.token_version not in (None, user.token_version):
         raise credentials_exception
-    return user
+    # Handlers can modify the user, copy keeps the cached one intact. Cached user
+    # may be outdated, the copy is marked unmodified so saving it writes only
+    # fields changed by the handler.
+    return mark_unmodified(user.model_copy())
+
+
+def invalidate_user(user_id: ObjectId):
+    """Drop cached user and token version, after user was modified in db."""
+    user_cache.delete(user_id)
+    token_versions.delete(user_id)
+
+
+async def get_token_version(db: Db, user_id: ObjectId) -> int | None:
+    """Get current `token_version` of user, or None if user doesn't exist."""
+    version = token_versions.get(user_id)
+    if version is None:
+        document = await db.engine.get_collection(User).find_one(
+            {"_id": user_id}, {"_id": False, "token_version": True}
+        )
+        if document is None:
+            return None
+        version = document.get("token_version", 0)
+        token_versions.set(user_id, version)
+    return version
+
+
+async def get_current_principal(
+    db: Db,
+    token: Annotated[str, Depends(oauth2_scheme)],
+) -> Principal:
+    """Authenticate by claims of the token, checking only its version in db.
+
+    Tokens without roles in claims, issued before they were added, are
+    authenticated by loading the user.
+    """
+    token_data = decode_token(token)
+    if (
+        token_data.id is None
+        or token_data.is_admin is None
+        or token_data.is_active is None
+        or token_data.token_version is None
+    ):
+        user = await get_current_user(db, token)
+        return Principal.model_validate(user, from_attributes=True)
+    if await get_token_version(db, token_data.id) != token_data.token_version:
+        raise credentials_exception
+    return Principal(
+        id=token_data.id, is_admin=token_data.is_admin, is_active=token_data.is_active
+    )
 
 
 async def get_current_active_user(
@@ -130,10 +295,35 @@ async def get_current_active_user(
     return current_user
 
 
+async def get_current_active_principal(
+    principal: Annotated[Principal, Depends(get_current_principal)],
+) -> Principal:
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
+
+
 CurrentUser = Annotated[User, Depends(get_current_active_user)]
 
 
-async def get_current_active_admin(current_user: CurrentUser) -> User:
-    if not current_user.is_admin:
+ActivePrincipal = Annotated[Principal, Depends(get_current_active_principal)]
+
+
+async def get_optional_current_user(
+    db: Db,
+    token: Annotated[str | None, Depends(optional_oauth2_scheme)],
+) -> User | None:
+    """Current active user, or None for anonymous requests and invalid tokens."""
+    if token is None:
+        return None
+    try:
+        user = await get_current_user(db, token)
+    except HTTPException:
+        return None
+    return user if user.is_active else None
+
+
+async def get_current_active_admin(principal: ActivePrincipal) -> Principal:
+    if not principal.is_admin:
         raise HTTPException(status_code=403, detail="Not enough permissions")
-    return current_user
+    return principal
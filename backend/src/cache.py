@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+
+from src.metrics import Stats
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache[K: Hashable, V]:
+    """In-process LRU cache, with entries expiring `ttl` seconds after being set.
+
+    Cache is local to the worker process. `ttl` of 0 disables caching.
+    """
+
+    def __init__(
+        self, maxsize: int, ttl: float, timer: Callable[[], float] = time.monotonic
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= self.timer():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: K, value: V, ttl: float | None = None):
+        """Set `key` to `value`, expiring after `ttl` if it's shorter than default."""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        self._entries[key] = (self.timer() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: K):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Stats:
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class StaleWhileRevalidateCache[K: Hashable, V]:
+    """In-process LRU cache of values loaded by async functions.
+
+    Entries are fresh for `ttl` seconds after being loaded. For `stale_ttl`
+    seconds more, they are still returned, while being reloaded in background.
+    `invalidate` makes all entries stale at once, so they're reloaded on next
+    use, without loading them all while requests wait. `ttl` of 0 disables
+    caching.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        stale_ttl: float,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timer = timer
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.failed_reloads = 0
+        # Entries loaded before last invalidation, of older generation, are stale.
+        self._generation = 0
+        self._entries: OrderedDict[K, tuple[int, float, V]] = OrderedDict()
+        self._reloading: dict[K, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: K, load: Callable[[], Awaitable[V]]) -> V:
+        """Get value of `key`, awaiting `load()` if there's none to return."""
+        if self.ttl <= 0 or self.maxsize <= 0:
+            self.misses += 1
+            return await load()
+        entry = self._entries.get(key)
+        if entry is not None:
+            generation, loaded_at, value = entry
+            age = self.timer() - loaded_at
+            if generation == self._generation and age < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            if self.stale_ttl > 0 and age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                self._reload(key, load)
+                return value
+            del self._entries[key]
+        self.misses += 1
+        generation = self._generation
+        value = await load()
+        self._set(key, generation, value)
+        return value
+
+    def _set(self, key: K, generation: int, value: V):
+        self._entries[key] = (generation, self.timer(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _reload(self, key: K, load: Callable[[], Awaitable[V]]):
+        if key in self._reloading:
+            return
+        task = asyncio.create_task(self._run_reload(key, load))
+        self._reloading[key] = task
+        task.add_done_callback(lambda _: self._reloading.pop(key, None))
+
+    async def _run_reload(self, key: K, load: Callable[[], Awaitable[V]]):
+        # Value loaded while entries get invalidated again is stale already.
+        generation = self._generation
+        try:
+            value = await load()
+        except Exception:
+            self.failed_reloads += 1
+            logger.exception("Reloading cache entry %r failed", key)
+            return
+        self.reloads += 1
+        self._set(key, generation, value)
+
+    def invalidate(self):
+        """Make all entries stale."""
+        self._generation += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Stats:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            "reloads": self.reloads,
+            "failed_reloads": self.failed_reloads,
+        }
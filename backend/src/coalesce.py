@@ -0,0 +1,53 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+
+from src.metrics import Stats
+
+
+class SingleFlight[K: Hashable, V]:
+    """Share one in-flight call among concurrent callers with the same key.
+
+    The first caller with a key starts the call, callers arriving before it
+    completes await its result, or its exception, instead of calling again.
+    Nothing is kept after the call completes, so results are never older than
+    the call. Results are shared as they are, callers must not modify them.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._flights: dict[K, asyncio.Task[V]] = {}
+
+    async def run(self, key: K, call: Callable[[], Awaitable[V]]) -> V:
+        task = self._flights.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(call())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._land(key, done))
+        else:
+            self.coalesced += 1
+        # Cancelling one caller, ie. after client disconnects, mustn't cancel
+        # the call for the others.
+        return await asyncio.shield(task)
+
+    def _land(self, key: K, task: asyncio.Task[V]):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            # Mark exception retrieved, if all callers were cancelled.
+            task.exception()
+
+    @property
+    def coalesce_ratio(self) -> float:
+        """Share of callers which awaited call started by another caller."""
+        callers = self.calls + self.coalesced
+        return self.coalesced / callers if callers else 0.0
+
+    def stats(self) -> Stats:
+        return {
+            "in_flight": len(self._flights),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesce_ratio": self.coalesce_ratio,
+        }
@@ -0,0 +1,178 @@
+import gzip
+from collections.abc import Callable
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.cache import TTLCache
+from src.metrics import Stats, register_metrics
+
+# Installed with the `compression` extra.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+type Compressor = Callable[[bytes, int], bytes]
+
+# Encodings in order of preference, brotli and zstd only if their packages are
+# installed.
+COMPRESSORS: dict[str, Compressor] = {}
+if zstandard is not None:  # pragma: no cover
+    COMPRESSORS["zstd"] = lambda data, level: zstandard.ZstdCompressor(
+        level=level
+    ).compress(data)
+if brotli is not None:  # pragma: no cover
+    COMPRESSORS["br"] = lambda data, level: brotli.compress(data, quality=level)
+COMPRESSORS["gzip"] = lambda data, level: gzip.compress(
+    data, compresslevel=level, mtime=0
+)
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "text/",
+)
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Parse `Accept-Encoding` header to quality of each encoding."""
+    encodings = {}
+    for item in header.split(","):
+        encoding, _, params = item.partition(";")
+        encoding = encoding.strip().lower()
+        if not encoding:
+            continue
+        quality = 1.0
+        name, _, value = params.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        encodings[encoding] = quality
+    return encodings
+
+
+def choose_encoding(header: str, available: list[str]) -> str | None:
+    """Choose the most preferred of `available` encodings, accepted by client."""
+    accepted = parse_accept_encoding(header)
+    default = accepted.get("*", 0.0)
+    for encoding in available:
+        if accepted.get(encoding, default) > 0:
+            return encoding
+    return None
+
+
+def is_public(headers: Headers) -> bool:
+    """Whether response is marked `Cache-Control: public`."""
+    directives = headers.get("cache-control", "").split(",")
+    return any(
+        directive.partition("=")[0].strip().lower() == "public"
+        for directive in directives
+    )
+
+
+class CompressionMiddleware:
+    """Compress complete response bodies of at least `min_size` bytes.
+
+    Encoding is negotiated by `Accept-Encoding`, preferring zstd, brotli and
+    gzip, in that order. Compressed bodies of responses marked
+    `Cache-Control: public` are kept in a cache, so responses with the same
+    body, ie. cached anonymous pages, are compressed once. Private responses,
+    which are never shared, are compressed without caching, so they don't evict
+    the public ones. Streamed responses are passed through as they are.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        min_size: int = 1024,
+        levels: dict[str, int] | None = None,
+        cache_size: int = 128,
+        cache_ttl: float = 300.0,
+    ):
+        self.app = app
+        self.min_size = min_size
+        self.levels = {"zstd": 3, "br": 4, "gzip": 6} | (levels or {})
+        self.encodings = list(COMPRESSORS)
+        self.cache: TTLCache[tuple[str, bytes], bytes] = TTLCache(
+            maxsize=cache_size, ttl=cache_ttl
+        )
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        register_metrics("compression", self.stats)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), self.encodings
+        )
+        start: Message | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            assert start is not None
+            headers = MutableHeaders(scope=start)
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.min_size
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            ):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            if encoding is not None:
+                body = self.compress(body, encoding, cache=is_public(headers))
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                etag = headers.get("etag")
+                if etag is not None and not etag.startswith("W/"):
+                    # Compressed body isn't byte for byte the same.
+                    headers["ETag"] = f"W/{etag}"
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def compress(self, body: bytes, encoding: str, cache: bool = True) -> bytes:
+        key = (encoding, body)
+        compressed = self.cache.get(key) if cache else None
+        if compressed is None:
+            compressed = COMPRESSORS[encoding](body, self.levels[encoding])
+            if cache:
+                self.cache.set(key, compressed)
+        self.compressed += 1
+        self.bytes_in += len(body)
+        self.bytes_out += len(compressed)
+        return compressed
+
+    def stats(self) -> Stats:
+        return {
+            "compressed": self.compressed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "cache_size": len(self.cache),
+        }
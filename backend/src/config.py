@@ -1,5 +1,6 @@
 from functools import lru_cache
 from pathlib import Path
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -14,6 +15,55 @@ class Settings(BaseSettings):
     mongodb_test_uri: str
     secret_key: str
 
+    csrf_exempt_bearer: bool = False
+
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+    compression_zstd_level: int = 3
+    compression_cache_size: int = 128
+    compression_cache_ttl: float = 300.0
+
+    mongodb_max_pool_size: int = 100
+    mongodb_min_pool_size: int = 0
+    mongodb_max_idle_time_ms: int | None = None
+    mongodb_connect_timeout_ms: int = 20_000
+    mongodb_server_selection_timeout_ms: int = 30_000
+
+    idea_count_cache_ttl: float = 30.0
+    idea_count_cache_size: int = 1024
+    estimate_idea_count: bool = False
+
+    max_page_limit: int = 1000
+    max_page_skip: int = 10_000
+    export_batch_size: int = 500
+    max_batch_ids: int = 100
+
+    idea_page_cache_size: int = 256
+    idea_page_cache_ttl: float = 10.0
+    idea_page_cache_stale_ttl: float = 60.0
+
+    password_hashing_workers: int = 2
+    password_hashing_max_queue: int = 32
+    password_hashing_processes: bool = False
+
+    user_cache_ttl: float = 30.0
+    user_cache_size: int = 10_000
+
+    token_cache_ttl: float = 1800.0
+    token_cache_size: int = 10_000
+
+    deferred_write_retries: int = 3
+    deferred_write_backoff: float = 0.5
+    deferred_write_max_pending: int = 1000
+
+    rate_limit_backend: Literal["memory", "mongodb"] = "memory"
+    rate_limit_memory_size: int = 100_000
+    login_rate_limit_per_ip: str = "20/minute"
+    login_rate_limit_per_username: str = "5/minute"
+    register_rate_limit: str = "5/minute"
+    refresh_rate_limit: str = "30/minute"
+
     model_config = SettingsConfigDict(
         env_file=ENV_FILE_PATH,
         extra="ignore",
@@ -1,11 +1,16 @@
 from fastapi import Request
 from fastapi_csrf_protect import CsrfProtect
+from fastapi_csrf_protect.exceptions import CsrfProtectError
 from pydantic_settings import BaseSettings
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from src.config import get_settings
+from src.exception_handlers import csrf_protect_exception_handler
 
 settings = get_settings()
 
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
 
 class CsrfSettings(BaseSettings):
     secret_key: str = settings.csrf_secret_key
@@ -21,9 +26,43 @@ def get_csrf_config():
 csrf_protect = CsrfProtect()
 
 
-async def verify_csrf(request: Request) -> bool:
-    safe_methods = ["GET", "HEAD", "OPTIONS"]
-    if request.method in safe_methods:
-        return True
-    await csrf_protect.validate_csrf(request)
-    return True
+def has_bearer_token(scope: Scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            return value[:7].lower() == b"bearer "
+    return False
+
+
+class CsrfMiddleware:
+    """Validate double submit CSRF token of requests with unsafe methods.
+
+    Requests with safe methods are passed through without inspecting them. With
+    `exempt_bearer`, requests with bearer token are passed through too, browsers
+    don't send it on their own, like cookies.
+
+    Validation runs before routing, so unsafe requests without valid token get
+    403 even for unknown paths or methods, instead of 404 or 405. Only clients
+    with a valid token learn which routes exist, and no route can be left out
+    of validation by mistake.
+    """
+
+    def __init__(self, app: ASGIApp, exempt_bearer: bool = False):
+        self.app = app
+        self.exempt_bearer = exempt_bearer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in SAFE_METHODS
+            or (self.exempt_bearer and has_bearer_token(scope))
+        ):
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope, receive)
+        try:
+            await csrf_protect.validate_csrf(request)
+        except CsrfProtectError as exc:
+            response = await csrf_protect_exception_handler(request, exc)
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
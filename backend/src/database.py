@@ -6,16 +6,43 @@ from odmantic import AIOEngine
 from pymongo.errors import ServerSelectionTimeoutError
 
 from src.config import get_settings
-from src.models import Idea, User
 
+_engine: AIOEngine | None = None
 
-async def get_engine() -> AIOEngine:
+
+def create_engine(mongodb_uri: str | None = None) -> AIOEngine:
+    settings = get_settings()
     client: AsyncIOMotorClient[dict[str, Any]] = AsyncIOMotorClient(
-        get_settings().mongodb_uri
+        mongodb_uri or settings.mongodb_uri,
+        maxPoolSize=settings.mongodb_max_pool_size,
+        minPoolSize=settings.mongodb_min_pool_size,
+        maxIdleTimeMS=settings.mongodb_max_idle_time_ms,
+        connectTimeoutMS=settings.mongodb_connect_timeout_ms,
+        serverSelectionTimeoutMS=settings.mongodb_server_selection_timeout_ms,
     )
-    engine = AIOEngine(client=client)
-    await engine.configure_database((User, Idea))
-    return engine
+    return AIOEngine(client=client)
+
+
+def connect() -> AIOEngine:
+    """Create the process-wide engine, if it doesn't exist yet.
+
+    Indexes are not configured here, see `src.indexes`.
+    """
+    global _engine
+    if _engine is None:
+        _engine = create_engine()
+    return _engine
+
+
+def disconnect():
+    global _engine
+    if _engine is not None:
+        _engine.client.close()
+        _engine = None
+
+
+async def get_engine() -> AIOEngine:
+    return connect()
 
 
 async def get_db():
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from pymongo.errors import PyMongoError
+
+from src.metrics import Stats
+
+logger = logging.getLogger(__name__)
+
+type Write = Callable[[], Awaitable[Any]]
+
+
+class DeferredWrites:
+    """Run writes the response doesn't depend on in background tasks.
+
+    Writes failing with database errors are retried up to `retries` times,
+    waiting `backoff` seconds before the first retry, doubled for each next one.
+    Up to `max_pending` writes run at once, writes over that are dropped.
+    Writes are lost if the worker is killed, so they must be safe to skip.
+    """
+
+    def __init__(self, retries: int, backoff: float, max_pending: int):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_pending = max_pending
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(self, write: Write) -> bool:
+        """Start `write` in background, returns False if it was dropped."""
+        if len(self._tasks) >= self.max_pending:
+            self.dropped += 1
+            logger.warning("Too many pending writes, dropping %r", write)
+            return False
+        task = asyncio.create_task(self._run(write))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, write: Write):
+        delay = self.backoff
+        for attempt in range(self.retries + 1):
+            try:
+                await write()
+            except PyMongoError:
+                if attempt == self.retries:
+                    self.failed += 1
+                    logger.exception("Deferred write %r failed", write)
+                    return
+                self.retried += 1
+                await asyncio.sleep(delay)
+                delay *= 2
+            except Exception:
+                self.failed += 1
+                logger.exception("Deferred write %r failed", write)
+                return
+            else:
+                self.completed += 1
+                return
+
+    async def drain(self, timeout: float):
+        """Wait up to `timeout` seconds for pending writes, cancel the rest."""
+        if not self._tasks:
+            return
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        if pending:
+            logger.warning("Cancelling %d pending writes", len(pending))
+            for task in pending:
+                task.cancel()
+            await asyncio.wait(pending)
+
+    def stats(self) -> Stats:
+        return {
+            "pending": len(self._tasks),
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,90 @@
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from src.metrics import Stats
+
+
+class HashingPool:
+    """Run password hashing in an executor, outside of the event loop.
+
+    At most `max_workers` calls run at once, up to `max_queue` more wait for
+    a free worker. Calls over that are rejected with 503, instead of making
+    everyone wait longer.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, use_processes=False):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self.running = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor: Executor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            executor_class = (
+                ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            )
+            self._executor = executor_class(max_workers=self.max_workers)
+        return self._executor
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        return self._semaphore
+
+    async def run[T](self, func: Callable[..., T], *args) -> T:
+        """Run `func` with `args` in the executor, waiting for a free worker."""
+        if self.semaphore.locked():
+            await self._wait_for_worker()
+        else:
+            await self.semaphore.acquire()
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self.semaphore.release()
+
+    async def _wait_for_worker(self):
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, try again later",
+                headers={"Retry-After": "1"},
+            )
+        self.queued += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._semaphore = None
+
+    def stats(self) -> Stats:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
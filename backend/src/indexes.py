@@ -0,0 +1,125 @@
+import logging
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from odmantic import AIOEngine, Model
+from pymongo import ASCENDING, IndexModel
+
+from src.models import Idea, RateLimitBucket, User, Vote
+
+logger = logging.getLogger(__name__)
+
+INDEXES: dict[type[Model], list[IndexModel]] = {
+    User: [
+        IndexModel("username", unique=True),
+        IndexModel([("name", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    Idea: [
+        IndexModel([("created_at", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel("modified_at"),
+        IndexModel([("name", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel([("upvote_count", ASCENDING), ("_id", ASCENDING)]),
+        IndexModel(
+            [("creator_id", ASCENDING), ("name", ASCENDING), ("_id", ASCENDING)]
+        ),
+    ],
+    Vote: [
+        IndexModel([("user_id", ASCENDING), ("idea_id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("direction", ASCENDING)]),
+        IndexModel([("idea_id", ASCENDING), ("direction", ASCENDING)]),
+    ],
+    RateLimitBucket: [IndexModel("expires_at", expireAfterSeconds=0)],
+}
+
+COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+DEFAULT_INDEX = "_id_"
+
+
+@dataclass
+class IndexDiff:
+    collection: str
+    missing: list[IndexModel] = field(default_factory=list)
+    changed: list[IndexModel] = field(default_factory=list)
+    extra: list[str] = field(default_factory=list)
+
+    @property
+    def is_synced(self) -> bool:
+        return not (self.missing or self.changed or self.extra)
+
+
+def index_spec(document: Mapping[str, Any]) -> tuple:
+    key = document["key"]
+    keys = tuple(key.items() if isinstance(key, Mapping) else key)
+    options = tuple(
+        (option, document[option]) for option in COMPARED_OPTIONS if option in document
+    )
+    return keys, options
+
+
+def diff_indexes(
+    collection: str,
+    expected: Sequence[IndexModel],
+    existing: Mapping[str, Mapping[str, Any]],
+) -> IndexDiff:
+    diff = IndexDiff(collection=collection)
+    expected_names = set()
+    for index in expected:
+        name = index.document["name"]
+        expected_names.add(name)
+        if name not in existing:
+            diff.missing.append(index)
+        elif index_spec(index.document) != index_spec(existing[name]):
+            diff.changed.append(index)
+    diff.extra = [
+        name
+        for name in existing
+        if name not in expected_names and name != DEFAULT_INDEX
+    ]
+    return diff
+
+
+async def get_index_diffs(engine: AIOEngine) -> list[IndexDiff]:
+    diffs = []
+    for model, indexes in INDEXES.items():
+        collection = engine.get_collection(model)
+        existing = await collection.index_information()
+        diffs.append(diff_indexes(collection.name, indexes, existing))
+    return diffs
+
+
+async def sync_indexes(engine: AIOEngine, drop_extra=False) -> list[IndexDiff]:
+    """Create missing indexes, and rebuild ones with outdated definition.
+
+    Indexes are built in the background. Indexes not declared in `INDEXES` are
+    dropped only with `drop_extra`.
+    """
+    diffs = await get_index_diffs(engine)
+    for model, diff in zip(INDEXES, diffs, strict=True):
+        collection = engine.get_collection(model)
+        to_drop = [index.document["name"] for index in diff.changed]
+        if drop_extra:
+            to_drop.extend(diff.extra)
+        for name in to_drop:
+            await collection.drop_index(name)
+        to_create = diff.missing + diff.changed
+        if to_create:
+            await collection.create_indexes(to_create, background=True)
+    return diffs
+
+
+async def verify_indexes(engine: AIOEngine) -> bool:
+    """Check indexes are in sync with `INDEXES`, without modifying them."""
+    diffs = await get_index_diffs(engine)
+    for diff in diffs:
+        for index in diff.missing:
+            logger.warning(
+                "Missing index %s on %s", index.document["name"], diff.collection
+            )
+        for index in diff.changed:
+            logger.warning(
+                "Outdated index %s on %s", index.document["name"], diff.collection
+            )
+        for name in diff.extra:
+            logger.info("Undeclared index %s on %s", name, diff.collection)
+    return not any(diff.missing or diff.changed for diff in diffs)
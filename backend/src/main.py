@@ -1,18 +1,47 @@
-from fastapi import Depends, FastAPI
+import logging
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_csrf_protect.exceptions import CsrfProtectError
+from pymongo.errors import PyMongoError
 
 from src.api.main import api_router
+from src.auth import deferred_writes, password_hashing
+from src.compression import CompressionMiddleware
 from src.config import get_settings
-from src.csrf import verify_csrf
-from src.exception_handlers import csrf_protect_exception_handler
+from src.csrf import CsrfMiddleware
+from src.database import connect, disconnect
+from src.indexes import verify_indexes
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncGenerator[None]:
+    engine = connect()
+    try:
+        if not await verify_indexes(engine):
+            logger.warning(
+                "Indexes are not in sync, run `python -m src.scripts.sync_indexes`"
+            )
+    except PyMongoError:
+        logger.exception("Could not verify indexes")
+    try:
+        yield
+    finally:
+        await deferred_writes.drain(timeout=5)
+        password_hashing.shutdown()
+        disconnect()
 
-app = FastAPI(dependencies=[Depends(verify_csrf)])
 
-app.exception_handler(CsrfProtectError)(csrf_protect_exception_handler)
+app = FastAPI(lifespan=lifespan)
 
 settings = get_settings()
 
+# Added before CORS middleware, so CSRF errors get CORS headers too.
+app.add_middleware(CsrfMiddleware, exempt_bearer=settings.csrf_exempt_bearer)
+
 
 allowed_origins = [settings.home_location]
 
@@ -24,5 +53,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(
+    CompressionMiddleware,
+    min_size=settings.compression_min_size,
+    levels={
+        "gzip": settings.compression_gzip_level,
+        "br": settings.compression_brotli_quality,
+        "zstd": settings.compression_zstd_level,
+    },
+    cache_size=settings.compression_cache_size,
+    cache_ttl=settings.compression_cache_ttl,
+)
+
 
 app.include_router(api_router)
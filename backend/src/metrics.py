@@ -0,0 +1,14 @@
+from collections.abc import Callable
+
+type Stats = dict[str, int | float]
+
+_providers: dict[str, Callable[[], Stats]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], Stats]):
+    """Register `provider` returning current stats of component `name`."""
+    _providers[name] = provider
+
+
+def collect_metrics() -> dict[str, Stats]:
+    return {name: provider() for name, provider in _providers.items()}
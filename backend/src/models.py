@@ -1,10 +1,11 @@
 from datetime import UTC, datetime
-from typing import Annotated
+from typing import Annotated, Literal
 
 from odmantic import Field, Model, ObjectId
 from pydantic import (
     AfterValidator,
     BaseModel,
+    ConfigDict,
     StringConstraints,
     computed_field,
 )
@@ -36,6 +37,8 @@ DateTimeUTC = Annotated[
     AfterValidator(to_utc),
 ]
 
+VoteDirection = Literal["downvote", "upvote"]
+
 
 class WithModifiedAtAutoUpdate(BaseModel):
     @computed_field  # type: ignore[prop-decorator]
@@ -47,16 +50,15 @@ class WithModifiedAtAutoUpdate(BaseModel):
 class User(Model):
     created_at: DateTimeUTC = Field(default_factory=datetime_now)
     modified_at: DateTimeUTC = Field(default_factory=datetime_now)
-    username: str = Field(unique=True)
+    username: str
     name: str = Field(max_length=255)
     hashed_password: str
     is_active: bool = True
     is_admin: bool = False
-    upvotes: list[ObjectId] = []
-    downvotes: list[ObjectId] = []
+    token_version: int = 0
 
 
-class UserMe(BaseModel):
+class UserAdmin(BaseModel):
     id: ObjectId
     created_at: DateTimeUTC
     modified_at: DateTimeUTC
@@ -64,13 +66,17 @@ class UserMe(BaseModel):
     name: str
     is_active: bool
     is_admin: bool
+
+
+class UserMe(UserAdmin):
     upvotes: list[ObjectId]
     downvotes: list[ObjectId]
 
 
 class UsersAdmin(BaseModel):
-    users: list[UserMe]
-    count: int
+    users: list[UserAdmin]
+    count: int | None
+    next_cursor: str | None = None
 
 
 class UserPublic(BaseModel):
@@ -81,6 +87,7 @@ class UserPublic(BaseModel):
 class UsersPublic(BaseModel):
     users: list[UserPublic]
     count: int
+    missing: list[ObjectId] = []
 
 
 class UserRegister(BaseModel):
@@ -123,12 +130,12 @@ class AdminUserCreate(UserRegister):
 
 
 class Idea(Model):
-    created_at: DateTimeUTC = Field(default_factory=datetime_now, index=True)
-    modified_at: DateTimeUTC = Field(default_factory=datetime_now, index=True)
+    created_at: DateTimeUTC = Field(default_factory=datetime_now)
+    modified_at: DateTimeUTC = Field(default_factory=datetime_now)
     name: str
     description: str
-    upvoted_by: list[ObjectId] = []
-    downvoted_by: list[ObjectId] = []
+    upvote_count: int = 0
+    downvote_count: int = 0
     creator_id: ObjectId
 
 
@@ -137,14 +144,28 @@ class IdeaPublic(BaseModel):
     created_at: DateTimeUTC
     name: str
     description: str
+    upvote_count: int
+    downvote_count: int
+    creator_id: ObjectId
+    my_vote: VoteDirection | None = None
+
+
+class IdeaVoters(IdeaPublic):
     upvoted_by: list[ObjectId]
     downvoted_by: list[ObjectId]
-    creator_id: ObjectId
 
 
 class IdeasPublic(BaseModel):
     data: list[IdeaPublic]
-    count: int
+    count: int | None
+    next_cursor: str | None = None
+    # Not serialized, set for pages validated by versions of their ideas.
+    _etag: str | None = None
+
+
+class IdeasBatch(BaseModel):
+    data: list[IdeaPublic]
+    missing: list[ObjectId]
 
 
 class AdminUserIdeas(IdeasPublic):
@@ -161,6 +182,13 @@ class IdeaEditPatch(WithModifiedAtAutoUpdate):
     description: NonEmptyString | None = None
 
 
+class Vote(Model):
+    created_at: DateTimeUTC = Field(default_factory=datetime_now)
+    user_id: ObjectId
+    idea_id: ObjectId
+    direction: VoteDirection
+
+
 class IdeaUpvote(BaseModel):
     idea_id: ObjectId
 
@@ -169,6 +197,18 @@ class IdeaDownvote(BaseModel):
     idea_id: ObjectId
 
 
+class RateLimitBucket(Model):
+    """Token bucket of a rate limiter, shared by workers."""
+
+    key: str = Field(primary_field=True)
+    tokens: float
+    allowed: bool
+    updated_at: datetime
+    expires_at: datetime
+
+    model_config = {"collection": "rate_limits"}
+
+
 class Message(BaseModel):
     message: str
 
@@ -183,7 +223,21 @@ class RefreshToken(BaseModel):
 
 
 class TokenData(BaseModel):
+    # Shared by requests with the same token, when cached.
+    model_config = ConfigDict(frozen=True)
+
     id: ObjectId | None = None
+    is_admin: bool | None = None
+    is_active: bool | None = None
+    token_version: int | None = None
+
+
+class Principal(BaseModel):
+    """Authenticated user, without loading it from db."""
+
+    id: ObjectId
+    is_admin: bool
+    is_active: bool
 
 
 class LoginData(BaseModel):
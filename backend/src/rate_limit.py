@@ -0,0 +1,170 @@
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import NamedTuple, Protocol
+
+from fastapi import HTTPException
+from odmantic import AIOEngine
+from pymongo import ReturnDocument
+
+from src.database import connect
+from src.metrics import Stats
+from src.models import RateLimitBucket
+
+PERIODS = {"second": 1, "minute": 60, "hour": 60 * 60, "day": 24 * 60 * 60}
+
+
+class Rate(NamedTuple):
+    """Up to `count` hits in a burst, refilled evenly over `period` seconds."""
+
+    count: int
+    period: float
+
+    @classmethod
+    def parse(cls, value: str) -> "Rate":
+        """Parse rate like `5/minute`, count of 0 disables limiting."""
+        count, _, period = value.partition("/")
+        try:
+            return cls(int(count), PERIODS[period.strip()])
+        except (KeyError, ValueError) as e:
+            raise ValueError(
+                f"Invalid rate {value!r}, expected <count>/<{'|'.join(PERIODS)}>"
+            ) from e
+
+    @property
+    def per_second(self) -> float:
+        return self.count / self.period
+
+
+class RateLimitBackend(Protocol):
+    async def acquire(self, key: str, rate: Rate) -> float:
+        """Take a token from bucket of `key`.
+
+        Returns 0 when a token was taken, otherwise seconds until one is refilled.
+        """
+        ...
+
+
+class MemoryBackend:
+    """Token buckets local to the worker process, least recently used are
+    dropped over `maxsize`.
+    """
+
+    def __init__(self, maxsize: int, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.timer = timer
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    async def acquire(self, key: str, rate: Rate) -> float:
+        now = self.timer()
+        tokens, updated_at = self._buckets.get(key, (rate.count, now))
+        tokens = min(rate.count, tokens + (now - updated_at) * rate.per_second)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / rate.per_second
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def clear(self):
+        self._buckets.clear()
+
+    def stats(self) -> Stats:
+        return {"size": len(self)}
+
+
+class MongoBackend:
+    """Token buckets in MongoDB, shared by all workers.
+
+    Buckets are updated atomically, using the time of the database server.
+    Full buckets are removed by TTL index on `expires_at`.
+    """
+
+    def __init__(self, engine: AIOEngine | None = None):
+        self.engine = engine
+
+    async def acquire(self, key: str, rate: Rate) -> float:
+        engine = self.engine or connect()
+        collection = engine.get_collection(RateLimitBucket)
+        elapsed = {
+            "$divide": [
+                {"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]},
+                1000,
+            ]
+        }
+        refilled = {
+            "$min": [
+                rate.count,
+                {
+                    "$add": [
+                        {"$ifNull": ["$tokens", rate.count]},
+                        {"$multiply": [elapsed, rate.per_second]},
+                    ]
+                },
+            ]
+        }
+        has_token = {"$gte": ["$tokens", 1]}
+        taken = {"$cond": [has_token, {"$subtract": ["$tokens", 1]}, "$tokens"]}
+        bucket = await collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": "$$NOW"}},
+                {
+                    "$set": {
+                        "allowed": has_token,
+                        "tokens": taken,
+                        "expires_at": {"$add": ["$$NOW", rate.period * 1000]},
+                    }
+                },
+            ],
+            {"_id": False, "tokens": True, "allowed": True},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        if bucket["allowed"]:
+            return 0.0
+        return (1 - bucket["tokens"]) / rate.per_second
+
+
+class RateLimiter:
+    """Limit hits of each key to `rate`, rejecting hits over it with 429."""
+
+    def __init__(self, name: str, rate: Rate, backend: RateLimitBackend):
+        self.name = name
+        self.rate = rate
+        self.backend = backend
+        self.allowed = 0
+        self.limited = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate.count > 0
+
+    async def hit(self, key: str):
+        if not self.enabled:
+            return
+        retry_after = await self.backend.acquire(f"{self.name}:{key}", self.rate)
+        if retry_after > 0:
+            self.limited += 1
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+        self.allowed += 1
+
+    def stats(self) -> Stats:
+        return {
+            "count": self.rate.count,
+            "period": self.rate.period,
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
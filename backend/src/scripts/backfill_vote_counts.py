@@ -0,0 +1,72 @@
+import asyncio
+from argparse import ArgumentParser
+
+from odmantic import AIOEngine
+from pymongo import UpdateOne
+
+from src.database import disconnect, get_engine
+from src.models import Idea, Vote
+
+VOTE_COUNTS_PIPELINE = [
+    {
+        "$group": {
+            "_id": "$idea_id",
+            "upvote_count": {
+                "$sum": {"$cond": [{"$eq": ["$direction", "upvote"]}, 1, 0]}
+            },
+            "downvote_count": {
+                "$sum": {"$cond": [{"$eq": ["$direction", "downvote"]}, 1, 0]}
+            },
+        }
+    },
+]
+
+
+async def backfill_vote_counts(engine: AIOEngine, only_missing=False) -> int:
+    """Compute vote counters of ideas from the votes collection."""
+    ideas = engine.get_collection(Idea)
+    votes = engine.get_collection(Vote)
+    filter = {"upvote_count": {"$exists": False}} if only_missing else {}
+    counts = {
+        result["_id"]: result async for result in votes.aggregate(VOTE_COUNTS_PIPELINE)
+    }
+    requests = []
+    async for idea in ideas.find(filter, {"_id": True}):
+        count = counts.get(idea["_id"], {})
+        requests.append(
+            UpdateOne(
+                {"_id": idea["_id"]},
+                {
+                    "$set": {
+                        "upvote_count": count.get("upvote_count", 0),
+                        "downvote_count": count.get("downvote_count", 0),
+                    }
+                },
+            )
+        )
+    if not requests:
+        return 0
+    result = await ideas.bulk_write(requests, ordered=False)
+    return result.modified_count
+
+
+async def main(only_missing=False):
+    engine = await get_engine()
+    try:
+        modified = await backfill_vote_counts(engine, only_missing=only_missing)
+        print(f"Updated vote counts of {modified} ideas.")
+    finally:
+        disconnect()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        description="Compute vote counters of ideas from the votes collection."
+    )
+    parser.add_argument(
+        "--only-missing",
+        action="store_true",
+        help="update only ideas without vote counters",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(**vars(args)))
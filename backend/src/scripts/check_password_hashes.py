@@ -0,0 +1,57 @@
+import asyncio
+from argparse import ArgumentParser
+from collections import Counter
+
+from odmantic import AIOEngine
+
+from src.auth import password_context
+from src.database import disconnect, get_engine
+from src.models import User
+
+
+async def count_password_schemes(
+    engine: AIOEngine,
+) -> tuple[Counter[str], list[str]]:
+    """Count password hashes of users by scheme.
+
+    Returns the counts, and usernames of users with hashes needing update,
+    in deprecated schemes or with outdated parameters.
+    """
+    users = engine.get_collection(User)
+    schemes: Counter[str] = Counter()
+    outdated = []
+    projection = {"_id": False, "username": True, "hashed_password": True}
+    async for user in users.find({}, projection):
+        hashed_password = user["hashed_password"]
+        schemes[password_context.identify(hashed_password) or "unknown"] += 1
+        if password_context.needs_update(hashed_password):
+            outdated.append(user["username"])
+    return schemes, outdated
+
+
+async def main(list_users=False):
+    engine = await get_engine()
+    try:
+        schemes, outdated = await count_password_schemes(engine)
+    finally:
+        disconnect()
+    for scheme, count in schemes.most_common():
+        print(f"{scheme}: {count} users")
+    print(f"{len(outdated)} users have outdated password hashes.")
+    if list_users:
+        for username in outdated:
+            print(username)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        description="Report users with password hashes in deprecated schemes. "
+        "Hashes are updated when users log in, as that needs their passwords."
+    )
+    parser.add_argument(
+        "--list-users",
+        action="store_true",
+        help="print usernames of users with outdated hashes",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(**vars(args)))
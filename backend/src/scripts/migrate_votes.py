@@ -0,0 +1,102 @@
+import asyncio
+from argparse import ArgumentParser
+
+from odmantic import AIOEngine, Model
+from pymongo import UpdateOne
+
+from src.database import disconnect, get_engine
+from src.indexes import sync_indexes
+from src.models import Idea, User, Vote, VoteDirection
+from src.scripts.backfill_vote_counts import backfill_vote_counts
+from src.util import datetime_now
+
+# Lists of voted ids embedded in documents of each model. Users go first, their
+# lists win conflicts: votes used to rewrite whole lists of the idea, losing
+# concurrent votes, which were still kept by lists of the voters.
+EMBEDDED_VOTES: dict[type[Model], dict[str, VoteDirection]] = {
+    User: {"upvotes": "upvote", "downvotes": "downvote"},
+    Idea: {"upvoted_by": "upvote", "downvoted_by": "downvote"},
+}
+# Vote field referencing the document with lists, field referencing listed ids,
+# and model of listed ids.
+VOTE_REFERENCES: dict[type[Model], tuple[str, str, type[Model]]] = {
+    User: ("user_id", "idea_id", Idea),
+    Idea: ("idea_id", "user_id", User),
+}
+
+
+async def copy_embedded_votes(engine: AIOEngine, model: type[Model]) -> int:
+    """Create votes from embedded lists of documents of `model`.
+
+    Existing votes are not overwritten, votes of listed documents which don't
+    exist anymore are skipped.
+    """
+    lists = EMBEDDED_VOTES[model]
+    owner_field, listed_field, listed_model = VOTE_REFERENCES[model]
+    documents = engine.get_collection(model)
+    listed = engine.get_collection(listed_model)
+    votes = engine.get_collection(Vote)
+    has_votes = {"$or": [{f"{field}.0": {"$exists": True}} for field in lists]}
+    created = 0
+    async for document in documents.find(has_votes, dict.fromkeys(lists, True)):
+        ids = [id for field in lists for id in document.get(field, [])]
+        existing = {
+            found["_id"]
+            async for found in listed.find({"_id": {"$in": ids}}, {"_id": True})
+        }
+        requests = [
+            UpdateOne(
+                {owner_field: document["_id"], listed_field: id},
+                {
+                    "$setOnInsert": {
+                        "direction": direction,
+                        "created_at": datetime_now(),
+                    }
+                },
+                upsert=True,
+            )
+            for field, direction in lists.items()
+            for id in document.get(field, [])
+            if id in existing
+        ]
+        if requests:
+            result = await votes.bulk_write(requests, ordered=False)
+            created += result.upserted_count
+    return created
+
+
+async def remove_embedded_votes(engine: AIOEngine):
+    for model, lists in EMBEDDED_VOTES.items():
+        await engine.get_collection(model).update_many(
+            {}, {"$unset": dict.fromkeys(lists, "")}
+        )
+
+
+async def main(keep_embedded=False):
+    engine = await get_engine()
+    try:
+        print("Configuring indexes.")
+        await sync_indexes(engine)
+        for model in EMBEDDED_VOTES:
+            created = await copy_embedded_votes(engine, model)
+            print(f"Created {created} votes from {model.__name__} lists.")
+        modified = await backfill_vote_counts(engine)
+        print(f"Updated vote counts of {modified} ideas.")
+        if not keep_embedded:
+            await remove_embedded_votes(engine)
+            print("Removed embedded votes lists.")
+    finally:
+        disconnect()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        description="Move votes embedded in ideas and users to the votes collection."
+    )
+    parser.add_argument(
+        "--keep-embedded",
+        action="store_true",
+        help="don't remove embedded votes lists after migrating them",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(**vars(args)))
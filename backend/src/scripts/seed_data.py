@@ -6,8 +6,9 @@ from odmantic import ObjectId
 from odmantic.exceptions import DuplicateKeyError
 
 from src.auth import get_password_hash
-from src.database import get_engine
-from src.models import Idea, User
+from src.database import disconnect, get_engine
+from src.indexes import sync_indexes
+from src.models import Idea, User, Vote
 
 fake = Faker()
 
@@ -46,14 +47,14 @@ async def seed_users(num_users: int = 10):
     return users
 
 
-def create_votes(users: dict[ObjectId, User]) -> dict[ObjectId, User]:
+def create_voters(users: dict[ObjectId, User]) -> dict[ObjectId, User]:
     return {
         user_id: users[user_id]
         for user_id in fake.random_elements(list(users), unique=True)
     }
 
 
-def create_idea(user_lookup: dict[ObjectId, User]) -> Idea:
+def create_idea(user_lookup: dict[ObjectId, User]) -> tuple[Idea, list[Vote]]:
     user_ids = list(user_lookup)
     creator_id = fake.random_element(user_ids)
     new_idea = Idea.model_validate(
@@ -64,30 +65,39 @@ def create_idea(user_lookup: dict[ObjectId, User]) -> Idea:
         }
     )
 
-    for voter_id, voter in create_votes(user_lookup).items():
-        if voter_id != creator_id:
-            did_upvote = fake.random_element([True, False])
-            if did_upvote:
-                new_idea.upvoted_by.append(voter_id)
-                voter.upvotes.append(new_idea.id)
-            else:  # downvote
-                new_idea.downvoted_by.append(voter_id)
-                voter.downvotes.append(new_idea.id)
-    return new_idea
-
-
-def create_ideas(users: list[User], num_ideas: int = 20) -> list[Idea]:
+    votes = [
+        Vote(
+            user_id=voter_id,
+            idea_id=new_idea.id,
+            direction=fake.random_element(["downvote", "upvote"]),
+        )
+        for voter_id in create_voters(user_lookup)
+        if voter_id != creator_id
+    ]
+    new_idea.upvote_count = sum(vote.direction == "upvote" for vote in votes)
+    new_idea.downvote_count = len(votes) - new_idea.upvote_count
+    return new_idea, votes
+
+
+def create_ideas(
+    users: list[User], num_ideas: int = 20
+) -> tuple[list[Idea], list[Vote]]:
     user_lookup = {user.id: user for user in users}
-    new_ideas = [create_idea(user_lookup) for _ in range(num_ideas)]
-    return new_ideas
+    new_ideas = []
+    new_votes = []
+    for _ in range(num_ideas):
+        idea, votes = create_idea(user_lookup)
+        new_ideas.append(idea)
+        new_votes.extend(votes)
+    return new_ideas, new_votes
 
 
 async def seed_ideas():
     engine = await get_engine()
     users = await engine.find(User)
-    ideas = create_ideas(users)
+    ideas, votes = create_ideas(users)
     await engine.save_all(ideas)
-    await engine.save_all(users)
+    await engine.save_all(votes)
 
 
 async def purge_data():
@@ -95,19 +105,23 @@ async def purge_data():
     print("Dropping collections.")
     await engine.get_collection(Idea).drop()
     await engine.get_collection(User).drop()
+    await engine.get_collection(Vote).drop()
     print("Configuring collections.")
-    await engine.configure_database((Idea, User))
+    await sync_indexes(engine)
 
 
 async def main(purge=True):
-    if purge:
-        print("Pruning database.")
-        await purge_data()
-    users = await seed_users()
-    if not users:
-        raise RuntimeError("No user ids found in the database; cannot seed ideas.")
-    await seed_ideas()
-    print("Database seeded successfully.")
+    try:
+        if purge:
+            print("Pruning database.")
+            await purge_data()
+        users = await seed_users()
+        if not users:
+            raise RuntimeError("No user ids found in the database; cannot seed ideas.")
+        await seed_ideas()
+        print("Database seeded successfully.")
+    finally:
+        disconnect()
 
 
 if __name__ == "__main__":
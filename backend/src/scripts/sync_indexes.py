@@ -0,0 +1,47 @@
+import asyncio
+from argparse import ArgumentParser
+
+from src.database import disconnect, get_engine
+from src.indexes import IndexDiff, get_index_diffs, sync_indexes
+
+
+def print_diff(diff: IndexDiff):
+    if diff.is_synced:
+        print(f"{diff.collection}: indexes in sync.")
+        return
+    for index in diff.missing:
+        print(f"{diff.collection}: missing {index.document['name']}")
+    for index in diff.changed:
+        print(f"{diff.collection}: outdated {index.document['name']}")
+    for name in diff.extra:
+        print(f"{diff.collection}: undeclared {name}")
+
+
+async def main(dry_run=False, drop_extra=False):
+    engine = await get_engine()
+    try:
+        if dry_run:
+            diffs = await get_index_diffs(engine)
+        else:
+            diffs = await sync_indexes(engine, drop_extra=drop_extra)
+        for diff in diffs:
+            print_diff(diff)
+        if not dry_run:
+            print("Indexes synced.")
+    finally:
+        disconnect()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        description="Compare indexes in database with src.indexes.INDEXES, "
+        "and create missing ones."
+    )
+    parser.add_argument(
+        "-n", "--dry-run", action="store_true", help="only show differences"
+    )
+    parser.add_argument(
+        "--drop-extra", action="store_true", help="drop undeclared indexes"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(**vars(args)))
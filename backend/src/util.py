@@ -1,5 +1,14 @@
 from datetime import UTC, datetime
 
+from odmantic import Model
+
 
 def datetime_now():
     return datetime.now(UTC)
+
+
+def mark_unmodified[T: Model](instance: T) -> T:
+    """Mark fields of `instance` as not modified, like odmantic does for documents
+    it loads, so saving it writes only fields changed afterwards."""
+    object.__setattr__(instance, "__fields_modified__", set())
+    return instance
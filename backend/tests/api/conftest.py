@@ -5,11 +5,10 @@ import pytest
 from fastapi import Request
 from httpx import ASGITransport, AsyncClient
 from httpx import Request as HttpxRequest
-from odmantic import ObjectId
 from odmantic.session import AIOSession
 
-from src.auth import create_access_token
-from src.csrf import verify_csrf
+from src.auth import create_access_token, token_claims
+from src.csrf import csrf_protect
 from src.database import get_db
 from src.main import app
 from src.models import Idea, User
@@ -19,18 +18,16 @@ type LogInClientFunc = Callable[[User], AsyncClient]
 
 
 @pytest.fixture
-def test_transport(real_db: AIOSession) -> Generator[ASGITransport]:
+def test_transport(real_db: AIOSession, monkeypatch) -> Generator[ASGITransport]:
     async def csrf_override(_request: Request):
         """Pass through all test request."""
-        return True
 
     app.dependency_overrides[get_db] = lambda: real_db
-    app.dependency_overrides[verify_csrf] = csrf_override
+    monkeypatch.setattr(csrf_protect, "validate_csrf", csrf_override)
 
     yield ASGITransport(app=app)
 
     app.dependency_overrides[get_db] = get_db
-    app.dependency_overrides[verify_csrf] = verify_csrf
 
 
 @pytest.fixture
@@ -53,7 +50,7 @@ def log_client_as(async_client: AsyncClient, patch_jwt_secret_key) -> LogInClien
     patch_jwt_secret_key()
 
     def wrapper(user: User):
-        access_token = create_access_token({"sub": str(user.id)})
+        access_token = create_access_token(token_claims(user))
         async_client.headers["Authorization"] = f"Bearer {access_token}"
         return async_client
 
@@ -121,7 +118,7 @@ async def ideas_with_fake_votes(
                 random.randint(0, max_votes) for _ in ideas[2:]
             ]
             for idea, votes in zip(ideas, users_to_vote, strict=True):
-                idea.upvoted_by = [ObjectId() for _ in range(votes)]
+                idea.upvote_count = votes
             await real_db.save_all(users)
             await real_db.save_all(ideas)
             yield ideas, max_votes
@@ -5,8 +5,9 @@ import jwt
 import pytest
 from httpx import AsyncClient
 
-from src.auth import JWT_ALGORITHM
+from src.auth import JWT_ALGORITHM, login_username_limiter
 from src.models import User
+from src.rate_limit import MemoryBackend, Rate
 from tests.data_sample import (
     user1,
     user_admin,
@@ -115,8 +116,8 @@ async def test_POST_auth_returns_user_me(
     assert user_data["name"] == user.name
     assert user_data["is_active"] == user.is_active
     assert user_data["is_admin"] == user.is_admin
-    assert set(user_data["upvotes"]) == {str(idea_id) for idea_id in user.upvotes}
-    assert set(user_data["downvotes"]) == {str(idea_id) for idea_id in user.downvotes}
+    assert user_data["upvotes"] == []
+    assert user_data["downvotes"] == []
 
 
 @pytest.mark.integration
@@ -182,6 +183,21 @@ async def test_POST_auth_returns_401_for_invalid(
     assert response.headers["www-authenticate"].casefold() == "bearer"
 
 
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_POST_auth_returns_429_after_too_many_attempts_for_username(
+    async_client: AsyncClient, monkeypatch
+):
+    monkeypatch.setattr(login_username_limiter, "rate", Rate(2, 60))
+    monkeypatch.setattr(login_username_limiter, "backend", MemoryBackend(10))
+    credentials = {"username": user1.username, "password": "wrong password"}
+
+    responses = [await async_client.post(AUTH, data=credentials) for _ in range(3)]
+
+    assert [response.status_code for response in responses] == [401, 401, 429]
+    assert int(responses[2].headers["retry-after"]) > 0
+
+
 @pytest.mark.integration
 @pytest.mark.anyio
 async def test_POST_auth_returns_422_for_missing_credentials(
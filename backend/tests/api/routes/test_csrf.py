@@ -4,7 +4,7 @@ import pytest
 from fastapi.requests import Request
 from httpx import ASGITransport, AsyncClient
 
-from src.csrf import verify_csrf
+from src.csrf import csrf_protect
 from src.database import get_db
 from src.main import app
 
@@ -44,7 +44,7 @@ async def test_GET_get_token_sets_cookie_on_response(
 
 @pytest.mark.anyio
 @pytest.mark.parametrize("method", ["DELETE", "PATCH", "POST", "PUT"])
-async def test_GET_get_token_returns_token_and_cookie_passing_verify_csrf(
+async def test_GET_get_token_returns_token_and_cookie_passing_validation(
     async_client_with_csrf: AsyncClient, method
 ):
     response = await async_client_with_csrf.get(GET_TOKEN)
@@ -61,6 +61,4 @@ async def test_GET_get_token_returns_token_and_cookie_passing_verify_csrf(
         }
     )
 
-    result = await verify_csrf(request)
-
-    assert result is True
+    await csrf_protect.validate_csrf(request)
@@ -1,3 +1,4 @@
+import json
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 from datetime import datetime
@@ -8,10 +9,12 @@ from httpx import AsyncClient
 from odmantic import ObjectId, query
 from odmantic.session import AIOSession
 
-from src.models import Idea, IdeaDownvote, IdeaUpvote, User
+from src.api.util import find_one_flights
+from src.models import Idea, IdeaDownvote, IdeaUpvote, User, Vote
 from src.util import datetime_now
 from tests.util import (
     add_votes,
+    count_votes,
     create_idea,
     create_user,
     setup_idea,
@@ -54,25 +57,45 @@ async def idea_to_delete_with_votes(real_db: AIOSession, user: User, request):
         idea = create_idea(user)
         users = [create_user() for _ in range(10)]
 
-        add_votes(users, idea, max_upvotes)
+        votes = add_votes(users, idea, max_upvotes)
 
         await real_db.save_all(users)
+        await real_db.save_all(votes)
         await real_db.save(idea)
         yield idea
 
         await real_db.remove(User, query.in_(User.id, {user.id for user in users}))
+        await real_db.remove(Vote, Vote.idea_id == idea.id)
 
 
 async def setup_upvote(real_db: AIOSession, idea: Idea, user: User):
-    idea.upvoted_by.append(user.id)
-    user.upvotes.append(idea.id)
-    await real_db.save_all((idea, user))
+    count_votes(idea, UPVOTE, 1)
+    await real_db.save_all(
+        (idea, Vote(user_id=user.id, idea_id=idea.id, direction=UPVOTE))
+    )
 
 
 async def setup_downvote(real_db: AIOSession, idea: Idea, user: User):
-    idea.downvoted_by.append(user.id)
-    user.downvotes.append(idea.id)
-    await real_db.save_all((idea, user))
+    count_votes(idea, DOWNVOTE, 1)
+    await real_db.save_all(
+        (idea, Vote(user_id=user.id, idea_id=idea.id, direction=DOWNVOTE))
+    )
+
+
+def expected_counts(idea: Idea, setup, direction) -> tuple[int, int]:
+    """Expected upvote and downvote counts of the idea, after voting."""
+    upvote_count, downvote_count = idea.upvote_count, idea.downvote_count
+    if direction == UPVOTE:
+        upvote_count += setup is not setup_upvote
+        downvote_count -= setup is setup_downvote
+    else:
+        downvote_count += setup is not setup_downvote
+        upvote_count -= setup is setup_upvote
+    return upvote_count, downvote_count
+
+
+async def find_user_votes(real_db: AIOSession, user: User, idea: Idea) -> list[Vote]:
+    return await real_db.find(Vote, Vote.user_id == user.id, Vote.idea_id == idea.id)
 
 
 UPVOTE_CASES = [
@@ -175,7 +198,6 @@ async def test_PUT_upvote_idea_returns_upvoted_idea(
     setup,
 ):
     user, async_client = user_with_client
-    user_id = str(user.id)
     if setup is not None:
         await setup(real_db, idea_with_votes, user)
     vote = IdeaUpvote(idea_id=idea_with_votes.id)
@@ -186,18 +208,13 @@ async def test_PUT_upvote_idea_returns_upvoted_idea(
     data = response.json()
 
     assert response.status_code == 200
-    assert user_id in data["upvoted_by"]
-    assert user_id not in data["downvoted_by"]
+    assert (data["upvote_count"], data["downvote_count"]) == expected_counts(
+        idea_with_votes, setup, UPVOTE
+    )
 
     assert data["name"] == idea_with_votes.name
     assert data["description"] == idea_with_votes.description
     assert data["creator_id"] == str(idea_with_votes.creator_id)
-    assert set(data["downvoted_by"]) == {
-        str(user_id) for user_id in idea_with_votes.downvoted_by
-    } - {user_id}
-    assert set(data["upvoted_by"]) == {
-        str(user_id) for user_id in idea_with_votes.upvoted_by
-    } | {user_id}
 
     assert datetime.fromisoformat(data["created_at"]) == idea_with_votes.created_at
 
@@ -233,10 +250,10 @@ async def test_PUT_upvote_idea_updates_idea_in_db(
     updated_idea = await real_db.find_one(Idea, Idea.id == idea_with_votes.id)
 
     assert updated_idea is not None
-    assert set(updated_idea.upvoted_by) == set(idea_with_votes.upvoted_by) | {user.id}
-    assert set(updated_idea.downvoted_by) == set(idea_with_votes.downvoted_by) - {
-        user.id
-    }
+    assert (
+        updated_idea.upvote_count,
+        updated_idea.downvote_count,
+    ) == expected_counts(idea_with_votes, setup, UPVOTE)
 
     assert updated_idea.name == idea_with_votes.name
     assert updated_idea.description == idea_with_votes.description
@@ -289,7 +306,7 @@ async def test_PUT_upvote_idea_does_not_update_modified_at(
     [0, 5, 10],
     indirect=True,
 )
-async def test_PUT_upvote_idea_updates_user_in_db(
+async def test_PUT_upvote_idea_saves_user_vote_in_db(
     real_db: AIOSession,
     idea_with_votes: Idea,
     user_with_client: tuple[User, AsyncClient],
@@ -306,17 +323,9 @@ async def test_PUT_upvote_idea_updates_user_in_db(
 
     assert response.status_code == 200
 
-    updated_user = await real_db.find_one(User, User.id == user.id)
-
-    assert updated_user is not None
-    assert set(updated_user.downvotes) == set(user.downvotes) - {idea_with_votes.id}
-    assert set(updated_user.upvotes) == set(user.upvotes) | {idea_with_votes.id}
+    [user_vote] = await find_user_votes(real_db, user, idea_with_votes)
 
-    assert updated_user.name == user.name
-    assert updated_user.username == user.username
-    assert updated_user.is_admin == user.is_admin
-    assert updated_user.is_active == user.is_active
-    assert updated_user.hashed_password == user.hashed_password
+    assert user_vote.direction == UPVOTE
 
 
 @pytest.mark.integration
@@ -391,7 +400,6 @@ async def test_PUT_downvote_idea_returns_downvoted_idea(
     setup,
 ):
     user, async_client = user_with_client
-    user_id = str(user.id)
     if setup is not None:
         await setup(real_db, idea_with_votes, user)
     vote = IdeaDownvote(idea_id=idea_with_votes.id)
@@ -402,18 +410,13 @@ async def test_PUT_downvote_idea_returns_downvoted_idea(
     data = response.json()
 
     assert response.status_code == 200
-    assert user_id in data["downvoted_by"]
-    assert user_id not in data["upvoted_by"]
+    assert (data["upvote_count"], data["downvote_count"]) == expected_counts(
+        idea_with_votes, setup, DOWNVOTE
+    )
 
     assert data["name"] == idea_with_votes.name
     assert data["description"] == idea_with_votes.description
     assert data["creator_id"] == str(idea_with_votes.creator_id)
-    assert set(data["downvoted_by"]) == {
-        str(user_id) for user_id in idea_with_votes.downvoted_by
-    } | {user_id}
-    assert set(data["upvoted_by"]) == {
-        str(user_id) for user_id in idea_with_votes.upvoted_by
-    } - {user_id}
 
     assert datetime.fromisoformat(data["created_at"]) == idea_with_votes.created_at
 
@@ -449,10 +452,10 @@ async def test_PUT_downvote_idea_updates_idea_in_db(
     updated_idea = await real_db.find_one(Idea, Idea.id == idea_with_votes.id)
 
     assert updated_idea is not None
-    assert set(updated_idea.downvoted_by) == set(idea_with_votes.downvoted_by) | {
-        user.id
-    }
-    assert set(updated_idea.upvoted_by) == set(idea_with_votes.upvoted_by) - {user.id}
+    assert (
+        updated_idea.upvote_count,
+        updated_idea.downvote_count,
+    ) == expected_counts(idea_with_votes, setup, DOWNVOTE)
 
     assert updated_idea.name == idea_with_votes.name
     assert updated_idea.description == idea_with_votes.description
@@ -505,7 +508,7 @@ async def test_PUT_downvote_idea_does_not_update_modified_at(
     [0, 5, 10],
     indirect=True,
 )
-async def test_PUT_downvote_idea_updates_user_in_db(
+async def test_PUT_downvote_idea_saves_user_vote_in_db(
     real_db: AIOSession,
     idea_with_votes: Idea,
     user_with_client: tuple[User, AsyncClient],
@@ -522,17 +525,9 @@ async def test_PUT_downvote_idea_updates_user_in_db(
 
     assert response.status_code == 200
 
-    updated_user = await real_db.find_one(User, User.id == user.id)
+    [user_vote] = await find_user_votes(real_db, user, idea_with_votes)
 
-    assert updated_user is not None
-    assert set(updated_user.downvotes) == set(user.downvotes) | {idea_with_votes.id}
-    assert set(updated_user.upvotes) == set(user.upvotes) - {idea_with_votes.id}
-
-    assert updated_user.name == user.name
-    assert updated_user.username == user.username
-    assert updated_user.is_admin == user.is_admin
-    assert updated_user.is_active == user.is_active
-    assert updated_user.hashed_password == user.hashed_password
+    assert user_vote.direction == DOWNVOTE
 
 
 @pytest.mark.integration
@@ -631,12 +626,188 @@ async def test_GET_ideas_id_returns_idea_data(
     assert data["name"] == idea_with_votes.name
     assert data["description"] == idea_with_votes.description
     assert data["creator_id"] == str(idea_with_votes.creator_id)
-    assert set(data["upvoted_by"]) == {
-        str(user_id) for user_id in idea_with_votes.upvoted_by
-    }
-    assert set(data["downvoted_by"]) == {
-        str(user_id) for user_id in idea_with_votes.downvoted_by
-    }
+    assert data["upvote_count"] == idea_with_votes.upvote_count
+    assert data["downvote_count"] == idea_with_votes.downvote_count
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ("setup", "expected"),
+    [
+        pytest.param(None, None, id="not voted"),
+        pytest.param(setup_upvote, UPVOTE, id="upvoted"),
+        pytest.param(setup_downvote, DOWNVOTE, id="downvoted"),
+    ],
+)
+@pytest.mark.parametrize("idea_with_votes", [5], indirect=True)
+async def test_GET_ideas_id_returns_my_vote_of_logged_in_user(
+    real_db: AIOSession,
+    user_with_client: tuple[User, AsyncClient],
+    idea_with_votes: Idea,
+    setup,
+    expected,
+):
+    user, async_client = user_with_client
+    if setup is not None:
+        await setup(real_db, idea_with_votes, user)
+
+    response = await async_client.get(f"/ideas/{idea_with_votes.id}")
+    data = response.json()
+
+    assert data["my_vote"] == expected
+    assert "upvoted_by" not in data
+    assert "downvoted_by" not in data
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+@pytest.mark.parametrize("idea_with_votes", [0, 5, 10], indirect=True)
+async def test_GET_ideas_id_with_voters_returns_ids_of_voters(
+    real_db: AIOSession, async_client: AsyncClient, idea_with_votes: Idea
+):
+    votes = await real_db.find(Vote, Vote.idea_id == idea_with_votes.id)
+
+    response = await async_client.get(
+        f"/ideas/{idea_with_votes.id}", params={"voters": True}
+    )
+    data = response.json()
+
+    assert data["my_vote"] is None
+    for direction, voters in ((UPVOTE, "upvoted_by"), (DOWNVOTE, "downvoted_by")):
+        assert set(data[voters]) == {
+            str(vote.user_id) for vote in votes if vote.direction == direction
+        }
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+@pytest.mark.parametrize("idea_with_votes", [5], indirect=True)
+async def test_GET_ideas_returns_my_vote_of_logged_in_user(
+    real_db: AIOSession,
+    user_with_client: tuple[User, AsyncClient],
+    idea_with_votes: Idea,
+):
+    user, async_client = user_with_client
+    await setup_upvote(real_db, idea_with_votes, user)
+
+    response = await async_client.get("/ideas/", params={"limit": 1000})
+    data = response.json()
+
+    my_votes = {idea["id"]: idea["my_vote"] for idea in data["data"]}
+    assert my_votes.pop(str(idea_with_votes.id)) == UPVOTE
+    assert set(my_votes.values()) <= {None}
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+@pytest.mark.parametrize("idea_with_votes", [5], indirect=True)
+async def test_GET_ideas_id_returns_304_if_etag_matches(
+    user_with_client: tuple[User, AsyncClient], idea_with_votes: Idea
+):
+    _, async_client = user_with_client
+    url = f"/ideas/{idea_with_votes.id}"
+    first = await async_client.get(url)
+
+    response = await async_client.get(
+        url, headers={"If-None-Match": first.headers["etag"]}
+    )
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == first.headers["etag"]
+    assert response.headers["cache-control"] == "private, no-cache"
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+@pytest.mark.parametrize("idea_with_votes", [5], indirect=True)
+async def test_GET_ideas_id_returns_idea_with_new_etag_after_vote(
+    user_with_client: tuple[User, AsyncClient], idea_with_votes: Idea
+):
+    _, async_client = user_with_client
+    url = f"/ideas/{idea_with_votes.id}"
+    first = await async_client.get(url)
+    await async_client.put(f"{url}/upvote", json={"idea_id": str(idea_with_votes.id)})
+
+    response = await async_client.get(
+        url, headers={"If-None-Match": first.headers["etag"]}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["my_vote"] == UPVOTE
+    assert response.headers["etag"] != first.headers["etag"]
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_GET_ideas_returns_304_if_etag_matches(async_client: AsyncClient):
+    first = await async_client.get("/ideas/")
+
+    response = await async_client.get(
+        "/ideas/", headers={"If-None-Match": first.headers["etag"]}
+    )
+
+    assert response.status_code == 304
+    assert first.headers["etag"].startswith("W/")
+    assert response.headers["cache-control"] == "public, no-cache"
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "params",
+    [
+        pytest.param({"limit": 0}, id="zero limit"),
+        pytest.param({"limit": 1001}, id="limit over max"),
+        pytest.param({"skip": -1}, id="negative skip"),
+        pytest.param({"skip": 10_001}, id="skip over max"),
+    ],
+)
+async def test_GET_ideas_returns_422_if_pagination_is_out_of_range(
+    async_client: AsyncClient, params
+):
+    response = await async_client.get("/ideas/", params=params)
+
+    assert response.status_code == 422
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_GET_ideas_export_streams_all_ideas_as_ndjson(
+    real_db: AIOSession, user_with_client: tuple[User, AsyncClient]
+):
+    _, async_client = user_with_client
+    ideas = await real_db.find(Idea)
+
+    response = await async_client.get("/ideas/export")
+    lines = response.text.splitlines()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["id"] for line in lines] == sorted(
+        str(idea.id) for idea in ideas
+    )
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+@pytest.mark.parametrize("idea_with_votes", [5], indirect=True)
+async def test_GET_ideas_batch_returns_ideas_in_order_and_missing_ids(
+    user_with_client: tuple[User, AsyncClient], idea_with_votes: Idea
+):
+    _, async_client = user_with_client
+    missing = str(ObjectId())
+
+    response = await async_client.get(
+        "/ideas/batch", params={"ids": f"{missing},{idea_with_votes.id}"}
+    )
+    data = response.json()
+
+    assert response.status_code == 200
+    assert [idea["id"] for idea in data["data"]] == [str(idea_with_votes.id)]
+    assert data["data"][0]["upvote_count"] == idea_with_votes.upvote_count
+    assert data["missing"] == [missing]
 
 
 @pytest.mark.integration
@@ -694,25 +865,18 @@ async def test_DELETE_ideas_id_deletes_idea_from_db(
     assert deleted_idea is None
 
 
-@pytest.mark.xfail(reason="not implemented")
 @pytest.mark.integration
 @pytest.mark.anyio
-async def test_DELETE_ideas_id_deletes_votes_from_users(
+async def test_DELETE_ideas_id_deletes_votes_for_idea(
     real_db: AIOSession, admin_client: AsyncClient, idea_to_delete_with_votes: Idea
 ):
-    voted_by = (
-        idea_to_delete_with_votes.upvoted_by + idea_to_delete_with_votes.downvoted_by
-    )
-
     response = await admin_client.delete(f"/ideas/{idea_to_delete_with_votes.id}")
 
     assert response.status_code == 200
 
-    voters = await real_db.find(User, query.in_(User.id, set(voted_by)))
+    votes = await real_db.count(Vote, Vote.idea_id == idea_to_delete_with_votes.id)
 
-    for voter in voters:
-        assert idea_to_delete_with_votes.id not in voter.upvotes
-        assert idea_to_delete_with_votes.id not in voter.downvotes
+    assert votes == 0
 
 
 @pytest.mark.integration
@@ -768,12 +932,8 @@ async def test_PATCH_ideas_id_returns_idea_public_after_patch_for_admin(
         "description", idea_with_votes.description
     )
 
-    assert set(data["upvoted_by"]) == {
-        str(user_id) for user_id in idea_with_votes.upvoted_by
-    }
-    assert set(data["downvoted_by"]) == {
-        str(user_id) for user_id in idea_with_votes.downvoted_by
-    }
+    assert data["upvote_count"] == idea_with_votes.upvote_count
+    assert data["downvote_count"] == idea_with_votes.downvote_count
     assert data["creator_id"] == str(idea_with_votes.creator_id)
 
 
@@ -796,10 +956,8 @@ async def test_PATCH_ideas_id_returns_idea_public_after_patch_for_idea_creator(
         assert data["name"] == patch_data.get("name", idea.name)
         assert data["description"] == patch_data.get("description", idea.description)
 
-        assert set(data["upvoted_by"]) == {str(user_id) for user_id in idea.upvoted_by}
-        assert set(data["downvoted_by"]) == {
-            str(user_id) for user_id in idea.downvoted_by
-        }
+        assert data["upvote_count"] == idea.upvote_count
+        assert data["downvote_count"] == idea.downvote_count
         assert data["creator_id"] == str(idea.creator_id)
         assert datetime.fromisoformat(data["created_at"]) == idea.created_at
 
@@ -831,14 +989,51 @@ async def test_PATCH_ideas_id_updates_idea_in_db_for_admin(
         "description", idea_with_votes.description
     )
 
-    assert set(updated_idea.upvoted_by) == set(idea_with_votes.upvoted_by)
-    assert set(updated_idea.downvoted_by) == set(idea_with_votes.downvoted_by)
+    assert updated_idea.upvote_count == idea_with_votes.upvote_count
+    assert updated_idea.downvote_count == idea_with_votes.downvote_count
     assert updated_idea.creator_id == idea_with_votes.creator_id
 
     assert updated_idea.created_at == idea_with_votes.created_at
     assert datetime_now() > updated_idea.modified_at > idea_with_votes.modified_at
 
 
+@pytest.mark.integration
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "idea_with_votes",
+    [10],
+    indirect=True,
+)
+async def test_PATCH_ideas_id_keeps_votes_counted_after_idea_was_read(
+    real_db: AIOSession,
+    admin_client: AsyncClient,
+    idea_with_votes: Idea,
+    monkeypatch,
+):
+    find_one = find_one_flights.run
+
+    async def find_one_then_vote(key, call):
+        document = await find_one(key, call)
+        await real_db.engine.get_collection(Idea).update_one(
+            {"_id": idea_with_votes.id}, {"$inc": {"upvote_count": 1}}
+        )
+        return document
+
+    monkeypatch.setattr(find_one_flights, "run", find_one_then_vote)
+
+    response = await admin_client.patch(
+        f"/ideas/{idea_with_votes.id}", json={"name": IDEA_PATCH_DATA["name"]}
+    )
+
+    assert response.status_code == 200
+
+    updated_idea = await real_db.find_one(Idea, Idea.id == idea_with_votes.id)
+
+    assert updated_idea is not None
+    assert updated_idea.name == IDEA_PATCH_DATA["name"]
+    assert updated_idea.upvote_count == idea_with_votes.upvote_count + 1
+
+
 @pytest.mark.integration
 @pytest.mark.anyio
 @pytest.mark.parametrize(
@@ -863,8 +1058,8 @@ async def test_PATCH_ideas_id_updates_idea_in_db_for_idea_creator(
             "description", idea.description
         )
 
-        assert set(updated_idea.upvoted_by) == set(idea.upvoted_by)
-        assert set(updated_idea.downvoted_by) == set(idea.downvoted_by)
+        assert updated_idea.upvote_count == idea.upvote_count
+        assert updated_idea.downvote_count == idea.downvote_count
         assert updated_idea.creator_id == idea.creator_id
 
         assert updated_idea.created_at == idea.created_at
@@ -953,8 +1148,8 @@ async def test_POST_create_idea_returns_idea(
         assert response.status_code == 200
         assert data["name"] == test_idea_create["name"]
         assert data["description"] == test_idea_create["description"]
-        assert data["upvoted_by"] == []
-        assert data["downvoted_by"] == []
+        assert data["upvote_count"] == 0
+        assert data["downvote_count"] == 0
         assert data["creator_id"] == str(user.id)
 
 
@@ -987,8 +1182,8 @@ async def test_POST_create_idea_creates_idea_in_db(
         assert db_idea is not None
         assert db_idea.name == test_idea_create["name"]
         assert db_idea.description == test_idea_create["description"]
-        assert db_idea.upvoted_by == []
-        assert db_idea.downvoted_by == []
+        assert db_idea.upvote_count == 0
+        assert db_idea.downvote_count == 0
         assert db_idea.creator_id == user.id
 
 
@@ -1009,3 +1204,37 @@ async def test_POST_create_idea_returns_422_when_invalid_data(
         response = await async_client.post("/ideas/", json=invalid_idea)
 
         assert response.status_code == 422
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "fields", ["id,name,upvote_count,downvote_count", "name", "id,my_vote"]
+)
+@pytest.mark.parametrize("ideas_with_fake_votes", [5], indirect=True)
+async def test_GET_ideas_with_fields_returns_only_requested_fields(
+    user_with_client: tuple[User, AsyncClient],
+    ideas_with_fake_votes: tuple[list[Idea], int],
+    fields,
+):
+    _ = ideas_with_fake_votes
+    _, async_client = user_with_client
+
+    response = await async_client.get("/ideas/", params={"fields": fields})
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data["data"]
+    for idea in data["data"]:
+        assert idea.keys() == set(fields.split(","))
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+@pytest.mark.parametrize("fields", ["", "name,score", "hashed_password"])
+async def test_GET_ideas_with_invalid_fields_returns_422(
+    async_client: AsyncClient, fields
+):
+    response = await async_client.get("/ideas/", params={"fields": fields})
+
+    assert response.status_code == 422
@@ -5,7 +5,7 @@ import pytest
 from httpx import AsyncClient
 from odmantic.session import AIOSession
 
-from src.auth import verify_password
+from src.auth import token_versions, user_cache, verify_password
 from src.models import Idea, User
 from src.util import datetime_now
 from tests.util import setup_idea, setup_ideas, setup_users, setup_votes
@@ -24,16 +24,15 @@ ME = "/me"
 ME_IDEAS = "/me/ideas/"
 ME_UPVOTES = "/me/upvotes/"
 ME_DOWNVOTES = "/me/downvotes/"
+REFRESH = "/refresh"
 
 
 def assert_idea_matches_returned(idea: Idea, returned_idea):
     assert str(idea.id) == returned_idea["id"]
     assert idea.name == returned_idea["name"]
     assert idea.description == returned_idea["description"]
-    assert [str(user_id) for user_id in idea.upvoted_by] == returned_idea["upvoted_by"]
-    assert [str(user_id) for user_id in idea.downvoted_by] == returned_idea[
-        "downvoted_by"
-    ]
+    assert idea.upvote_count == returned_idea["upvote_count"]
+    assert idea.downvote_count == returned_idea["downvote_count"]
     assert str(idea.creator_id) == returned_idea["creator_id"]
 
 
@@ -80,6 +79,22 @@ async def test_GET_me_returns_expected_user_info_for_logged_in_active(
     assert data["id"] == str(user.id)
 
 
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_GET_me_returns_304_if_etag_matches(
+    user_with_client: tuple[User, AsyncClient],
+):
+    _, async_client = user_with_client
+    first = await async_client.get(ME)
+
+    response = await async_client.get(
+        ME, headers={"If-None-Match": first.headers["etag"]}
+    )
+
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == "private, no-cache"
+
+
 @pytest.mark.integration
 @pytest.mark.anyio
 async def test_GET_me_does_not_return_hashed_password_in_response(
@@ -174,6 +189,88 @@ async def test_PATCH_me_changes_name_with_password_when_old_password_is_correct(
     )
 
 
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_PATCH_me_with_new_password_revokes_issued_tokens(
+    real_db: AIOSession, user_with_client: tuple[User, AsyncClient]
+):
+    user, async_client = user_with_client
+    new_password_data = {
+        "old_password": PASSWORD,
+        "new_password": "completely new password",
+    }
+
+    response = await async_client.patch(ME, json=new_password_data)
+    updated_user = await real_db.find_one(User, User.id == user.id)
+
+    assert response.status_code == 200
+    assert updated_user is not None
+    assert updated_user.token_version == user.token_version + 1
+    assert (await async_client.get(ME)).status_code == 401
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_PATCH_me_with_new_password_sets_new_refresh_token_cookie(
+    user_with_client: tuple[User, AsyncClient],
+):
+    _, async_client = user_with_client
+    new_password_data = {
+        "old_password": PASSWORD,
+        "new_password": "completely new password",
+    }
+
+    response = await async_client.patch(ME, json=new_password_data)
+    assert response.cookies.get("refresh_token") is not None
+
+    refreshed = await async_client.get(REFRESH)
+    assert refreshed.status_code == 200
+    access_token = refreshed.json()["access_token"]
+    async_client.headers["Authorization"] = f"Bearer {access_token}"
+
+    assert (await async_client.get(ME)).status_code == 200
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_PATCH_me_with_outdated_cached_user_keeps_changes_made_meanwhile(
+    real_db: AIOSession, user_with_client: tuple[User, AsyncClient], monkeypatch
+):
+    user, async_client = user_with_client
+    monkeypatch.setattr(user_cache, "ttl", 30)
+    monkeypatch.setattr(token_versions, "ttl", 30)
+    await async_client.get(ME)
+    # Changed by another worker, cache of this one isn't invalidated.
+    await real_db.engine.get_collection(User).update_one(
+        {"_id": user.id}, {"$set": {"is_active": False}, "$inc": {"token_version": 1}}
+    )
+
+    response = await async_client.patch(ME, json=NEW_NAME_DATA[0])
+    updated_user = await real_db.find_one(User, User.id == user.id)
+
+    assert response.status_code == 200
+    assert updated_user is not None
+    assert updated_user.name == NEW_NAME_DATA[0]["name"]
+    assert updated_user.is_active is False
+    assert updated_user.token_version == user.token_version + 1
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_PATCH_me_without_new_password_keeps_issued_tokens(
+    real_db: AIOSession, user_with_client: tuple[User, AsyncClient]
+):
+    user, async_client = user_with_client
+
+    response = await async_client.patch(ME, json=NEW_NAME_DATA[0])
+    updated_user = await real_db.find_one(User, User.id == user.id)
+
+    assert "refresh_token" not in response.cookies
+    assert updated_user is not None
+    assert updated_user.token_version == user.token_version
+    assert (await async_client.get(ME)).status_code == 200
+
+
 @pytest.mark.integration
 @pytest.mark.anyio
 @pytest.mark.parametrize(
@@ -341,7 +438,9 @@ async def test_GET_me_upvotes_returns_upvoted_ideas_and_total_count(
 
         assert data["count"] == votes_count
         assert {str(idea.id) for idea in voted} == upvoted_ids
-        assert {str(idea_id) for idea_id in user.upvotes} == upvoted_ids
+
+        me_response = await async_client.get(ME)
+        assert set(me_response.json()["upvotes"]) == upvoted_ids
 
 
 @pytest.mark.integration
@@ -369,7 +468,9 @@ async def test_GET_me_downvotes_returns_downvoted_ideas_and_total_count(
 
         assert data["count"] == votes_count
         assert {str(idea.id) for idea in voted} == downvoted_ids
-        assert {str(idea_id) for idea_id in user.downvotes} == downvoted_ids
+
+        me_response = await async_client.get(ME)
+        assert set(me_response.json()["downvotes"]) == downvoted_ids
 
 
 @pytest.mark.integration
@@ -0,0 +1,13 @@
+import pytest
+from httpx import AsyncClient
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_GET_metrics_returns_stats_of_components(admin_client: AsyncClient):
+    response = await admin_client.get("/metrics")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert {"password_hashing", "idea_counts"} <= data.keys()
+    assert {"running", "queued", "rejected"} <= data["password_hashing"].keys()
@@ -6,6 +6,7 @@ from httpx import AsyncClient
 from odmantic import ObjectId, query
 from odmantic.session import AIOSession
 
+from src.api.util import find_one_flights
 from src.auth import get_current_user, verify_password
 from src.models import Idea, User
 from src.util import datetime_now
@@ -61,14 +62,12 @@ PATCH_DATA_WITH_INITIAL_USER_OPTIONS = [
     ),
 ]
 
-USER_ME_ATTRIBUTES = (
+USER_ADMIN_ATTRIBUTES = (
     "id",
     "username",
     "name",
     "is_admin",
     "is_active",
-    "upvotes",
-    "downvotes",
     "created_at",
     "modified_at",
 )
@@ -285,7 +284,7 @@ async def test_GET_users_returns_users_with_user_me(
         if len(users) > 0:
             user = users[0]
 
-            for key in USER_ME_ATTRIBUTES:
+            for key in USER_ADMIN_ATTRIBUTES:
                 assert key in user
 
 
@@ -341,8 +340,6 @@ async def test_GET_users_id_returns_user_me(
     assert data["name"] == user.name
     assert data["is_active"] is user.is_active
     assert data["is_admin"] is user.is_admin
-    assert data["downvotes"] == []
-    assert data["upvotes"] == []
 
 
 @pytest.mark.integration
@@ -356,6 +353,41 @@ async def test_GET_users_id_does_not_return_hashed_password(
     assert "hashed_password" not in data
 
 
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_GET_users_public_returns_names_in_order_and_missing_ids(
+    async_client: AsyncClient, user: User
+):
+    missing = str(ObjectId())
+
+    response = await async_client.get(
+        "/users/public", params={"ids": f"{missing},{user.id}"}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "users": [{"id": str(user.id), "name": user.name}],
+        "count": 1,
+        "missing": [missing],
+    }
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_GET_users_id_returns_304_if_not_modified_since(
+    admin_client: AsyncClient, user: User
+):
+    first = await admin_client.get(url_for_user_id(user.id))
+
+    response = await admin_client.get(
+        url_for_user_id(user.id),
+        headers={"If-Modified-Since": first.headers["last-modified"]},
+    )
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == first.headers["etag"]
+
+
 @pytest.mark.integration
 @pytest.mark.anyio
 @pytest.mark.parametrize(
@@ -474,8 +506,8 @@ async def test_GET_users_id_ideas_returns_expected_idea_data_in_user_ideas(
     assert returned_idea["id"] == str(idea.id)
     assert returned_idea["name"] == idea.name
     assert returned_idea["description"] == idea.description
-    assert returned_idea["upvoted_by"] == []
-    assert returned_idea["downvoted_by"] == []
+    assert returned_idea["upvote_count"] == 0
+    assert returned_idea["downvote_count"] == 0
     assert returned_idea["creator_id"] == str(user.id)
 
 
@@ -541,12 +573,65 @@ async def test_PATCH_users_id_saves_changes_in_db(
     assert updated_user.name == patch_data.get("name", user.name)
 
     assert updated_user.username == user.username
-    assert updated_user.upvotes == user.upvotes
-    assert updated_user.downvotes == user.downvotes
 
     assert updated_user.created_at == user.created_at
 
 
+@pytest.mark.integration
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ("patch_data", "user"),
+    PATCH_DATA_WITH_INITIAL_USER_OPTIONS,
+    indirect=["user"],
+)
+async def test_PATCH_users_id_revokes_tokens_only_when_roles_change(
+    admin_client: AsyncClient, real_db: AIOSession, patch_data, user: User
+):
+    response = await admin_client.patch(url_for_user_id(user.id), json=patch_data)
+
+    assert response.status_code == 200
+
+    updated_user = await real_db.find_one(User, User.id == user.id)
+    roles_changed = any(
+        patch_data.get(name, getattr(user, name)) != getattr(user, name)
+        for name in ("is_active", "is_admin")
+    )
+
+    assert updated_user is not None
+    assert updated_user.token_version == user.token_version + roles_changed
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_PATCH_users_id_keeps_changes_made_after_user_was_read(
+    admin_client: AsyncClient, real_db: AIOSession, user: User, monkeypatch
+):
+    find_one = find_one_flights.run
+
+    async def find_one_then_revoke(key, call):
+        document = await find_one(key, call)
+        await real_db.engine.get_collection(User).update_one(
+            {"_id": user.id},
+            {"$inc": {"token_version": 1}, "$set": {"is_active": False}},
+        )
+        return document
+
+    monkeypatch.setattr(find_one_flights, "run", find_one_then_revoke)
+
+    response = await admin_client.patch(
+        url_for_user_id(user.id), json={"name": "Changed name"}
+    )
+
+    assert response.status_code == 200
+
+    updated_user = await real_db.find_one(User, User.id == user.id)
+
+    assert updated_user is not None
+    assert updated_user.name == "Changed name"
+    assert updated_user.token_version == user.token_version + 1
+    assert updated_user.is_active is False
+
+
 @pytest.mark.integration
 @pytest.mark.anyio
 @pytest.mark.parametrize(
@@ -587,7 +672,7 @@ async def test_PATCH_users_id_returns_user_me_after_patch(
     response = await admin_client.patch(url_for_user_id(user.id), json=patch_data)
     data = response.json()
 
-    for key in USER_ME_ATTRIBUTES:
+    for key in USER_ADMIN_ATTRIBUTES:
         assert key in data
 
 
@@ -637,8 +722,6 @@ async def test_PATCH_users_id_does_not_update_empty_optional_or_additional_data(
     assert data["name"] == user.name
     assert verify_password(OLD_PASSWORD, not_updated_user.hashed_password)
     assert not_updated_user.username == user.username
-    assert not_updated_user.upvotes == user.upvotes
-    assert not_updated_user.downvotes == user.downvotes
 
 
 @pytest.mark.integration
@@ -684,3 +767,30 @@ async def test_PATCH_users_id_does_not_return_hashed_password_in_user_data(
 
     assert response.status_code == 200
     assert "hashed_password" not in data
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+@pytest.mark.parametrize("fields", ["id,username", "name,is_active"])
+async def test_GET_users_with_fields_returns_only_requested_fields(
+    admin_client: AsyncClient, real_db: AIOSession, fields
+):
+    async with setup_users(real_db, 3):
+        response = await admin_client.get(USERS, params={"fields": fields})
+        data = response.json()
+
+    assert response.status_code == 200
+    assert data["users"]
+    for user in data["users"]:
+        assert user.keys() == set(fields.split(","))
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+@pytest.mark.parametrize("fields", ["hashed_password", "upvotes"])
+async def test_GET_users_with_not_allowed_fields_returns_422(
+    admin_client: AsyncClient, fields
+):
+    response = await admin_client.get(USERS, params={"fields": fields})
+
+    assert response.status_code == 422
@@ -0,0 +1,118 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from src.api.conditional import (
+    conditional_response,
+    etag_matches,
+    http_date,
+    is_not_modified,
+    make_etag,
+)
+
+MODIFIED_AT = datetime(2025, 5, 1, 12, 30, 15, 500000, tzinfo=UTC)
+
+
+def request_with(**headers: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "headers": [
+                (name.replace("_", "-").encode(), value.encode())
+                for name, value in headers.items()
+            ],
+        }
+    )
+
+
+def test_make_etag_changes_with_parts():
+    etag = make_etag("id", MODIFIED_AT, 1)
+
+    assert etag == make_etag("id", MODIFIED_AT, 1)
+    assert etag != make_etag("id", MODIFIED_AT, 2)
+    assert etag.startswith('"')
+    assert make_etag("id", weak=True).startswith('W/"')
+
+
+@pytest.mark.parametrize(
+    ("if_none_match", "expected"),
+    [
+        ('"a"', True),
+        ('W/"a"', True),
+        ('"b", "a"', True),
+        ("*", True),
+        ('"b"', False),
+        ('"a', False),
+    ],
+)
+def test_etag_matches_compares_tags_weakly(if_none_match, expected):
+    assert etag_matches(if_none_match, '"a"') is expected
+    assert etag_matches(if_none_match, 'W/"a"') is expected
+
+
+@pytest.mark.parametrize(
+    ("since", "expected"),
+    [
+        pytest.param(MODIFIED_AT, True, id="same second"),
+        pytest.param(MODIFIED_AT + timedelta(days=1), True, id="after"),
+        pytest.param(MODIFIED_AT - timedelta(seconds=1), False, id="before"),
+    ],
+)
+def test_is_not_modified_compares_if_modified_since_by_seconds(since, expected):
+    request = request_with(if_modified_since=http_date(since))
+
+    assert is_not_modified(request, '"a"', MODIFIED_AT) is expected
+
+
+def test_is_not_modified_ignores_if_modified_since_with_if_none_match():
+    request = request_with(
+        if_none_match='"b"', if_modified_since=http_date(MODIFIED_AT)
+    )
+
+    assert not is_not_modified(request, '"a"', MODIFIED_AT)
+
+
+@pytest.mark.parametrize("if_modified_since", ["", "yesterday"])
+def test_is_not_modified_ignores_invalid_if_modified_since(if_modified_since):
+    request = request_with(if_modified_since=if_modified_since)
+
+    assert not is_not_modified(request, '"a"', MODIFIED_AT)
+
+
+def test_conditional_response_returns_304_without_building_response():
+    def build():
+        raise AssertionError("response built")
+
+    response = conditional_response(
+        request_with(if_none_match='"a"'),
+        build,
+        '"a"',
+        "no-cache",
+        last_modified=MODIFIED_AT,
+        vary="Authorization",
+    )
+
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == '"a"'
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.headers["last-modified"] == "Thu, 01 May 2025 12:30:15 GMT"
+    assert response.headers["vary"] == "Authorization"
+
+
+def test_conditional_response_adds_headers_to_built_response():
+    response = conditional_response(
+        request_with(if_none_match='"b"'),
+        lambda: JSONResponse({"id": 1}),
+        '"a"',
+        "no-cache",
+    )
+
+    assert response.status_code == 200
+    assert response.body == b'{"id":1}'
+    assert response.headers["etag"] == '"a"'
+    assert response.headers["cache-control"] == "no-cache"
+    assert "last-modified" not in response.headers
@@ -0,0 +1,31 @@
+import pytest
+from fastapi import HTTPException
+from odmantic import ObjectId
+
+import src.api.dependencies
+from src.api.dependencies import ids_params
+
+
+def test_ids_params_parses_ids_in_order_without_duplicates():
+    first, second = ObjectId(), ObjectId()
+
+    assert ids_params(f"{second}, {first},{second},") == [second, first]
+
+
+@pytest.mark.parametrize("ids", ["", ",", "notobjectid", f"{ObjectId()},1234"])
+def test_ids_params_rejects_invalid_ids(ids):
+    with pytest.raises(HTTPException) as exception:
+        ids_params(ids)
+
+    assert exception.value.status_code == 422
+    assert "Invalid ids" in exception.value.detail
+
+
+def test_ids_params_rejects_more_ids_than_allowed(monkeypatch):
+    monkeypatch.setattr(src.api.dependencies.settings, "max_batch_ids", 2)
+
+    with pytest.raises(HTTPException) as exception:
+        ids_params(",".join(str(ObjectId()) for _ in range(3)))
+
+    assert exception.value.status_code == 422
+    assert "at most 2" in exception.value.detail
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from src.api.fields import (
+    get_projection,
+    parse_fields,
+    partial_list_model,
+    partial_model,
+    to_partial,
+)
+from src.api.responses import ModelResponse
+from src.models import IdeaPublic, IdeasPublic, UserAdmin
+from tests.data_sample import idea1
+
+
+@pytest.mark.parametrize(
+    ("fields", "expected"),
+    [
+        (None, None),
+        ("id,name", {"id", "name"}),
+        (" name , upvote_count,", {"name", "upvote_count"}),
+        ("my_vote", {"my_vote"}),
+    ],
+)
+def test_parse_fields_returns_set_of_fields(fields, expected):
+    result = parse_fields(fields, IdeaPublic)
+
+    assert result == (None if expected is None else frozenset(expected))
+
+
+@pytest.mark.parametrize(
+    ("fields", "model"),
+    [
+        ("", IdeaPublic),
+        (",", IdeaPublic),
+        ("name,score", IdeaPublic),
+        ("hashed_password", UserAdmin),
+        ("id,upvotes", UserAdmin),
+    ],
+)
+def test_parse_fields_raises_422_for_not_allowed_fields(fields, model):
+    with pytest.raises(HTTPException) as exc_info:
+        parse_fields(fields, model)
+
+    assert exc_info.value.status_code == 422
+
+
+@pytest.mark.parametrize(
+    ("model", "fields", "expected"),
+    [
+        (IdeaPublic, {"id", "name"}, {"_id": True, "name": True}),
+        (IdeaPublic, {"name", "my_vote"}, {"name": True}),
+        (UserAdmin, {"username", "is_admin"}, {"username": True, "is_admin": True}),
+    ],
+)
+def test_get_projection_maps_fields_to_stored_fields(model, fields, expected):
+    assert get_projection(model, frozenset(fields)) == expected
+
+
+def test_partial_model_has_only_requested_fields():
+    fields = frozenset({"id", "upvote_count"})
+
+    model = partial_model(IdeaPublic, fields)
+
+    assert model.model_fields.keys() == fields
+    assert model is partial_model(IdeaPublic, fields)
+
+
+def test_to_partial_builds_partial_models_from_documents():
+    fields = frozenset({"id", "name", "upvote_count"})
+    document = {"_id": idea1.id, "name": idea1.name, "upvote_count": 10}
+
+    [result] = to_partial(IdeaPublic, [document], fields)
+
+    assert result.model_dump() == {
+        "id": idea1.id,
+        "name": idea1.name,
+        "upvote_count": 10,
+    }
+
+
+def test_response_of_partial_model_returns_only_requested_fields():
+    fields = frozenset({"id", "name"})
+    page_model = partial_list_model(
+        IdeasPublic, "data", partial_model(IdeaPublic, fields)
+    )
+    page = page_model(
+        data=to_partial(IdeaPublic, [{"_id": idea1.id, "name": idea1.name}], fields),
+        count=1,
+        next_cursor=None,
+    )
+
+    response = ModelResponse(page)
+
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == {
+        "data": [{"id": str(idea1.id), "name": idea1.name}],
+        "count": 1,
+        "next_cursor": None,
+    }
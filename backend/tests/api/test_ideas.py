@@ -1,188 +1,506 @@
+import asyncio
+import json
 import random
-from contextlib import contextmanager, suppress
+from contextlib import asynccontextmanager
+from unittest import mock
 
 import pytest
+from odmantic import ObjectId
 from odmantic.session import AIOSession
 
+import src.api.ideas
 from src.api.ideas import (
+    anonymous_idea_pages,
     count_ideas,
+    export_ideas,
+    get_anonymous_ideas_page,
+    get_idea,
     get_ideas,
-    get_ideas_by_upvotes,
+    get_ideas_by_ids,
     get_user_ideas,
+    get_user_votes,
     get_voted_ideas,
+    idea_counts,
+    invalidate_idea_counts,
+    to_ideas_public,
     vote,
+    vote_increments,
 )
-from src.models import Idea, IdeaDownvote, IdeaUpvote, User
-from tests.data_sample import idea1, user1
+from src.models import (
+    Idea,
+    IdeaDownvote,
+    IdeaPublic,
+    IdeaUpvote,
+    IdeaVoters,
+    User,
+    Vote,
+)
+from tests.data_sample import idea1, idea2, user1, user_admin
 from tests.util import assert_in_order, setup_ideas, setup_votes
 
 
-def setup_downvote(user: User, idea: Idea):
-    idea.downvoted_by = idea.downvoted_by[:] + [user.id]
-    user.downvotes = user.downvotes[:] + [idea.id]
+@pytest.fixture
+def fake_collections(fake_db) -> dict[type, mock.AsyncMock]:
+    collections = {Idea: mock.AsyncMock(), Vote: mock.AsyncMock()}
+    fake_db.engine.get_collection = mock.Mock(side_effect=collections.get)
+    return collections
 
 
-def setup_upvote(user: User, idea: Idea):
-    idea.upvoted_by = idea.upvoted_by[:] + [user.id]
-    user.upvotes = user.upvotes[:] + [idea.id]
+@pytest.fixture
+def invalidate_idea_pages(monkeypatch) -> mock.Mock:
+    invalidate = mock.Mock()
+    monkeypatch.setattr(src.api.ideas, "invalidate_idea_pages", invalidate)
+    return invalidate
 
 
-def check_vote(user: User, idea: Idea, user_vote: IdeaDownvote | IdeaUpvote):
-    if isinstance(user_vote, IdeaDownvote):
-        assert idea.id in user.downvotes
-        assert user.id in idea.downvoted_by
+@pytest.mark.parametrize(
+    ("direction", "previous_direction", "expected"),
+    [
+        pytest.param(
+            "upvote",
+            None,
+            {"upvote_count": 1},
+            id="upvote, with no previous vote",
+        ),
+        pytest.param(
+            "downvote",
+            None,
+            {"downvote_count": 1},
+            id="downvote, with no previous vote",
+        ),
+        pytest.param(
+            "upvote",
+            "downvote",
+            {"upvote_count": 1, "downvote_count": -1},
+            id="upvote, with previous vote - downvote",
+        ),
+        pytest.param(
+            "downvote",
+            "upvote",
+            {"downvote_count": 1, "upvote_count": -1},
+            id="downvote, with previous vote - upvote",
+        ),
+    ],
+)
+def test_vote_increments(direction, previous_direction, expected):
+    assert vote_increments(direction, previous_direction) == expected
 
-        assert idea.id not in user.upvotes
-        assert user.id not in idea.upvoted_by
-    else:
-        assert idea.id in user.upvotes
-        assert user.id in idea.upvoted_by
 
-        assert idea.id not in user.downvotes
-        assert user.id not in idea.downvoted_by
+VOTE_CASES = [
+    pytest.param(IdeaDownvote, "downvote", id="downvote"),
+    pytest.param(IdeaUpvote, "upvote", id="upvote"),
+]
 
 
-@pytest.fixture
-def cleanup_votes():
-    def clean_up(user: User, idea: Idea):
-        idea_id = idea.id
-        user_id = user.id
-        ops = (
-            (idea.downvoted_by, user_id),
-            (idea.upvoted_by, user_id),
-            (user.downvotes, idea_id),
-            (user.upvotes, idea_id),
-        )
-        for field, id in ops:
-            with suppress(ValueError):
-                field.remove(id)
+@pytest.mark.anyio
+@pytest.mark.parametrize(("user_vote", "direction"), VOTE_CASES)
+async def test_vote_upserts_user_vote_for_idea(
+    fake_db, fake_collections, user_vote, direction
+):
+    fake_collections[Vote].find_one_and_update.return_value = {"direction": direction}
 
-    @contextmanager
-    def wrapper(user: User, idea: Idea):
-        clean_up(user, idea)
-        yield
-        clean_up(user, idea)
+    await vote(fake_db, user1, idea1, user_vote(idea_id=idea1.id))
 
-    return wrapper
+    call = fake_collections[Vote].find_one_and_update.await_args
+    vote_filter, update = call.args
+    assert vote_filter == {"user_id": user1.id, "idea_id": idea1.id}
+    assert update["$set"] == {"direction": direction}
+    assert call.kwargs["upsert"] is True
 
 
-VOTE_CASES = [
-    pytest.param(
-        user1,
-        idea1,
-        IdeaDownvote,
-        setup_downvote,
-        id="voting downvote, with previous vote - downvote",
-    ),
-    pytest.param(
-        user1,
-        idea1,
-        IdeaUpvote,
-        setup_upvote,
-        id="voting upvote, with previous vote - upvote",
-    ),
-    pytest.param(
-        user1,
-        idea1,
-        IdeaDownvote,
-        setup_upvote,
-        id="voting downvote, with previous vote - upvote",
-    ),
-    pytest.param(
-        user1,
-        idea1,
-        IdeaUpvote,
-        setup_downvote,
-        id="voting upvote, with previous vote - downvote",
-    ),
-    pytest.param(
-        user1,
-        idea1,
-        IdeaDownvote,
-        lambda user, idea: None,
-        id="voting downvote, with no previous vote",
-    ),
-    pytest.param(
-        user1,
-        idea1,
-        IdeaUpvote,
-        lambda user, idea: None,
-        id="voting upvote, with no previous vote",
-    ),
-]
+@pytest.mark.anyio
+@pytest.mark.parametrize(("user_vote", "direction"), VOTE_CASES)
+async def test_vote_does_not_update_idea_and_returns_idea_when_voted_already(
+    fake_db, fake_collections, invalidate_idea_pages, user_vote, direction
+):
+    fake_collections[Vote].find_one_and_update.return_value = {"direction": direction}
 
+    result = await vote(fake_db, user1, idea1, user_vote(idea_id=idea1.id))
 
-VOTE_CALL_TEST_CASES = (
-    pytest.param(*(params.values), should_call, id=id)
-    for params, (should_call, id) in zip(
-        VOTE_CASES,
-        [
-            (
-                False,
-                "should not call db.save when voting downvote, with previous vote - downvote",  # noqa: E501
-            ),
-            (
-                False,
-                "should not call db.save when voting upvote, with previous vote - upvote",  # noqa: E501
-            ),
-            (
-                True,
-                "should call db.save when voting downvote, with previous vote - upvote",
-            ),
-            (
-                True,
-                "should call db.save when voting upvote, with previous vote - downvote",
-            ),
-            (
-                True,
-                "should call db.save when voting downvote, with no previous vote",
-            ),
-            (
-                True,
-                "should call db.save when voting upvote, with no previous vote",
-            ),
-        ],
-        strict=True,
-    )
-)
+    assert result is idea1
+    fake_collections[Idea].find_one_and_update.assert_not_awaited()
+    fake_db.save.assert_not_awaited()
+    invalidate_idea_pages.assert_not_called()
 
 
 @pytest.mark.anyio
 @pytest.mark.parametrize(
-    ("user", "idea", "user_vote", "setup"),
-    VOTE_CASES,
+    ("user_vote", "direction", "previous_vote"),
+    [
+        pytest.param(IdeaDownvote, "downvote", None, id="downvote, no previous vote"),
+        pytest.param(IdeaUpvote, "upvote", None, id="upvote, no previous vote"),
+        pytest.param(
+            IdeaDownvote,
+            "downvote",
+            {"direction": "upvote"},
+            id="downvote, with previous vote - upvote",
+        ),
+        pytest.param(
+            IdeaUpvote,
+            "upvote",
+            {"direction": "downvote"},
+            id="upvote, with previous vote - downvote",
+        ),
+    ],
 )
-async def test_vote_modifies_user_and_idea_objects(
-    fake_db, cleanup_votes, user, idea, user_vote, setup
+async def test_vote_increments_idea_counters_and_returns_updated_idea(
+    fake_db,
+    fake_collections,
+    invalidate_idea_pages,
+    user_vote,
+    direction,
+    previous_vote,
 ):
-    with cleanup_votes(user, idea):
-        setup(user, idea)
-        new_vote = user_vote(idea_id=idea.id)
+    updated_idea = idea1.model_copy(update={"name": "updated"})
+    fake_collections[Vote].find_one_and_update.return_value = previous_vote
+    fake_collections[
+        Idea
+    ].find_one_and_update.return_value = updated_idea.model_dump_doc()
 
-        result = await vote(fake_db, user, idea, new_vote)
-        check_vote(user, result, new_vote)
+    result = await vote(fake_db, user1, idea1, user_vote(idea_id=idea1.id))
+
+    assert result == updated_idea
+    previous_direction = previous_vote["direction"] if previous_vote else None
+    fake_collections[Idea].find_one_and_update.assert_awaited_once()
+    idea_filter, update = fake_collections[Idea].find_one_and_update.await_args.args
+    assert idea_filter == {"_id": idea1.id}
+    assert update == {"$inc": vote_increments(direction, previous_direction)}
+    fake_db.save.assert_not_awaited()
+    invalidate_idea_pages.assert_called_once_with()
 
 
 @pytest.mark.anyio
-@pytest.mark.parametrize(
-    ("user", "idea", "user_vote", "setup", "should_call"),
-    VOTE_CALL_TEST_CASES,
-)
-async def test_vote_calls_db_save(
-    fake_db, cleanup_votes, user, idea, user_vote, setup, should_call
+async def test_get_user_votes_groups_voted_ideas_by_direction(fake_db):
+    upvoted, downvoted = ObjectId(), ObjectId()
+
+    async def votes():
+        yield {"idea_id": upvoted, "direction": "upvote"}
+        yield {"idea_id": downvoted, "direction": "downvote"}
+
+    collection = mock.Mock()
+    collection.find.return_value = votes()
+    fake_db.engine.get_collection = mock.Mock(return_value=collection)
+
+    result = await get_user_votes(fake_db, user1)
+
+    assert result == {"upvotes": [upvoted], "downvotes": [downvoted]}
+    assert collection.find.call_args.args[0] == {"user_id": user1.id}
+
+
+@pytest.mark.anyio
+async def test_get_voted_ideas_pages_votes_of_user_and_counts_them(fake_db):
+    collection = mock.Mock()
+    collection.aggregate.return_value.to_list = mock.AsyncMock(
+        return_value=[idea1.model_dump_doc(), idea2.model_dump_doc()]
+    )
+    collection.count_documents = mock.AsyncMock(return_value=5)
+    fake_db.engine.get_collection = mock.Mock(return_value=collection)
+
+    result = await get_voted_ideas(fake_db, user1, skip=0, limit=1, which="upvotes")
+
+    votes_query = {"user_id": user1.id, "direction": "upvote"}
+    pipeline = collection.aggregate.call_args.args[0]
+    assert pipeline[0] == {"$match": votes_query}
+    assert pipeline[-1] == {"$limit": 2}
+    collection.count_documents.assert_awaited_once_with(votes_query)
+    collection.distinct.assert_not_called()
+    assert [idea.id for idea in result.data] == [idea1.id]
+    assert result.data[0].my_vote == "upvote"
+    assert result.count == 5
+    assert result.next_cursor is not None
+
+
+async def fake_cursor(*votes: dict):
+    for document in votes:
+        yield document
+
+
+def fake_votes_collection(fake_db, *votes: dict) -> mock.Mock:
+    collection = mock.Mock()
+    collection.find.return_value = fake_cursor(*votes)
+    fake_db.engine.get_collection = mock.Mock(return_value=collection)
+    return collection
+
+
+def fake_ideas_collection(fake_db, *ideas: Idea) -> mock.Mock:
+    collection = mock.Mock()
+    collection.find.return_value.to_list = mock.AsyncMock(
+        return_value=[idea.model_dump_doc() for idea in ideas]
+    )
+    fake_db.engine.get_collection = mock.Mock(return_value=collection)
+    return collection
+
+
+@pytest.mark.anyio
+async def test_to_ideas_public_sets_my_vote_of_viewer(fake_db):
+    other_idea = idea1.model_copy(update={"id": ObjectId()})
+    collection = fake_votes_collection(
+        fake_db, {"idea_id": idea1.id, "direction": "downvote"}
+    )
+
+    result = await to_ideas_public(
+        fake_db, [idea1.model_dump_doc(), other_idea.model_dump_doc()], 2, None, user1
+    )
+
+    assert [idea.my_vote for idea in result.data] == ["downvote", None]
+    assert collection.find.call_args.args[0] == {
+        "user_id": user1.id,
+        "idea_id": {"$in": [idea1.id, other_idea.id]},
+    }
+
+
+@pytest.mark.anyio
+async def test_to_ideas_public_with_fields_returns_partial_ideas(fake_db):
+    fake_votes_collection(fake_db, {"idea_id": idea1.id, "direction": "upvote"})
+    fields = frozenset({"name", "my_vote"})
+    document = {
+        "_id": idea1.id,
+        "name": idea1.name,
+        "modified_at": idea1.modified_at,
+        "upvote_count": idea1.upvote_count,
+        "downvote_count": idea1.downvote_count,
+    }
+
+    result = await to_ideas_public(fake_db, [document], 1, None, user1, fields)
+
+    assert [idea.model_dump() for idea in result.data] == [
+        {"name": idea1.name, "my_vote": "upvote"}
+    ]
+
+
+@pytest.mark.anyio
+async def test_to_ideas_public_sets_etag_changing_with_votes(fake_db):
+    fake_db.engine.get_collection = mock.Mock()
+    document = idea1.model_dump_doc()
+
+    page = await to_ideas_public(fake_db, [document], 1, None)
+    same = await to_ideas_public(fake_db, [document], 1, None)
+    voted = await to_ideas_public(
+        fake_db, [{**document, "upvote_count": idea1.upvote_count + 1}], 1, None
+    )
+
+    assert page._etag is not None
+    assert page._etag.startswith("W/")
+    assert page._etag == same._etag
+    assert page._etag != voted._etag
+    assert "_etag" not in page.model_dump()
+
+
+@pytest.mark.anyio
+async def test_to_ideas_public_without_viewer_does_not_query_votes(fake_db):
+    fake_db.engine.get_collection = mock.Mock()
+
+    result = await to_ideas_public(fake_db, [idea1.model_dump_doc()], 1, None)
+
+    assert result.data[0] == IdeaPublic.model_validate(idea1, from_attributes=True)
+    assert result.data[0].my_vote is None
+    fake_db.engine.get_collection.assert_not_called()
+
+
+@pytest.mark.anyio
+async def test_get_idea_with_voters_returns_voters_by_direction(fake_db):
+    upvoter, downvoter = ObjectId(), ObjectId()
+    fake_votes_collection(
+        fake_db,
+        {"user_id": upvoter, "direction": "upvote"},
+        {"user_id": downvoter, "direction": "downvote"},
+    )
+
+    result = await get_idea(fake_db, idea1, voters=True)
+
+    assert isinstance(result, IdeaVoters)
+    assert result.upvoted_by == [upvoter]
+    assert result.downvoted_by == [downvoter]
+
+
+@pytest.fixture
+def enable_idea_counts_cache(monkeypatch):
+    monkeypatch.setattr(idea_counts, "ttl", 30)
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("enable_idea_counts_cache")
+@pytest.mark.parametrize("user", [None, user1])
+async def test_count_ideas_caches_count(fake_db, user):
+    fake_db.engine.count.return_value = 7
+
+    assert await count_ideas(fake_db.engine, user) == 7
+    assert await count_ideas(fake_db.engine, user) == 7
+
+    fake_db.engine.count.assert_awaited_once()
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("enable_idea_counts_cache")
+@pytest.mark.parametrize("other_user", [None, user_admin])
+async def test_invalidate_idea_counts_drops_total_and_creator_counts(
+    fake_db, other_user
 ):
-    with cleanup_votes(user, idea):
-        setup(user, idea)
-        new_vote = user_vote(idea_id=idea.id)
+    fake_db.engine.count.return_value = 7
+    await count_ideas(fake_db.engine)
+    await count_ideas(fake_db.engine, user1)
+    if other_user is not None:
+        await count_ideas(fake_db.engine, other_user)
+    fake_db.engine.count.reset_mock()
+
+    invalidate_idea_counts(user1.id)
+    await count_ideas(fake_db.engine)
+    await count_ideas(fake_db.engine, user1)
+    if other_user is not None:
+        await count_ideas(fake_db.engine, other_user)
+
+    assert fake_db.engine.count.await_count == 2
+
+
+@pytest.mark.anyio
+async def test_count_ideas_estimates_count_of_all_ideas(fake_db, monkeypatch):
+    monkeypatch.setattr(src.api.ideas.settings, "estimate_idea_count", True)
+    collection = mock.AsyncMock()
+    collection.estimated_document_count.return_value = 12
+    fake_db.engine.get_collection = mock.Mock(return_value=collection)
+    fake_db.engine.count.return_value = 7
+
+    assert await count_ideas(fake_db.engine) == 12
+    assert await count_ideas(fake_db.engine, user1) == 7
+
+
+@pytest.mark.anyio
+async def test_get_ideas_shares_query_of_concurrent_requests(fake_db):
+    collection = fake_ideas_collection(fake_db, idea1)
+    fake_db.engine.count.return_value = 1
+    fake_votes = mock.Mock()
+    fake_votes.find.side_effect = lambda *_: fake_cursor(
+        {"idea_id": idea1.id, "direction": "upvote"}
+    )
+    collections = {Idea: collection, Vote: fake_votes}
+    fake_db.engine.get_collection = mock.Mock(side_effect=collections.get)
+
+    anonymous, viewed = await asyncio.gather(
+        get_ideas(fake_db, skip=0, limit=20),
+        get_ideas(fake_db, skip=0, limit=20, viewer=user1),
+    )
+
+    collection.find.assert_called_once()
+    assert anonymous.data[0].my_vote is None
+    assert viewed.data[0].my_vote == "upvote"
+
+
+@pytest.mark.anyio
+async def test_export_ideas_yields_batch_of_ndjson_lines_per_chunk(fake_db):
+    documents = [
+        idea1.model_copy(update={"id": ObjectId()}).model_dump_doc() for _ in range(3)
+    ]
+    collection = mock.Mock()
+    collection.find.return_value.to_list = mock.AsyncMock(
+        side_effect=[documents[:2], documents[2:], []]
+    )
+    fake_db.engine.get_collection = mock.Mock(return_value=collection)
+
+    chunks = [chunk async for chunk in export_ideas(fake_db.engine, batch_size=2)]
+
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 1]
+    lines = b"".join(chunks).splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [
+        str(document["_id"]) for document in documents
+    ]
+    assert collection.find.call_args.kwargs["batch_size"] == 2
+
+
+@pytest.mark.anyio
+async def test_get_ideas_by_ids_sets_my_vote_of_viewer(fake_db):
+    missing = ObjectId()
+    ideas_collection = mock.Mock()
+    ideas_collection.find.return_value = fake_cursor(idea1.model_dump_doc())
+    votes_collection = mock.Mock()
+    votes_collection.find.return_value = fake_cursor(
+        {"idea_id": idea1.id, "direction": "downvote"}
+    )
+    collections = {Idea: ideas_collection, Vote: votes_collection}
+    fake_db.engine.get_collection = mock.Mock(side_effect=collections.get)
+
+    result = await get_ideas_by_ids(fake_db, [missing, idea1.id], user1)
+
+    assert [idea.id for idea in result.data] == [idea1.id]
+    assert result.data[0].my_vote == "downvote"
+    assert result.missing == [missing]
+
+
+@pytest.fixture
+def enable_anonymous_idea_pages_cache(monkeypatch):
+    monkeypatch.setattr(anonymous_idea_pages, "ttl", 30)
 
-        await vote(fake_db, user, idea, new_vote)
 
-        if should_call:
-            assert fake_db.save.await_count == 2
-            fake_db.save.assert_any_await(user)
-            fake_db.save.assert_any_await(idea)
-        else:
-            fake_db.save.assert_not_awaited()
+def fake_sessions(fake_db):
+    @asynccontextmanager
+    async def session():
+        yield fake_db
+
+    fake_db.engine.session = session
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("enable_anonymous_idea_pages_cache")
+async def test_get_anonymous_ideas_page_caches_serialized_page(fake_db):
+    collection = fake_ideas_collection(fake_db, idea1)
+    fake_db.engine.count.return_value = 1
+    fake_sessions(fake_db)
+
+    page = await get_anonymous_ideas_page(fake_db.engine, skip=0, limit=20)
+    again = await get_anonymous_ideas_page(
+        fake_db.engine, skip=0, limit=20, sort="unknown"
+    )
+
+    assert again == page
+    assert json.loads(page.body)["data"][0]["id"] == str(idea1.id)
+    assert page.etag.startswith("W/")
+    collection.find.assert_called_once()
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("enable_anonymous_idea_pages_cache")
+async def test_get_anonymous_ideas_page_caches_pages_by_parameters(fake_db):
+    collection = fake_ideas_collection(fake_db, idea1)
+    fake_db.engine.count.return_value = 1
+    fake_sessions(fake_db)
+
+    await get_anonymous_ideas_page(fake_db.engine, skip=0, limit=20)
+    await get_anonymous_ideas_page(fake_db.engine, skip=0, limit=20, sort="newest")
+    await get_anonymous_ideas_page(fake_db.engine, skip=20, limit=20)
+
+    assert collection.find.call_count == 3
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("sort", ["trending", "newest", None])
+async def test_get_ideas_counts_ideas_outside_of_session(fake_db, sort):
+    fake_ideas_collection(fake_db, idea1)
+    fake_db.engine.count.return_value = 7
+
+    result = await get_ideas(fake_db, skip=0, limit=20, sort=sort)
+
+    assert result.count == 7
+    fake_db.count.assert_not_awaited()
+
+
+@pytest.mark.anyio
+async def test_get_ideas_does_not_count_ideas_without_include_count(fake_db):
+    fake_ideas_collection(fake_db, idea1)
+
+    result = await get_ideas(fake_db, skip=0, limit=20, include_count=False)
+
+    assert result.count is None
+    assert [idea.id for idea in result.data] == [idea1.id]
+    fake_db.engine.count.assert_not_awaited()
+
+
+@pytest.mark.anyio
+async def test_get_user_ideas_does_not_count_ideas_without_include_count(fake_db):
+    fake_ideas_collection(fake_db, idea1)
+
+    result = await get_user_ideas(fake_db, user1, skip=0, limit=20, include_count=False)
+
+    assert result.count is None
+    fake_db.engine.count.assert_not_awaited()
 
 
 @pytest.mark.integration
@@ -197,7 +515,7 @@ async def test_count_ideas_individual_user(
 ):
     user, _, ideas_count = user_with_ideas
 
-    result = await count_ideas(real_db, user)
+    result = await count_ideas(real_db.engine, user)
 
     assert result == ideas_count
 
@@ -210,19 +528,19 @@ async def test_count_ideas_individual_user(
 async def test_count_ideas_returns_correct_number_of_ideas_after_adding_ideas(
     real_db: AIOSession, ideas_to_add
 ):
-    initial_count = await count_ideas(real_db)
+    initial_count = await count_ideas(real_db.engine)
     async with setup_ideas(real_db, user1, ideas_to_add):
-        result = await count_ideas(real_db)
+        result = await count_ideas(real_db.engine)
         assert result == initial_count + ideas_to_add
 
 
 @pytest.mark.integration
 @pytest.mark.anyio
 @pytest.mark.parametrize(
-    ("vote_for", "voted_for", "idea_attr"),
+    ("vote_for", "voted_for"),
     [
-        pytest.param("downvote", "downvotes", "downvoted_by", id="downvote"),
-        pytest.param("upvote", "upvotes", "upvoted_by", id="upvote"),
+        pytest.param("downvote", "downvotes", id="downvote"),
+        pytest.param("upvote", "upvotes", id="upvote"),
     ],
 )
 @pytest.mark.parametrize(
@@ -234,7 +552,6 @@ async def test_get_voted_ideas_returns_correct_ideas_and_correct_count_of_them(
     real_db: AIOSession,
     vote_for,
     voted_for,
-    idea_attr,
     user_with_ideas: tuple[User, list[Idea], int],
     votes_count,
 ):
@@ -250,10 +567,9 @@ async def test_get_voted_ideas_returns_correct_ideas_and_correct_count_of_them(
         assert len(result.data) == votes_count
         assert result.count == votes_count
 
-        for idea in result.data:
-            assert user.id in getattr(idea, idea_attr)
-        for idea in not_voted:
-            assert user.id not in getattr(idea, idea_attr)
+        result_ids = {idea.id for idea in result.data}
+        assert result_ids == {idea.id for idea in voted}
+        assert result_ids.isdisjoint(idea.id for idea in not_voted)
 
 
 @pytest.mark.integration
@@ -333,7 +649,7 @@ async def test_get_user_ideas_returns_ideas_sorted_by_name(
 @pytest.mark.parametrize(
     ("sort", "flip_expected_order", "func_to_comparator"),
     [
-        ("trending", True, lambda idea: len(idea.upvoted_by)),
+        ("trending", True, lambda idea: idea.upvote_count),
         ("newest", True, lambda idea: idea.created_at),
         (None, False, lambda idea: idea.name),
     ],
@@ -361,7 +677,7 @@ async def test_get_ideas_returns_sorted_ideas_by_the_sort_argument(
 @pytest.mark.parametrize(
     ("sort", "expected_ascending_order", "func_to_comparator"),
     [
-        ("trending", False, lambda idea: len(idea.upvoted_by)),
+        ("trending", False, lambda idea: idea.upvote_count),
         ("newest", False, lambda idea: idea.created_at),
         (None, True, lambda idea: idea.name),
     ],
@@ -383,19 +699,30 @@ async def test_get_ideas_returns_correct_default_order_for_sort(
 
 @pytest.mark.integration
 @pytest.mark.anyio
-@pytest.mark.parametrize(
-    "ascending",
-    [True, False],
-)
+@pytest.mark.parametrize("sort", ["trending", "newest", None])
+@pytest.mark.parametrize("ascending", [True, False])
 @pytest.mark.parametrize("ideas_with_fake_votes", [15], indirect=True)
-async def test_get_ideas_by_upvotes_returns_ideas_sorted_by_votes(
-    real_db: AIOSession, ascending, ideas_with_fake_votes: tuple[list[Idea], int]
+async def test_get_ideas_with_cursor_returns_the_same_ideas_as_with_skip(
+    real_db: AIOSession, sort, ascending, ideas_with_fake_votes: tuple[list[Idea], int]
 ):
-    _, max_votes = ideas_with_fake_votes
-    result = await get_ideas_by_upvotes(real_db, skip=0, limit=20, ascending=ascending)
-    upvotes_counts = [len(idea.upvoted_by) for idea in result]
+    _ = ideas_with_fake_votes
+    limit = 4
+    expected = await get_ideas(
+        real_db, skip=0, limit=1000, sort=sort, ascending=ascending
+    )
 
-    assert_in_order(upvotes_counts, ascending=ascending)
+    result_ids = []
+    cursor = None
+    for skip in range(0, len(expected.data), limit):
+        page = await get_ideas(
+            real_db, skip=skip, limit=limit, sort=sort, ascending=ascending
+        )
+        page_with_cursor = await get_ideas(
+            real_db, skip=0, limit=limit, sort=sort, ascending=ascending, cursor=cursor
+        )
+        assert page_with_cursor.data == page.data
+        result_ids.extend(idea.id for idea in page_with_cursor.data)
+        cursor = page_with_cursor.next_cursor
 
-    first_votes_count = 0 if ascending else max_votes
-    assert upvotes_counts[0] == first_votes_count
+    assert cursor is None
+    assert result_ids == [idea.id for idea in expected.data]
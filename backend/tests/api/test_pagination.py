@@ -0,0 +1,209 @@
+from base64 import urlsafe_b64encode
+from datetime import UTC, datetime
+from unittest import mock
+
+import pytest
+from bson import Regex
+from fastapi import HTTPException
+from odmantic import ObjectId
+from pymongo import DESCENDING
+
+from src.api.pagination import (
+    decode_cursor,
+    encode_cursor,
+    find_documents_page,
+    find_page,
+    keyset_query,
+    sort_value_type,
+    with_count,
+)
+from src.models import Idea
+from tests.data_sample import idea1, idea2
+
+
+@pytest.mark.parametrize(
+    ("field", "value"),
+    [
+        ("name", "Some idea"),
+        ("upvote_count", 15),
+        ("created_at", datetime(2025, 7, 1, 12, 30, 15, 123000, tzinfo=UTC)),
+    ],
+)
+def test_decode_cursor_returns_encoded_value_and_id(field, value):
+    id = ObjectId()
+    cursor = encode_cursor(field, value, id)
+
+    decoded_value, decoded_id = decode_cursor(cursor, field, type(value))
+
+    assert decoded_id == id
+    if isinstance(value, datetime):
+        assert decoded_value.replace(tzinfo=UTC) == value
+    else:
+        assert decoded_value == value
+
+
+def test_encode_cursor_returns_url_safe_token():
+    cursor = encode_cursor("name", "?&= /+", ObjectId())
+
+    assert cursor.replace("-", "").replace("_", "").isalnum()
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        pytest.param("", id="empty"),
+        pytest.param("not a cursor", id="not base64"),
+        pytest.param("bm90IGpzb24", id="not json"),
+        pytest.param(encode_cursor("name", "idea", "not id"), id="invalid id"),
+        pytest.param(
+            urlsafe_b64encode(b'["name", "x", {"$oid": "zz"}]').decode(),
+            id="malformed object id",
+        ),
+        pytest.param(encode_cursor("created_at", 1, ObjectId()), id="other field"),
+        pytest.param(
+            encode_cursor("name", {"$ne": None}, ObjectId()), id="query operator"
+        ),
+        pytest.param(
+            encode_cursor("name", {"$regex": "(a+)+$"}, ObjectId()), id="regex dict"
+        ),
+        pytest.param(
+            encode_cursor("name", Regex("(a+)+$"), ObjectId()), id="bson regex"
+        ),
+        pytest.param(encode_cursor("name", {"$foo": 1}, ObjectId()), id="unknown op"),
+        pytest.param(encode_cursor("name", 15, ObjectId()), id="other type"),
+        pytest.param(encode_cursor("name", None, ObjectId()), id="null"),
+    ],
+)
+def test_decode_cursor_raises_400_for_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor, "name", str)
+
+    assert exc_info.value.status_code == 400
+
+
+def test_decode_cursor_raises_400_for_bool_of_int_field():
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(
+            encode_cursor("upvote_count", True, ObjectId()), "upvote_count", int
+        )
+
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    ("field", "expected"),
+    [("name", str), ("upvote_count", int), ("created_at", datetime)],
+)
+def test_sort_value_type_returns_type_of_model_field(field, expected):
+    assert sort_value_type(Idea, field) is expected
+
+
+@pytest.mark.anyio
+async def test_find_documents_page_raises_400_for_cursor_with_query_operator(fake_db):
+    cursor = encode_cursor("name", {"$ne": None}, ObjectId())
+
+    with pytest.raises(HTTPException) as exc_info:
+        await find_documents_page(
+            fake_db, Idea, projection={}, sort_by=Idea.name, cursor=cursor
+        )
+
+    assert exc_info.value.status_code == 400
+    fake_db.engine.get_collection.assert_not_called()
+
+
+@pytest.mark.parametrize(("ascending", "operator"), [(True, "$gt"), (False, "$lt")])
+def test_keyset_query_breaks_ties_by_id(ascending, operator):
+    id = ObjectId()
+
+    result = keyset_query("name", "idea", id, ascending)
+
+    assert result == {
+        "$or": [
+            {"name": {operator: "idea"}},
+            {"name": "idea", "_id": {operator: id}},
+        ]
+    }
+
+
+@pytest.mark.anyio
+async def test_find_page_returns_cursor_pointing_to_last_returned_document(fake_db):
+    fake_db.find.return_value = [idea1, idea2]
+
+    documents, cursor = await find_page(fake_db, Idea, sort_by=Idea.name, limit=1)
+
+    assert documents == [idea1]
+    assert cursor is not None
+    assert decode_cursor(cursor, "name", str) == (idea1.name, idea1.id)
+    assert fake_db.find.call_args.kwargs["limit"] == 2
+
+
+@pytest.mark.anyio
+async def test_find_page_returns_no_cursor_for_last_page(fake_db):
+    fake_db.find.return_value = [idea1, idea2]
+
+    documents, cursor = await find_page(fake_db, Idea, sort_by=Idea.name, limit=2)
+
+    assert documents == [idea1, idea2]
+    assert cursor is None
+
+
+@pytest.mark.anyio
+async def test_find_page_with_cursor_filters_by_keyset_and_ignores_skip(fake_db):
+    fake_db.find.return_value = []
+    cursor = encode_cursor("name", idea1.name, idea1.id)
+
+    await find_page(
+        fake_db, Idea, sort_by=Idea.name, ascending=False, skip=40, cursor=cursor
+    )
+
+    args, kwargs = fake_db.find.call_args
+    assert args == (Idea, keyset_query("name", idea1.name, idea1.id, False))
+    assert kwargs["skip"] == 0
+
+
+@pytest.mark.anyio
+async def test_with_count_returns_page_and_count():
+    async def page():
+        return [idea1], None
+
+    async def count():
+        return 5
+
+    assert await with_count(page(), count()) == (([idea1], None), 5)
+
+
+@pytest.mark.anyio
+async def test_with_count_without_count_returns_none_count():
+    async def page():
+        return [idea1], None
+
+    assert await with_count(page(), None) == (([idea1], None), None)
+
+
+@pytest.mark.anyio
+async def test_find_documents_page_projects_fields_with_sort_key_and_id(fake_db):
+    documents = [
+        {"_id": idea1.id, "name": idea1.name, "upvote_count": 10},
+        {"_id": idea2.id, "name": idea2.name, "upvote_count": 10},
+    ]
+    collection = mock.Mock()
+    collection.find.return_value.to_list = mock.AsyncMock(return_value=documents)
+    fake_db.engine.get_collection = mock.Mock(return_value=collection)
+
+    result, cursor = await find_documents_page(
+        fake_db,
+        Idea,
+        Idea.creator_id == idea1.creator_id,
+        projection={"upvote_count": True},
+        sort_by=Idea.name,
+        ascending=False,
+        limit=1,
+    )
+
+    assert result == documents[:1]
+    assert cursor is not None
+    assert decode_cursor(cursor, "name", str) == (idea1.name, idea1.id)
+    args, kwargs = collection.find.call_args
+    assert args[1] == {"upvote_count": True, "name": True, "_id": True}
+    assert kwargs["sort"] == [("name", DESCENDING), ("_id", DESCENDING)]
+    assert kwargs["limit"] == 2
@@ -0,0 +1,30 @@
+import json
+
+from fastapi.encoders import jsonable_encoder
+
+from src.api.responses import ModelResponse
+from src.models import IdeaPublic, IdeasPublic
+from tests.data_sample import ideas
+
+
+def test_model_response_encodes_model_like_jsonable_encoder():
+    page = IdeasPublic(
+        data=[
+            IdeaPublic.model_validate(idea, from_attributes=True)
+            for idea in ideas.values()
+        ],
+        count=len(ideas),
+        next_cursor="cursor",
+    )
+
+    response = ModelResponse(page)
+
+    assert response.media_type == "application/json"
+    assert response.headers["content-type"] == "application/json"
+    assert json.loads(response.body) == jsonable_encoder(page)
+
+
+def test_model_response_encodes_other_content_as_json():
+    response = ModelResponse({"count": 1})
+
+    assert json.loads(response.body) == {"count": 1}
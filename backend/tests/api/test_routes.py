@@ -15,6 +15,7 @@ from tests.data_sample import idea1, user1, user_admin_disabled, user_disabled
         (f"/users/{user1.id}", "get"),
         (f"/users/{user1.id}", "patch"),
         (f"/users/{user1.id}/ideas", "get"),
+        ("/metrics", "get"),
     ],
     indirect=True,
 )
@@ -52,6 +53,7 @@ async def test_admin_only_route_returns_error_if_not_admin_or_disabled_admin(
     "built_request",
     [
         ("/ideas/", "post"),
+        ("/ideas/export", "get"),
         (f"/ideas/{idea1.id}", "patch"),
         (f"/ideas/{idea1.id}/upvote", "put"),
         (f"/ideas/{idea1.id}/downvote", "put"),
@@ -1,10 +1,33 @@
+import asyncio
+from unittest import mock
+
 import pytest
 from fastapi import HTTPException
 from odmantic import ObjectId
 
-from src.api.util import find_one_or_404
+from src.api.util import find_by_ids, find_one_flights, find_one_or_404
 from src.models import Idea, User
-from tests.data_sample import ideas, users
+from tests.data_sample import data, ideas, users
+
+
+@pytest.fixture
+def fake_collections(fake_db) -> dict[type, mock.Mock]:
+    """Collections of sample data, finding documents by `_id`."""
+
+    def collection(model):
+        async def find_one(filter):
+            for item in data.get(model, {}).values():
+                if item.id == filter["_id"]:
+                    return item.model_dump_doc()
+            return None
+
+        fake = mock.Mock()
+        fake.find_one = mock.AsyncMock(side_effect=find_one)
+        return fake
+
+    collections = {Idea: collection(Idea), User: collection(User)}
+    fake_db.engine.get_collection = mock.Mock(side_effect=collections.get)
+    return collections
 
 
 @pytest.mark.anyio
@@ -33,11 +56,22 @@ from tests.data_sample import ideas, users
         ),
     ],
 )
+@pytest.mark.usefixtures("fake_collections")
 async def test_find_one_or_404_valid_ids(fake_db, model, id, expected):
     result = await find_one_or_404(fake_db, model, id)
     assert result == expected
 
 
+@pytest.mark.anyio
+@pytest.mark.usefixtures("fake_collections")
+async def test_find_one_or_404_returns_instance_without_modified_fields(fake_db):
+    result = await find_one_or_404(fake_db, Idea, ideas["idea1"].id)
+
+    assert result.__fields_modified__ == set()
+    result.name = "Changed name"
+    assert result.__fields_modified__ == {"name"}
+
+
 @pytest.mark.anyio
 @pytest.mark.parametrize(
     ("model", "id"),
@@ -48,8 +82,46 @@ async def test_find_one_or_404_valid_ids(fake_db, model, id, expected):
         (User, ideas["idea1"].id),
     ],
 )
+@pytest.mark.usefixtures("fake_collections")
 async def test_find_one_or_404_invalid_ids(fake_db, model, id):
     with pytest.raises(HTTPException) as exception:
         await find_one_or_404(fake_db, model, id)
     assert exception.value.status_code == 404
     assert exception.value.detail == "Not found"
+
+
+@pytest.mark.anyio
+async def test_find_one_or_404_shares_query_of_concurrent_lookups(
+    fake_db, fake_collections
+):
+    idea = ideas["idea1"]
+    stats = find_one_flights.stats()
+
+    results = await asyncio.gather(
+        *(find_one_or_404(fake_db, Idea, idea.id) for _ in range(3))
+    )
+
+    assert results == [idea] * 3
+    assert len({id(result) for result in results}) == 3
+    fake_collections[Idea].find_one.assert_awaited_once_with({"_id": idea.id})
+    assert find_one_flights.stats()["coalesced"] == stats["coalesced"] + 2
+
+
+@pytest.mark.anyio
+async def test_find_by_ids_returns_documents_in_order_of_ids_and_missing_ids(fake_db):
+    idea, other_idea, missing = ideas["idea1"], ideas["idea2"], ObjectId()
+
+    async def find():
+        for document in (idea.model_dump_doc(), other_idea.model_dump_doc()):
+            yield document
+
+    collection = mock.Mock()
+    collection.find.return_value = find()
+    fake_db.engine.get_collection = mock.Mock(return_value=collection)
+    ids = [other_idea.id, missing, idea.id]
+
+    documents, missing_ids = await find_by_ids(fake_db, Idea, ids, {"name": True})
+
+    assert [document["_id"] for document in documents] == [other_idea.id, idea.id]
+    assert missing_ids == [missing]
+    collection.find.assert_called_once_with({"_id": {"$in": ids}}, {"name": True})
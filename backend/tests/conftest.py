@@ -5,13 +5,23 @@ from unittest import mock
 
 import jwt
 import pytest
-from motor.motor_asyncio import AsyncIOMotorClient
-from odmantic import AIOEngine, Model, query
+from odmantic import Model, query
 from odmantic.session import AIOSession
 
-from src.auth import JWT_ALGORITHM, config
+from src.api.ideas import anonymous_idea_pages, idea_counts
+from src.auth import (
+    JWT_ALGORITHM,
+    config,
+    rate_limiters,
+    token_versions,
+    user_cache,
+    verified_tokens,
+)
 from src.config import get_settings
+from src.database import create_engine
+from src.indexes import sync_indexes
 from src.models import Idea, User
+from src.rate_limit import Rate
 from tests.data_sample import data, ideas, users
 from tests.util import now_plus_delta
 
@@ -21,6 +31,43 @@ def anyio_backend():
     return "asyncio"
 
 
+@pytest.fixture(autouse=True)
+def disable_idea_counts_cache(monkeypatch):
+    """Tests save ideas directly to db, without invalidating cached counts."""
+    monkeypatch.setattr(idea_counts, "ttl", 0)
+    idea_counts.clear()
+
+
+@pytest.fixture(autouse=True)
+def disable_anonymous_idea_pages_cache(monkeypatch):
+    """Tests save ideas directly to db, without invalidating cached pages."""
+    monkeypatch.setattr(anonymous_idea_pages, "ttl", 0)
+    anonymous_idea_pages.clear()
+
+
+@pytest.fixture(autouse=True)
+def disable_user_cache(monkeypatch):
+    """Tests modify users directly in db, without invalidating cached users."""
+    monkeypatch.setattr(user_cache, "ttl", 0)
+    monkeypatch.setattr(token_versions, "ttl", 0)
+    user_cache.clear()
+    token_versions.clear()
+
+
+@pytest.fixture(autouse=True)
+def disable_rate_limiters(monkeypatch):
+    """Tests log in and register repeatedly, from the same client."""
+    for limiter in rate_limiters:
+        monkeypatch.setattr(limiter, "rate", Rate(0, limiter.rate.period))
+
+
+@pytest.fixture(autouse=True)
+def disable_verified_tokens_cache(monkeypatch):
+    """Keep tests independent, they reuse tokens encoded with the same secret key."""
+    monkeypatch.setattr(verified_tokens, "ttl", 0)
+    verified_tokens.clear()
+
+
 async def fake_find_one(model: Model, q: query.QueryExpression) -> Model | None:
     operations: dict[str, Callable] = {
         "$eq": operator.eq,
@@ -54,9 +101,8 @@ def fake_db() -> mock.AsyncMock:
 
 @pytest.fixture(scope="session")
 async def real_db() -> AsyncGenerator[AIOSession]:
-    client: AsyncIOMotorClient = AsyncIOMotorClient(get_settings().mongodb_test_uri)
-    engine = AIOEngine(client=client)
-    await engine.configure_database((User, Idea))
+    engine = create_engine(get_settings().mongodb_test_uri)
+    await sync_indexes(engine)
 
     async with engine.session() as session:
         user_names = [user.name for user in users.values()]
@@ -71,6 +117,7 @@ async def real_db() -> AsyncGenerator[AIOSession]:
         finally:
             await session.remove(User, query.in_(User.name, user_names))
             await session.remove(Idea, query.in_(Idea.name, idea_names))
+    engine.client.close()
 
 
 @pytest.fixture
@@ -1,5 +1,3 @@
-from odmantic import ObjectId
-
 from src.models import Idea, User
 
 bcrypt_password_hash = "$2b$12$vogVV6RUAZPAb6NVZDNGn.PD2wpIXqAHTtsORL3M13xKEp6dPxv3O"
@@ -21,8 +19,6 @@ user1 = User.model_validate(
         "name": "name of user",
         "is_active": True,
         "is_admin": False,
-        "upvotes": [ObjectId() for _ in range(5)],
-        "downvotes": [ObjectId() for _ in range(3)],
         "hashed_password": argon2_password_hash,
     }
 )
@@ -32,8 +28,6 @@ user_admin = User.model_validate(
         "name": "True Admin",
         "is_active": True,
         "is_admin": True,
-        "upvotes": [],
-        "downvotes": [],
         "hashed_password": argon2_different_password_hash,
     }
 )
@@ -43,8 +37,6 @@ user_disabled = User.model_validate(
         "name": "Disabled user",
         "is_active": False,
         "is_admin": False,
-        "upvotes": [],
-        "downvotes": [],
         "hashed_password": argon2_different_password_hash,
     }
 )
@@ -54,8 +46,6 @@ user_disabled_with_outdated_hash = User.model_validate(
         "name": "user with bcrypt hash",
         "is_active": False,
         "is_admin": False,
-        "upvotes": [],
-        "downvotes": [],
         "hashed_password": (
             "$2b$12$jbIAg8E9QU5cx2F0KisxhuhhJnqAMIAWHmKxIcjDHQbOKkVYKPYk6"
         ),
@@ -67,8 +57,6 @@ user_admin_disabled = User.model_validate(
         "name": "Disabled admin",
         "is_active": False,
         "is_admin": True,
-        "upvotes": [],
-        "downvotes": [],
         "hashed_password": argon2_different_password_hash,
     }
 )
@@ -77,8 +65,8 @@ idea1 = Idea.model_validate(
     {
         "name": "Test_Sample idea",
         "description": "Description of the sample idea, not very long.",
-        "upvoted_by": [ObjectId() for _ in range(10)],
-        "downvoted_by": [ObjectId() for _ in range(2)],
+        "upvote_count": 10,
+        "downvote_count": 2,
         "creator_id": user1.id,
     }
 )
@@ -86,8 +74,8 @@ idea2 = Idea.model_validate(
     {
         "name": "Test_Different idea",
         "description": "Different description of the different idea, a bit longer, but still not very long.",  # noqa: E501
-        "upvoted_by": [ObjectId() for _ in range(10)],
-        "downvoted_by": [ObjectId() for _ in range(2)],
+        "upvote_count": 10,
+        "downvote_count": 2,
         "creator_id": user_admin.id,
     }
 )
@@ -0,0 +1,85 @@
+from unittest import mock
+
+import pytest
+from odmantic import ObjectId
+from odmantic.session import AIOSession
+
+from src.models import Idea, Vote
+from src.scripts.backfill_vote_counts import backfill_vote_counts
+from tests.util import create_idea, setup_users
+
+
+async def fake_cursor(*documents: dict):
+    for document in documents:
+        yield document
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ("only_missing", "expected_filter"),
+    [(False, {}), (True, {"upvote_count": {"$exists": False}})],
+)
+async def test_backfill_vote_counts_sets_counters_of_ideas_from_votes(
+    only_missing, expected_filter
+):
+    voted_id, not_voted_id = ObjectId(), ObjectId()
+    ideas, votes = mock.Mock(), mock.Mock()
+    votes.aggregate.return_value = fake_cursor(
+        {"_id": voted_id, "upvote_count": 3, "downvote_count": 1}
+    )
+    ideas.find.return_value = fake_cursor({"_id": voted_id}, {"_id": not_voted_id})
+    ideas.bulk_write = mock.AsyncMock(return_value=mock.Mock(modified_count=2))
+    engine = mock.Mock()
+    engine.get_collection.side_effect = {Idea: ideas, Vote: votes}.get
+
+    modified = await backfill_vote_counts(engine, only_missing=only_missing)
+
+    assert modified == 2
+    assert ideas.find.call_args.args[0] == expected_filter
+    requests = ideas.bulk_write.call_args.args[0]
+    assert [(request._filter, request._doc) for request in requests] == [
+        ({"_id": voted_id}, {"$set": {"upvote_count": 3, "downvote_count": 1}}),
+        ({"_id": not_voted_id}, {"$set": {"upvote_count": 0, "downvote_count": 0}}),
+    ]
+
+
+@pytest.mark.anyio
+async def test_backfill_vote_counts_skips_write_without_ideas():
+    ideas, votes = mock.Mock(), mock.Mock()
+    votes.aggregate.return_value = fake_cursor()
+    ideas.find.return_value = fake_cursor()
+    ideas.bulk_write = mock.AsyncMock()
+    engine = mock.Mock()
+    engine.get_collection.side_effect = {Idea: ideas, Vote: votes}.get
+
+    assert await backfill_vote_counts(engine) == 0
+    ideas.bulk_write.assert_not_awaited()
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_backfill_vote_counts_counts_votes_of_ideas_without_counters(
+    real_db: AIOSession,
+):
+    async with setup_users(real_db, 4) as users:
+        idea = create_idea(users[0])
+        document = idea.model_dump_doc(exclude={"upvote_count", "downvote_count"})
+        await real_db.engine.get_collection(Idea).insert_one(document)
+        votes = [
+            Vote(user_id=user.id, idea_id=idea.id, direction=direction)
+            for user, direction in zip(
+                users, ["upvote", "upvote", "downvote"], strict=False
+            )
+        ]
+        try:
+            await real_db.save_all(votes)
+
+            await backfill_vote_counts(real_db.engine, only_missing=True)
+
+            backfilled = await real_db.find_one(Idea, Idea.id == idea.id)
+        finally:
+            await real_db.remove(Vote, Vote.idea_id == idea.id)
+            await real_db.engine.get_collection(Idea).delete_one({"_id": idea.id})
+
+    assert backfilled is not None
+    assert (backfilled.upvote_count, backfilled.downvote_count) == (2, 1)
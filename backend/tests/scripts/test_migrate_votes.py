@@ -0,0 +1,163 @@
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from unittest import mock
+
+import pytest
+from odmantic import Model, ObjectId
+from odmantic.session import AIOSession
+
+from src.models import Idea, User, Vote
+from src.scripts.migrate_votes import copy_embedded_votes, remove_embedded_votes
+from tests.util import setup_ideas, setup_users
+
+
+async def fake_cursor(*documents: dict):
+    for document in documents:
+        yield document
+
+
+@pytest.mark.anyio
+async def test_copy_embedded_votes_upserts_votes_of_existing_ideas_only():
+    user_id, idea_id, deleted_idea_id = ObjectId(), ObjectId(), ObjectId()
+    users, ideas, votes = mock.Mock(), mock.Mock(), mock.Mock()
+    users.find.return_value = fake_cursor(
+        {"_id": user_id, "upvotes": [idea_id, deleted_idea_id], "downvotes": []}
+    )
+    ideas.find.return_value = fake_cursor({"_id": idea_id})
+    votes.bulk_write = mock.AsyncMock(return_value=mock.Mock(upserted_count=1))
+    engine = mock.Mock()
+    engine.get_collection.side_effect = {User: users, Idea: ideas, Vote: votes}.get
+
+    created = await copy_embedded_votes(engine, User)
+
+    assert created == 1
+    [request] = votes.bulk_write.call_args.args[0]
+    assert request._filter == {"user_id": user_id, "idea_id": idea_id}
+    assert request._doc["$setOnInsert"]["direction"] == "upvote"
+    assert request._upsert is True
+
+
+@asynccontextmanager
+async def embedded_votes(
+    real_db: AIOSession, lists: list[tuple[Model, dict[str, list[ObjectId]]]]
+) -> AsyncGenerator[None]:
+    """Add vote lists to documents, like they used to be stored."""
+    try:
+        for document, fields in lists:
+            await real_db.engine.get_collection(type(document)).update_one(
+                {"_id": document.id}, {"$set": fields}
+            )
+        yield
+    finally:
+        await remove_embedded_votes(real_db.engine)
+
+
+@pytest.fixture
+async def voters_and_idea(
+    real_db: AIOSession,
+) -> AsyncGenerator[tuple[User, User, Idea]]:
+    async with (
+        setup_users(real_db, 2) as users,
+        setup_ideas(real_db, users[0], 1) as ideas,
+    ):
+        [idea] = ideas
+        try:
+            yield users[0], users[1], idea
+        finally:
+            await real_db.remove(Vote, Vote.idea_id == idea.id)
+
+
+async def migrate(real_db: AIOSession) -> int:
+    created = 0
+    for model in (User, Idea):
+        created += await copy_embedded_votes(real_db.engine, model)
+    return created
+
+
+async def find_directions(real_db: AIOSession, idea: Idea) -> dict[ObjectId, str]:
+    votes = await real_db.find(Vote, Vote.idea_id == idea.id)
+    return {vote.user_id: vote.direction for vote in votes}
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_migrate_prefers_votes_of_user_lists(
+    real_db: AIOSession, voters_and_idea: tuple[User, User, Idea]
+):
+    switched, lost, idea = voters_and_idea
+    lists = [
+        (idea, {"upvoted_by": [switched.id], "downvoted_by": []}),
+        (switched, {"upvotes": [], "downvotes": [idea.id]}),
+        (lost, {"upvotes": [idea.id], "downvotes": []}),
+    ]
+    async with embedded_votes(real_db, lists):
+        created = await migrate(real_db)
+
+    assert created == 2
+    assert await find_directions(real_db, idea) == {
+        switched.id: "downvote",
+        lost.id: "upvote",
+    }
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_migrate_keeps_existing_votes(
+    real_db: AIOSession, voters_and_idea: tuple[User, User, Idea]
+):
+    voter, _, idea = voters_and_idea
+    await real_db.save(Vote(user_id=voter.id, idea_id=idea.id, direction="upvote"))
+    lists = [
+        (idea, {"upvoted_by": [], "downvoted_by": [voter.id]}),
+        (voter, {"upvotes": [], "downvotes": [idea.id]}),
+    ]
+    async with embedded_votes(real_db, lists):
+        created = await migrate(real_db)
+
+    assert created == 0
+    assert await find_directions(real_db, idea) == {voter.id: "upvote"}
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_migrate_skips_votes_of_deleted_ideas_and_users(
+    real_db: AIOSession, voters_and_idea: tuple[User, User, Idea]
+):
+    voter, _, idea = voters_and_idea
+    deleted_idea_id, deleted_user_id = ObjectId(), ObjectId()
+    lists = [
+        (idea, {"upvoted_by": [deleted_user_id], "downvoted_by": []}),
+        (voter, {"upvotes": [deleted_idea_id], "downvotes": []}),
+    ]
+    async with embedded_votes(real_db, lists):
+        created = await migrate(real_db)
+
+    assert created == 0
+    assert await real_db.count(Vote, Vote.idea_id == deleted_idea_id) == 0
+    assert await find_directions(real_db, idea) == {}
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_remove_embedded_votes_unsets_lists(
+    real_db: AIOSession, voters_and_idea: tuple[User, User, Idea]
+):
+    voter, _, idea = voters_and_idea
+    lists = [
+        (idea, {"upvoted_by": [voter.id], "downvoted_by": []}),
+        (voter, {"upvotes": [idea.id], "downvotes": []}),
+    ]
+    async with embedded_votes(real_db, lists):
+        await remove_embedded_votes(real_db.engine)
+
+        idea_document = await real_db.engine.get_collection(Idea).find_one(
+            {"_id": idea.id}
+        )
+        user_document = await real_db.engine.get_collection(User).find_one(
+            {"_id": voter.id}
+        )
+
+    assert idea_document is not None
+    assert user_document is not None
+    assert idea_document.keys().isdisjoint({"upvoted_by", "downvoted_by"})
+    assert user_document.keys().isdisjoint({"upvotes", "downvotes"})
@@ -15,15 +15,24 @@ from src.auth import (
     create_access_token,
     create_tokens,
     decode_token,
+    deferred_writes,
     get_current_active_admin,
+    get_current_active_principal,
     get_current_active_user,
+    get_current_principal,
     get_current_user,
+    get_optional_current_user,
+    invalidate_user,
     refresh_access_token,
     set_refresh_token_cookie,
+    token_claims,
+    token_versions,
+    user_cache,
+    verified_tokens,
     verify_and_update_password,
     verify_password,
 )
-from src.models import TokenData, User
+from src.models import Principal, TokenData, User
 from tests.data_sample import (
     argon2_different_password_hash,
     argon2_password_hash,
@@ -246,8 +255,10 @@ async def test_authenticate_user(fake_db, user, plain_password, expected):
 
 @pytest.mark.anyio
 async def test_authenticate_user_updates_outdated_bcrypt_hash_when_password_is_correct(
-    fake_db,
+    fake_db, monkeypatch
 ):
+    submit = mock.Mock()
+    monkeypatch.setattr(deferred_writes, "submit", submit)
     initial_hash = user_disabled_with_outdated_hash.hashed_password
     result = await authenticate_user(
         fake_db, user_disabled_with_outdated_hash.username, "different_password"
@@ -255,7 +266,15 @@ async def test_authenticate_user_updates_outdated_bcrypt_hash_when_password_is_c
 
     assert isinstance(result, User)
     assert result.hashed_password != initial_hash
-    fake_db.save.assert_called_once_with(user_disabled_with_outdated_hash)
+    fake_db.save.assert_not_called()
+
+    collection = mock.AsyncMock()
+    fake_db.engine.get_collection = mock.Mock(return_value=collection)
+    await submit.call_args.args[0]()
+    collection.update_one.assert_awaited_once_with(
+        {"_id": user_disabled_with_outdated_hash.id, "hashed_password": initial_hash},
+        {"$set": {"hashed_password": result.hashed_password}},
+    )
 
     user_disabled_with_outdated_hash.hashed_password = initial_hash
 
@@ -326,15 +345,12 @@ def test_create_access_token_creates_token_expiring_at_specified_time(
     assert decoded["exp"] == pytest.approx(expected, abs=tolerancy_in_secs)
 
 
-@pytest.mark.parametrize(
-    "user_id",
-    [str(user1.id), str(user_admin.id), str(user_disabled_with_outdated_hash.id)],
-)
+@pytest.mark.parametrize("user", [user1, user_admin, user_disabled_with_outdated_hash])
 def test_create_tokens_returns_two_tokens_and_refresh_token_expiration(
-    patch_jwt_secret_key, user_id
+    patch_jwt_secret_key, user
 ):
     secret_key = patch_jwt_secret_key()
-    access_token, refresh_token, refresh_token_expiration_delta = create_tokens(user_id)
+    access_token, refresh_token, refresh_token_expiration_delta = create_tokens(user)
 
     decoded_access_token = jwt.decode(
         access_token, secret_key, algorithms=[JWT_ALGORITHM]
@@ -343,11 +359,13 @@ def test_create_tokens_returns_two_tokens_and_refresh_token_expiration(
         refresh_token, secret_key, algorithms=[JWT_ALGORITHM]
     )
 
-    keys_expected_in_token = ("exp", "sub")
+    keys_expected_in_token = ("exp", "sub", "is_admin", "is_active", "ver")
     for token in (decoded_access_token, decoded_refresh_token):
         for key in keys_expected_in_token:
             assert key in token
-        assert token["sub"] == user_id
+        assert token["sub"] == str(user.id)
+        assert token["is_admin"] == user.is_admin
+        assert token["is_active"] == user.is_active
 
     assert decoded_access_token["exp"] < decoded_refresh_token["exp"]
     assert isinstance(refresh_token_expiration_delta, timedelta)
@@ -450,6 +468,38 @@ async def test_get_current_user_returns_existing_user_for_valid_token(
     assert user == expected
 
 
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ("sample_user_token", "expected"),
+    ((user.id, user if user.is_active else None) for user in users.values()),
+    indirect=["sample_user_token"],
+)
+async def test_get_optional_current_user_returns_active_user_for_valid_token(
+    fake_db, patch_jwt_secret_key, sample_user_token, expected
+):
+    patch_jwt_secret_key()
+    user = await get_optional_current_user(fake_db, sample_user_token)
+    assert user == expected
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "token",
+    [
+        pytest.param(None, id="no token"),
+        pytest.param("not-a-token", id="invalid token"),
+        pytest.param(ObjectId(), id="token for not existing user"),
+    ],
+)
+async def test_get_optional_current_user_returns_none_without_valid_token(
+    fake_db, patch_jwt_secret_key, token_encoder, token
+):
+    patch_jwt_secret_key()
+    if isinstance(token, ObjectId):
+        token = token_encoder(str(token))
+    assert await get_optional_current_user(fake_db, token) is None
+
+
 @pytest.mark.anyio
 @pytest.mark.parametrize(
     ("sample_user_token", "user_id"),
@@ -521,6 +571,77 @@ async def test_refresh_token_raises_when_token_data_is_invalid(
     assert exception.value.headers == expected["headers"]
 
 
+@pytest.fixture
+def enable_user_cache(monkeypatch):
+    monkeypatch.setattr(user_cache, "ttl", 30)
+    monkeypatch.setattr(token_versions, "ttl", 30)
+
+
+@pytest.fixture
+def counting_fake_db(fake_db):
+    fake_db.find_one = mock.AsyncMock(side_effect=fake_db.find_one)
+    return fake_db
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("enable_user_cache")
+@pytest.mark.parametrize("sample_user_token", [user1.id], indirect=True)
+async def test_get_current_user_caches_user(
+    counting_fake_db, patch_jwt_secret_key, sample_user_token
+):
+    patch_jwt_secret_key()
+
+    first = await get_current_user(counting_fake_db, sample_user_token)
+    second = await get_current_user(counting_fake_db, sample_user_token)
+
+    assert first == second == user1
+    counting_fake_db.find_one.assert_awaited_once()
+    assert (user_cache.hits, user_cache.misses) >= (1, 1)
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("enable_user_cache")
+@pytest.mark.parametrize("sample_user_token", [user1.id], indirect=True)
+async def test_get_current_user_returns_copy_of_cached_user(
+    counting_fake_db, patch_jwt_secret_key, sample_user_token
+):
+    patch_jwt_secret_key()
+
+    user = await get_current_user(counting_fake_db, sample_user_token)
+    user.name = "Changed in handler"
+
+    assert (await get_current_user(counting_fake_db, sample_user_token)) == user1
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("enable_user_cache")
+@pytest.mark.parametrize("sample_user_token", [user1.id], indirect=True)
+async def test_get_current_user_returns_copy_without_modified_fields(
+    counting_fake_db, patch_jwt_secret_key, sample_user_token
+):
+    patch_jwt_secret_key()
+
+    await get_current_user(counting_fake_db, sample_user_token)
+    user = await get_current_user(counting_fake_db, sample_user_token)
+
+    assert user.__fields_modified__ == set()
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("enable_user_cache")
+@pytest.mark.parametrize("sample_user_token", [user1.id], indirect=True)
+async def test_invalidate_user_makes_get_current_user_find_user_again(
+    counting_fake_db, patch_jwt_secret_key, sample_user_token
+):
+    patch_jwt_secret_key()
+
+    await get_current_user(counting_fake_db, sample_user_token)
+    invalidate_user(user1.id)
+    await get_current_user(counting_fake_db, sample_user_token)
+
+    assert counting_fake_db.find_one.await_count == 2
+
+
 @pytest.mark.anyio
 @pytest.mark.parametrize(
     "disabled_user", [user_disabled, user_disabled_with_outdated_hash]
@@ -557,3 +678,190 @@ async def test_get_current_active_admin_returns_user_if_user_is_admin():
     user = await get_current_active_admin(user_admin)
 
     assert user == user_admin
+
+
+@pytest.mark.anyio
+async def test_get_current_active_admin_accepts_principal():
+    principal = Principal(id=user_admin.id, is_admin=True, is_active=True)
+
+    assert await get_current_active_admin(principal) == principal
+
+
+def test_decode_token_returns_claims_of_token(patch_jwt_secret_key):
+    patch_jwt_secret_key()
+    user = user_admin.model_copy(update={"token_version": 3})
+
+    token_data = decode_token(create_access_token(token_claims(user)))
+
+    assert token_data == TokenData(
+        id=user.id, is_admin=True, is_active=True, token_version=3
+    )
+
+
+def fake_users_collection(fake_db, document: dict | None) -> mock.AsyncMock:
+    collection = mock.AsyncMock()
+    collection.find_one.return_value = document
+    fake_db.engine.get_collection = mock.Mock(return_value=collection)
+    return collection
+
+
+@pytest.mark.anyio
+async def test_get_current_user_raises_for_revoked_token_version(
+    fake_db, patch_jwt_secret_key
+):
+    patch_jwt_secret_key()
+    outdated = user1.model_copy(update={"token_version": user1.token_version - 1})
+    token = create_access_token(token_claims(outdated))
+
+    with pytest.raises(HTTPException) as exception:
+        await get_current_user(fake_db, token)
+
+    assert exception.value.status_code == 401
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("user", [user1, user_admin, user_disabled])
+async def test_get_current_principal_uses_claims_without_loading_user(
+    counting_fake_db, patch_jwt_secret_key, user
+):
+    patch_jwt_secret_key()
+    collection = fake_users_collection(counting_fake_db, {"token_version": 0})
+    token = create_access_token(token_claims(user))
+
+    principal = await get_current_principal(counting_fake_db, token)
+
+    assert principal == Principal(
+        id=user.id, is_admin=user.is_admin, is_active=user.is_active
+    )
+    counting_fake_db.find_one.assert_not_awaited()
+    collection.find_one.assert_awaited_once_with(
+        {"_id": user.id}, {"_id": False, "token_version": True}
+    )
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "document",
+    [
+        pytest.param({"token_version": 1}, id="revoked"),
+        pytest.param(None, id="deleted"),
+    ],
+)
+async def test_get_current_principal_raises_when_token_version_doesnt_match(
+    fake_db, patch_jwt_secret_key, jwt_fixtures, document
+):
+    patch_jwt_secret_key()
+    fake_users_collection(fake_db, document)
+    token = create_access_token(token_claims(user1))
+
+    with pytest.raises(HTTPException) as exception:
+        await get_current_principal(fake_db, token)
+
+    assert exception.value.status_code == 401
+    assert exception.value.headers == jwt_fixtures["credential_exception"]["headers"]
+
+
+@pytest.mark.anyio
+async def test_get_current_principal_loads_user_for_token_without_claims(
+    counting_fake_db, patch_jwt_secret_key
+):
+    patch_jwt_secret_key()
+    token = create_access_token({"sub": str(user_admin.id)})
+
+    principal = await get_current_principal(counting_fake_db, token)
+
+    assert principal == Principal(id=user_admin.id, is_admin=True, is_active=True)
+    counting_fake_db.find_one.assert_awaited_once()
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures("enable_user_cache")
+async def test_get_current_principal_caches_token_version_until_user_invalidated(
+    fake_db, patch_jwt_secret_key
+):
+    patch_jwt_secret_key()
+    collection = fake_users_collection(fake_db, {"token_version": 0})
+    token = create_access_token(token_claims(user1))
+
+    await get_current_principal(fake_db, token)
+    await get_current_principal(fake_db, token)
+    collection.find_one.assert_awaited_once()
+
+    collection.find_one.return_value = {"token_version": 1}
+    invalidate_user(user1.id)
+    with pytest.raises(HTTPException):
+        await get_current_principal(fake_db, token)
+
+
+@pytest.mark.anyio
+async def test_get_current_active_principal_raises_when_not_active():
+    principal = Principal(id=user_disabled.id, is_admin=False, is_active=False)
+
+    with pytest.raises(HTTPException) as exception:
+        await get_current_active_principal(principal)
+
+    assert exception.value.status_code == 400
+    assert exception.value.detail == "Inactive user"
+
+
+@pytest.fixture
+def enable_verified_tokens_cache(monkeypatch):
+    monkeypatch.setattr(verified_tokens, "ttl", 1800)
+
+
+@pytest.fixture
+def counting_jwt_decode(monkeypatch) -> mock.Mock:
+    decode = mock.Mock(side_effect=jwt.decode)
+    monkeypatch.setattr(jwt, "decode", decode)
+    return decode
+
+
+@pytest.mark.usefixtures("enable_verified_tokens_cache")
+def test_decode_token_verifies_token_once(patch_jwt_secret_key, counting_jwt_decode):
+    patch_jwt_secret_key()
+    token = create_access_token(token_claims(user1))
+
+    first = decode_token(token)
+    second = decode_token(token)
+
+    assert (
+        first
+        == second
+        == TokenData(id=user1.id, is_admin=False, is_active=True, token_version=0)
+    )
+    counting_jwt_decode.assert_called_once()
+    assert (verified_tokens.hits, verified_tokens.misses) >= (1, 1)
+
+
+@pytest.mark.usefixtures("enable_verified_tokens_cache")
+def test_decode_token_verifies_token_again_after_secret_key_changes(
+    patch_jwt_secret_key, jwt_fixtures
+):
+    patch_jwt_secret_key()
+    token = create_access_token(token_claims(user1))
+    decode_token(token)
+
+    patch_jwt_secret_key("rotated-secret-key")
+    with pytest.raises(HTTPException) as exception:
+        decode_token(token)
+
+    expected = jwt_fixtures["credential_exception"]
+    assert exception.value.status_code == expected["status_code"]
+
+
+@pytest.mark.usefixtures("enable_verified_tokens_cache")
+def test_decode_token_doesnt_cache_token_past_its_expiration(
+    monkeypatch, patch_jwt_secret_key, counting_jwt_decode
+):
+    patch_jwt_secret_key()
+    token = create_access_token(token_claims(user1), timedelta(seconds=60))
+    now = 0.0
+    monkeypatch.setattr(verified_tokens, "timer", lambda: now)
+    decode_token(token)
+
+    now = 50.0
+    decode_token(token)
+    now = 61.0
+    decode_token(token)
+
+    assert counting_jwt_decode.call_count == 2
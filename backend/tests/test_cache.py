@@ -0,0 +1,217 @@
+import asyncio
+
+import pytest
+
+from src.cache import StaleWhileRevalidateCache, TTLCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def timer() -> FakeTimer:
+    return FakeTimer()
+
+
+def test_get_returns_value_set_before_ttl_passes(timer):
+    cache = TTLCache(maxsize=10, ttl=30, timer=timer)
+    cache.set("key", 5)
+    timer.now = 29.9
+
+    assert cache.get("key") == 5
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_get_returns_none_after_ttl_passes(timer):
+    cache = TTLCache(maxsize=10, ttl=30, timer=timer)
+    cache.set("key", 5)
+    timer.now = 30
+
+    assert cache.get("key") is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+@pytest.mark.parametrize(("ttl", "expires_at"), [(10, 10), (60, 30), (-1, 0)])
+def test_set_with_ttl_expires_entry_after_shorter_of_ttls(timer, ttl, expires_at):
+    cache = TTLCache(maxsize=10, ttl=30, timer=timer)
+    cache.set("key", 5, ttl=ttl)
+
+    timer.now = expires_at - 0.1
+    assert cache.get("key") == (5 if expires_at else None)
+    timer.now = expires_at
+    assert cache.get("key") is None
+
+
+def test_set_evicts_least_recently_used_entry(timer):
+    cache = TTLCache(maxsize=2, ttl=30, timer=timer)
+    cache.set("first", 1)
+    cache.set("second", 2)
+    cache.get("first")
+    cache.set("third", 3)
+
+    assert cache.get("second") is None
+    assert cache.get("first") == 1
+    assert cache.get("third") == 3
+
+
+@pytest.mark.parametrize(("maxsize", "ttl"), [(10, 0), (0, 30)])
+def test_set_does_not_cache_when_disabled(timer, maxsize, ttl):
+    cache = TTLCache(maxsize=maxsize, ttl=ttl, timer=timer)
+    cache.set("key", 5)
+
+    assert cache.get("key") is None
+
+
+def test_delete_removes_entry(timer):
+    cache = TTLCache(maxsize=10, ttl=30, timer=timer)
+    cache.set("key", 5)
+    cache.delete("key")
+    cache.delete("missing")
+
+    assert cache.get("key") is None
+
+
+def test_hit_rate(timer):
+    cache = TTLCache(maxsize=10, ttl=30, timer=timer)
+    assert cache.hit_rate == 0.0
+
+    cache.set("key", 5)
+    cache.get("key")
+    cache.get("key")
+    cache.get("other")
+
+    assert cache.hit_rate == pytest.approx(2 / 3)
+
+
+def test_stats(timer):
+    cache = TTLCache(maxsize=10, ttl=30, timer=timer)
+    cache.set("key", 5)
+    cache.get("key")
+    cache.get("other")
+
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+class Loader:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self) -> int:
+        self.calls += 1
+        return self.calls
+
+
+async def settle():
+    """Let background reloads run."""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def swr_cache(timer) -> StaleWhileRevalidateCache[str, int]:
+    return StaleWhileRevalidateCache(maxsize=10, ttl=10, stale_ttl=60, timer=timer)
+
+
+@pytest.mark.anyio
+async def test_swr_get_loads_value_once_while_fresh(timer, swr_cache):
+    load = Loader()
+
+    assert await swr_cache.get("key", load) == 1
+    timer.now = 9.9
+    assert await swr_cache.get("key", load) == 1
+    assert load.calls == 1
+
+
+@pytest.mark.anyio
+async def test_swr_get_returns_stale_value_and_reloads_it_in_background(
+    timer, swr_cache
+):
+    load = Loader()
+    await swr_cache.get("key", load)
+    timer.now = 10
+
+    assert await swr_cache.get("key", load) == 1
+    assert await swr_cache.get("key", load) == 1
+    await settle()
+    assert await swr_cache.get("key", load) == 2
+    assert load.calls == 2
+    assert swr_cache.stats()["stale_hits"] == 2
+
+
+@pytest.mark.anyio
+async def test_swr_get_loads_value_after_stale_ttl_passes(timer, swr_cache):
+    load = Loader()
+    await swr_cache.get("key", load)
+    timer.now = 70
+
+    assert await swr_cache.get("key", load) == 2
+
+
+@pytest.mark.anyio
+async def test_swr_invalidate_makes_entries_stale(swr_cache):
+    load = Loader()
+    await swr_cache.get("key", load)
+
+    swr_cache.invalidate()
+
+    assert await swr_cache.get("key", load) == 1
+    await settle()
+    assert await swr_cache.get("key", load) == 2
+    assert await swr_cache.get("key", load) == 2
+
+
+@pytest.mark.anyio
+async def test_swr_value_loaded_before_invalidation_stays_stale(swr_cache):
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow_load():
+        started.set()
+        await release.wait()
+        return 1
+
+    task = asyncio.create_task(swr_cache.get("key", slow_load))
+    await started.wait()
+    swr_cache.invalidate()
+    release.set()
+    await task
+
+    load = Loader()
+    assert await swr_cache.get("key", load) == 1
+    await settle()
+    assert load.calls == 1
+
+
+@pytest.mark.anyio
+async def test_swr_failed_reload_keeps_stale_value(timer, swr_cache):
+    await swr_cache.get("key", Loader())
+    timer.now = 10
+
+    async def failing_load():
+        raise RuntimeError("db down")
+
+    assert await swr_cache.get("key", failing_load) == 1
+    await settle()
+    assert await swr_cache.get("key", Loader()) == 1
+    assert swr_cache.stats()["failed_reloads"] == 1
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(("ttl", "stale_ttl"), [(0, 60), (10, 0)])
+async def test_swr_without_ttl_or_stale_ttl_loads_invalidated_value(
+    timer, ttl, stale_ttl
+):
+    cache = StaleWhileRevalidateCache(
+        maxsize=10, ttl=ttl, stale_ttl=stale_ttl, timer=timer
+    )
+    load = Loader()
+    await cache.get("key", load)
+
+    cache.invalidate()
+
+    assert await cache.get("key", load) == 2
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from src.coalesce import SingleFlight
+
+
+class SlowCall:
+    def __init__(self, result=None, error: Exception | None = None):
+        self.calls = 0
+        self.result = result
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def start(flight: SingleFlight, key, call, count: int) -> list[asyncio.Task]:
+    tasks = [asyncio.create_task(flight.run(key, call)) for _ in range(count)]
+    await asyncio.sleep(0)
+    return tasks
+
+
+@pytest.mark.anyio
+async def test_run_shares_call_among_concurrent_callers():
+    flight: SingleFlight[str, list[int]] = SingleFlight()
+    call = SlowCall(result=[1])
+
+    tasks = await start(flight, "key", call, 3)
+    call.release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert call.calls == 1
+    assert results == [[1]] * 3
+    assert flight.stats() == {
+        "in_flight": 0,
+        "calls": 1,
+        "coalesced": 2,
+        "coalesce_ratio": 2 / 3,
+    }
+
+
+@pytest.mark.anyio
+async def test_run_calls_again_after_call_completes():
+    flight: SingleFlight[str, int] = SingleFlight()
+    call = SlowCall(result=1)
+    call.release.set()
+
+    await flight.run("key", call)
+    await flight.run("key", call)
+
+    assert call.calls == 2
+    assert flight.coalesce_ratio == 0
+
+
+@pytest.mark.anyio
+async def test_run_does_not_share_calls_with_different_keys():
+    flight: SingleFlight[str, int] = SingleFlight()
+    call = SlowCall(result=1)
+
+    tasks = await start(flight, "first", call, 1) + await start(
+        flight, "second", call, 1
+    )
+    call.release.set()
+    await asyncio.gather(*tasks)
+
+    assert call.calls == 2
+
+
+@pytest.mark.anyio
+async def test_run_raises_exception_of_call_to_all_callers():
+    flight: SingleFlight[str, int] = SingleFlight()
+    call = SlowCall(error=RuntimeError("db down"))
+
+    tasks = await start(flight, "key", call, 2)
+    call.release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert [type(result) for result in results] == [RuntimeError] * 2
+
+
+@pytest.mark.anyio
+async def test_cancelling_caller_does_not_cancel_call_for_others():
+    flight: SingleFlight[str, int] = SingleFlight()
+    call = SlowCall(result=1)
+
+    first, second = await start(flight, "key", call, 2)
+    first.cancel()
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await second == 1
+    assert first.cancelled()
@@ -0,0 +1,156 @@
+import asyncio
+import gzip
+
+import pytest
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from src.compression import CompressionMiddleware, choose_encoding
+
+BODY = {"ids": ["68aef7d88bb37d8fdd7fa586"] * 100}
+
+
+@pytest.mark.parametrize(
+    ("header", "expected"),
+    [
+        ("", None),
+        ("gzip", "gzip"),
+        ("deflate, gzip;q=0.5", "gzip"),
+        ("GZIP", "gzip"),
+        ("gzip;q=0", None),
+        ("*", "br"),
+        ("*, br;q=0", "gzip"),
+        ("identity", None),
+    ],
+)
+def test_choose_encoding_returns_preferred_encoding_accepted_by_client(
+    header, expected
+):
+    assert choose_encoding(header, ["br", "gzip"]) == expected
+
+
+async def request(middleware, accept_encoding="gzip"):
+    messages = []
+    requests = [{"type": "http.request", "body": b""}]
+    disconnected = asyncio.Event()
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        await disconnected.wait()
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    await middleware(scope, receive, send)
+    headers = {name.decode(): value.decode() for name, value in messages[0]["headers"]}
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return headers, body
+
+
+@pytest.fixture
+def call_middleware():
+    async def wrapper(response, accept_encoding="gzip"):
+        return await request(CompressionMiddleware(response), accept_encoding)
+
+    return wrapper
+
+
+@pytest.mark.anyio
+async def test_middleware_compresses_body_with_accepted_encoding(call_middleware):
+    response = JSONResponse(BODY, headers={"ETag": '"tag"'})
+
+    headers, body = await call_middleware(response)
+
+    assert gzip.decompress(body) == response.body
+    assert headers["content-encoding"] == "gzip"
+    assert headers["content-length"] == str(len(body))
+    assert headers["vary"] == "Accept-Encoding"
+    assert headers["etag"] == 'W/"tag"'
+
+
+@pytest.mark.anyio
+async def test_middleware_adds_vary_without_compressing_if_not_accepted(
+    call_middleware,
+):
+    response = JSONResponse(BODY)
+
+    headers, body = await call_middleware(response, accept_encoding="")
+
+    assert body == response.body
+    assert "content-encoding" not in headers
+    assert headers["vary"] == "Accept-Encoding"
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ("response", "body"),
+    [
+        pytest.param(JSONResponse({"id": 1}), b'{"id":1}', id="smaller than min size"),
+        pytest.param(
+            PlainTextResponse(b"x" * 2000, media_type="image/png"),
+            b"x" * 2000,
+            id="not compressible type",
+        ),
+        pytest.param(
+            PlainTextResponse(b"x" * 2000, headers={"Content-Encoding": "br"}),
+            b"x" * 2000,
+            id="already encoded",
+        ),
+        pytest.param(
+            StreamingResponse(iter([b"x" * 2000, b"x"]), media_type="text/plain"),
+            b"x" * 2001,
+            id="streamed",
+        ),
+    ],
+)
+async def test_middleware_passes_through_responses_not_worth_compressing(
+    call_middleware, response, body
+):
+    headers, sent_body = await call_middleware(response)
+
+    assert sent_body == body
+    assert headers.get("content-encoding") == response.headers.get("content-encoding")
+    assert "vary" not in headers
+
+
+@pytest.mark.anyio
+async def test_middleware_reuses_compressed_body_of_public_response():
+    middleware = CompressionMiddleware(
+        JSONResponse(BODY, headers={"Cache-Control": "public, no-cache"})
+    )
+
+    _, first = await request(middleware)
+    _, second = await request(middleware)
+
+    assert first == second
+    assert middleware.stats() == {
+        "compressed": 2,
+        "bytes_in": 2 * len(JSONResponse(BODY).body),
+        "bytes_out": 2 * len(first),
+        "cache_hits": 1,
+        "cache_misses": 1,
+        "cache_size": 1,
+    }
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("cache_control", [None, "private, no-cache"])
+async def test_middleware_does_not_cache_compressed_body_of_private_response(
+    cache_control,
+):
+    headers = {"Cache-Control": cache_control} if cache_control else None
+    middleware = CompressionMiddleware(JSONResponse(BODY, headers=headers))
+
+    _, first = await request(middleware)
+    _, second = await request(middleware)
+
+    assert first == second
+    stats = middleware.stats()
+    assert stats["compressed"] == 2
+    assert (stats["cache_hits"], stats["cache_size"]) == (0, 0)
@@ -1,46 +1,71 @@
-import fastapi
+import json
+
 import pytest
 from fastapi.testclient import TestClient
-from fastapi_csrf_protect.exceptions import (
-    InvalidHeaderError,
-    MissingTokenError,
-    TokenValidationError,
-)
 
-from src.csrf import verify_csrf
+from src.csrf import CsrfMiddleware, csrf_protect
 from src.main import app
 
 
-@pytest.fixture
-def create_request():
-    defaults = {
-        "type": "http",
-        "headers": [],
-    }
+class FakeApp:
+    def __init__(self):
+        self.called = False
 
-    def wrapper(**options):
-        return fastapi.requests.Request(defaults | options)
+    async def __call__(self, scope, receive, send):
+        self.called = True
+
+
+@pytest.fixture
+def call_middleware():
+    async def wrapper(method, headers=(), exempt_bearer=False, type="http"):
+        inner = FakeApp()
+        sent = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": type,
+            "method": method,
+            "path": "/ideas/",
+            "query_string": b"",
+            "headers": list(headers),
+        }
+        await CsrfMiddleware(inner, exempt_bearer=exempt_bearer)(scope, receive, send)
+        return inner.called, sent
 
     return wrapper
 
 
+@pytest.fixture
+def failing_validation(monkeypatch):
+    async def validate_csrf(_request):
+        raise AssertionError("CSRF token should not be validated")
+
+    monkeypatch.setattr(csrf_protect, "validate_csrf", validate_csrf)
+
+
 @pytest.mark.anyio
-@pytest.mark.parametrize(
-    "method",
-    [
-        "GET",
-        "HEAD",
-        "OPTIONS",
-    ],
-)
-async def test_verify_csrf_returns_True_when_safe_method_is_used(
-    create_request, method
+@pytest.mark.usefixtures("failing_validation")
+@pytest.mark.parametrize("method", ["GET", "HEAD", "OPTIONS"])
+async def test_middleware_passes_safe_methods_without_validation(
+    call_middleware, method
 ):
-    request = create_request(method=method)
+    called, sent = await call_middleware(method)
+
+    assert called is True
+    assert sent == []
 
-    result = await verify_csrf(request) is True
 
-    assert result is True
+@pytest.mark.anyio
+@pytest.mark.usefixtures("failing_validation")
+async def test_middleware_passes_non_http_scopes(call_middleware):
+    called, _ = await call_middleware(None, type="lifespan")
+
+    assert called is True
 
 
 @pytest.mark.anyio
@@ -54,14 +79,11 @@ async def test_verify_csrf_returns_True_when_safe_method_is_used(
     ],
 )
 @pytest.mark.parametrize(
-    ("headers", "raised_exception", "error"),
+    ("headers", "error"),
     [
-        pytest.param(
-            [], MissingTokenError, "Missing Cookie", id="without cookie and token"
-        ),
+        pytest.param([], "Missing Cookie", id="without cookie and token"),
         pytest.param(
             [(b"cookie", b"fastapi-csrf-token=something;")],
-            InvalidHeaderError,
             'Expected "X-CSRF-Token"',
             id="with cookie only",
         ),
@@ -70,20 +92,24 @@ async def test_verify_csrf_returns_True_when_safe_method_is_used(
                 (b"cookie", b"fastapi-csrf-token=something;"),
                 (b"x-csrf-token", b"value"),
             ],
-            TokenValidationError,
             "CSRF token is invalid",
             id="with invalid cookie and token",
         ),
+        pytest.param(
+            [(b"authorization", b"Bearer token")],
+            "Missing Cookie",
+            id="with bearer token, not exempted",
+        ),
     ],
 )
-async def test_verify_csrf_raises_when_protected_method_is_used_and_request_misses_valid_tokens(  # noqa: E501
-    create_request, method, headers, raised_exception, error
+async def test_middleware_returns_403_when_protected_method_misses_valid_tokens(
+    call_middleware, method, headers, error
 ):
-    request = create_request(method=method, headers=headers)
+    called, sent = await call_middleware(method, headers)
 
-    with pytest.raises(raised_exception) as exception:
-        await verify_csrf(request)
-    assert error in exception.value.message
+    assert called is False
+    assert sent[0]["status"] == 403
+    assert error in json.loads(sent[1]["body"])["detail"]
 
 
 @pytest.mark.anyio
@@ -96,8 +122,8 @@ async def test_verify_csrf_raises_when_protected_method_is_used_and_request_miss
         "PATCH",
     ],
 )
-async def test_verify_csrf_should_return_true_for_protected_method_with_valid_cookie_and_token(  # noqa: E501
-    create_request, method
+async def test_middleware_passes_protected_method_with_valid_cookie_and_token(
+    call_middleware, method
 ):
     client = TestClient(app)
     response = client.get("/csrf/get-token")
@@ -106,10 +132,45 @@ async def test_verify_csrf_should_return_true_for_protected_method_with_valid_co
 
     cookie = response.headers["set-cookie"]
     token = response.json()["csrf_token"]
-    request = create_request(
-        method=method,
-        headers=[(b"cookie", cookie.encode()), (b"x-csrf-token", token.encode())],
+    called, sent = await call_middleware(
+        method, [(b"cookie", cookie.encode()), (b"x-csrf-token", token.encode())]
     )
-    result = await verify_csrf(request)
 
-    assert result is True
+    assert called is True
+    assert sent == []
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ("authorization", "expected"),
+    [(b"Bearer token", True), (b"bearer token", True), (b"Basic token", False)],
+)
+async def test_middleware_exempts_bearer_token_requests_when_enabled(
+    call_middleware, authorization, expected
+):
+    called, _ = await call_middleware(
+        "POST", [(b"authorization", authorization)], exempt_bearer=True
+    )
+
+    assert called is expected
+
+
+@pytest.mark.parametrize("path", ["/nonexistent", "/csrf/get-token"])
+def test_app_returns_403_before_routing_for_unsafe_method_without_token(path):
+    client = TestClient(app)
+
+    response = client.post(path)
+
+    assert response.status_code == 403
+
+
+@pytest.mark.parametrize(
+    ("path", "status_code"), [("/nonexistent", 404), ("/csrf/get-token", 405)]
+)
+def test_app_routes_unsafe_method_with_valid_token(path, status_code):
+    client = TestClient(app)
+    token = client.get("/csrf/get-token").json()["csrf_token"]
+
+    response = client.post(path, headers={"X-CSRF-Token": token})
+
+    assert response.status_code == status_code
@@ -0,0 +1,68 @@
+from unittest import mock
+
+import pytest
+
+import src.database
+from src.config import get_settings
+from src.database import connect, create_engine, disconnect, get_engine
+
+
+@pytest.fixture
+def fake_create_engine(monkeypatch) -> mock.Mock:
+    monkeypatch.setattr(src.database, "_engine", None)
+    create = mock.Mock(side_effect=lambda: mock.Mock())
+    monkeypatch.setattr(src.database, "create_engine", create)
+    yield create
+    disconnect()
+
+
+def test_create_engine_uses_pool_settings_from_config():
+    settings = get_settings()
+
+    engine = create_engine()
+    pool_options = engine.client.options.pool_options
+
+    assert pool_options.max_pool_size == settings.mongodb_max_pool_size
+    assert pool_options.min_pool_size == settings.mongodb_min_pool_size
+    assert pool_options.connect_timeout == settings.mongodb_connect_timeout_ms / 1000
+    engine.client.close()
+
+
+@pytest.mark.parametrize(
+    ("mongodb_uri", "expected_uri"),
+    [
+        pytest.param(None, None, id="uri from config"),
+        pytest.param("mongodb://other.host/", "mongodb://other.host/", id="passed uri"),
+    ],
+)
+def test_create_engine_connects_to_uri(mongodb_uri, expected_uri):
+    with mock.patch.object(src.database, "AsyncIOMotorClient") as client:
+        create_engine(mongodb_uri)
+
+    assert client.call_args.args == (expected_uri or get_settings().mongodb_uri,)
+
+
+def test_connect_creates_engine_once(fake_create_engine):
+    first = connect()
+    second = connect()
+
+    assert first is second
+    fake_create_engine.assert_called_once()
+
+
+@pytest.mark.anyio
+async def test_get_engine_returns_process_wide_engine(fake_create_engine):
+    engine = connect()
+
+    assert await get_engine() is engine
+    fake_create_engine.assert_called_once()
+
+
+def test_disconnect_closes_client_and_forgets_engine(fake_create_engine):
+    engine = connect()
+
+    disconnect()
+
+    engine.client.close.assert_called_once()
+    assert connect() is not engine
+    assert fake_create_engine.call_count == 2
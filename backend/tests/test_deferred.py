@@ -0,0 +1,80 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+from src.deferred import DeferredWrites
+
+
+@pytest.fixture
+def writes() -> DeferredWrites:
+    return DeferredWrites(retries=2, backoff=0, max_pending=2)
+
+
+@pytest.mark.anyio
+async def test_submit_runs_write_in_background(writes):
+    write = mock.AsyncMock()
+
+    assert writes.submit(write)
+    write.assert_not_awaited()
+    await writes.drain(timeout=1)
+
+    write.assert_awaited_once()
+    assert writes.stats() == {
+        "pending": 0,
+        "completed": 1,
+        "retried": 0,
+        "failed": 0,
+        "dropped": 0,
+    }
+
+
+@pytest.mark.anyio
+async def test_write_is_retried_after_database_error(writes):
+    write = mock.AsyncMock(side_effect=[AutoReconnect(), AutoReconnect(), None])
+
+    writes.submit(write)
+    await writes.drain(timeout=1)
+
+    assert write.await_count == 3
+    assert (writes.completed, writes.retried, writes.failed) == (1, 2, 0)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ("error", "await_count"), [(AutoReconnect(), 3), (ValueError(), 1)]
+)
+async def test_write_fails_after_retries_or_on_unexpected_error(
+    writes, error, await_count
+):
+    write = mock.AsyncMock(side_effect=error)
+
+    writes.submit(write)
+    await writes.drain(timeout=1)
+
+    assert write.await_count == await_count
+    assert (writes.completed, writes.failed) == (0, 1)
+
+
+@pytest.mark.anyio
+async def test_submit_drops_writes_over_max_pending(writes):
+    release = asyncio.Event()
+
+    assert writes.submit(release.wait)
+    assert writes.submit(release.wait)
+    assert not writes.submit(release.wait)
+    assert writes.stats()["dropped"] == 1
+
+    release.set()
+    await writes.drain(timeout=1)
+    assert writes.completed == 2
+
+
+@pytest.mark.anyio
+async def test_drain_cancels_writes_pending_after_timeout(writes):
+    writes.submit(asyncio.Event().wait)
+
+    await writes.drain(timeout=0.01)
+
+    assert writes.stats()["pending"] == 0
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from src.hashing import HashingPool
+
+
+@pytest.fixture
+def pool():
+    pool = HashingPool(max_workers=1, max_queue=1)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.anyio
+async def test_run_returns_result_computed_outside_of_event_loop_thread(pool):
+    result = await pool.run(lambda value: (value, threading.get_ident()), "value")
+
+    assert result[0] == "value"
+    assert result[1] != threading.get_ident()
+    assert pool.stats()["completed"] == 1
+
+
+@pytest.mark.anyio
+async def test_run_queues_calls_over_max_workers_and_rejects_over_max_queue(pool):
+    release = threading.Event()
+    first = asyncio.ensure_future(pool.run(release.wait))
+    await asyncio.sleep(0.01)
+    second = asyncio.ensure_future(pool.run(lambda: "queued"))
+    await asyncio.sleep(0.01)
+
+    assert pool.stats()["running"] == 1
+    assert pool.stats()["queued"] == 1
+
+    with pytest.raises(HTTPException) as exc_info:
+        await pool.run(lambda: "rejected")
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "1"}
+
+    release.set()
+    assert await first is True
+    assert await second == "queued"
+    stats = pool.stats()
+    assert (stats["running"], stats["queued"]) == (0, 0)
+    assert (stats["completed"], stats["rejected"], stats["peak_queued"]) == (2, 1, 1)
+
+
+@pytest.mark.anyio
+async def test_run_releases_worker_when_call_raises(pool):
+    def fail():
+        raise ValueError("hashing failed")
+
+    with pytest.raises(ValueError, match="hashing failed"):
+        await pool.run(fail)
+
+    assert await pool.run(lambda: "next") == "next"
@@ -0,0 +1,138 @@
+from unittest import mock
+
+import pytest
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+import src.indexes
+from src.indexes import diff_indexes, sync_indexes, verify_indexes
+from src.models import Idea, User
+
+NAME_INDEX = IndexModel("name")
+USERNAME_INDEX = IndexModel("username", unique=True)
+COMPOUND_INDEX = IndexModel([("creator_id", ASCENDING), ("name", ASCENDING)])
+
+ID_INFO = {"_id_": {"v": 2, "key": [("_id", 1)]}}
+
+
+@pytest.mark.parametrize(
+    ("expected", "existing", "missing", "changed", "extra"),
+    [
+        pytest.param(
+            [NAME_INDEX, COMPOUND_INDEX],
+            ID_INFO,
+            ["name_1", "creator_id_1_name_1"],
+            [],
+            [],
+            id="no indexes created",
+        ),
+        pytest.param(
+            [NAME_INDEX, COMPOUND_INDEX],
+            ID_INFO
+            | {
+                "name_1": {"v": 2, "key": [("name", 1)]},
+                "creator_id_1_name_1": {
+                    "v": 2,
+                    "key": [("creator_id", 1), ("name", 1)],
+                },
+            },
+            [],
+            [],
+            [],
+            id="all indexes created",
+        ),
+        pytest.param(
+            [USERNAME_INDEX],
+            ID_INFO | {"username_1": {"v": 2, "key": [("username", 1)]}},
+            [],
+            ["username_1"],
+            [],
+            id="index without unique option",
+        ),
+        pytest.param(
+            [NAME_INDEX],
+            ID_INFO
+            | {
+                "name_1": {"v": 2, "key": [("name", 1)]},
+                "other_-1": {"v": 2, "key": [("other", -1)]},
+            },
+            [],
+            [],
+            ["other_-1"],
+            id="undeclared index",
+        ),
+    ],
+)
+def test_diff_indexes(expected, existing, missing, changed, extra):
+    diff = diff_indexes("collection", expected, existing)
+
+    assert [index.document["name"] for index in diff.missing] == missing
+    assert [index.document["name"] for index in diff.changed] == changed
+    assert diff.extra == extra
+    assert diff.is_synced is not (missing or changed or extra)
+
+
+def test_diff_indexes_detects_changed_key_order():
+    index = IndexModel([("name", ASCENDING)], name="custom")
+    existing = ID_INFO | {"custom": {"v": 2, "key": [("name", DESCENDING)]}}
+
+    diff = diff_indexes("collection", [index], existing)
+
+    assert diff.changed == [index]
+
+
+def test_registry_includes_indexes_for_sorting_and_filtering():
+    user_indexes = {index.document["name"] for index in src.indexes.INDEXES[User]}
+    idea_indexes = {index.document["name"] for index in src.indexes.INDEXES[Idea]}
+
+    assert {"username_1", "name_1__id_1"} <= user_indexes
+    assert {
+        "name_1__id_1",
+        "created_at_1__id_1",
+        "upvote_count_1__id_1",
+        "creator_id_1_name_1__id_1",
+    } <= idea_indexes
+
+
+@pytest.fixture
+def fake_engine(monkeypatch):
+    monkeypatch.setattr(src.indexes, "INDEXES", {User: [USERNAME_INDEX, NAME_INDEX]})
+    collection = mock.AsyncMock()
+    collection.name = "user"
+    collection.index_information.return_value = ID_INFO | {
+        "username_1": {"v": 2, "key": [("username", 1)]},
+        "other_1": {"v": 2, "key": [("other", 1)]},
+    }
+    engine = mock.Mock()
+    engine.get_collection.return_value = collection
+    return engine
+
+
+@pytest.mark.anyio
+async def test_verify_indexes_does_not_modify_indexes(fake_engine):
+    result = await verify_indexes(fake_engine)
+
+    collection = fake_engine.get_collection.return_value
+    assert result is False
+    collection.create_indexes.assert_not_awaited()
+    collection.drop_index.assert_not_awaited()
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ("drop_extra", "expected_dropped"),
+    [
+        pytest.param(False, ["username_1"], id="keeping undeclared indexes"),
+        pytest.param(True, ["username_1", "other_1"], id="dropping undeclared"),
+    ],
+)
+async def test_sync_indexes_creates_missing_and_changed_indexes_in_background(
+    fake_engine, drop_extra, expected_dropped
+):
+    await sync_indexes(fake_engine, drop_extra=drop_extra)
+
+    collection = fake_engine.get_collection.return_value
+    dropped = [call.args[0] for call in collection.drop_index.await_args_list]
+    assert dropped == expected_dropped
+    collection.create_indexes.assert_awaited_once_with(
+        [NAME_INDEX, USERNAME_INDEX], background=True
+    )
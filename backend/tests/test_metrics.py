@@ -0,0 +1,22 @@
+import pytest
+
+import src.metrics
+from src.metrics import collect_metrics, register_metrics
+
+
+@pytest.fixture(autouse=True)
+def providers(monkeypatch):
+    monkeypatch.setattr(src.metrics, "_providers", {})
+
+
+def test_collect_metrics_returns_current_stats_of_registered_providers():
+    calls = {"count": 0}
+
+    def provider():
+        calls["count"] += 1
+        return {"calls": calls["count"]}
+
+    register_metrics("component", provider)
+
+    assert collect_metrics() == {"component": {"calls": 1}}
+    assert collect_metrics() == {"component": {"calls": 2}}
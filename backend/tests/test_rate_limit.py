@@ -0,0 +1,114 @@
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+from odmantic.session import AIOSession
+
+from src.rate_limit import MemoryBackend, MongoBackend, Rate, RateLimiter
+from tests.test_cache import FakeTimer
+
+
+@pytest.fixture
+def timer() -> FakeTimer:
+    return FakeTimer()
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("5/minute", Rate(5, 60)),
+        ("100/hour", Rate(100, 3600)),
+        ("1/second", Rate(1, 1)),
+        ("0/day", Rate(0, 86400)),
+    ],
+)
+def test_parse_rate(value, expected):
+    assert Rate.parse(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "5", "5/minutes", "five/minute", "5/"])
+def test_parse_rate_raises_for_invalid_rate(value):
+    with pytest.raises(ValueError, match="Invalid rate"):
+        Rate.parse(value)
+
+
+@pytest.mark.anyio
+async def test_memory_backend_allows_burst_of_rate_count(timer):
+    backend = MemoryBackend(maxsize=10, timer=timer)
+    rate = Rate(3, 60)
+
+    results = [await backend.acquire("key", rate) for _ in range(4)]
+
+    assert results[:3] == [0, 0, 0]
+    assert results[3] == pytest.approx(20)
+
+
+@pytest.mark.anyio
+async def test_memory_backend_refills_tokens_over_period(timer):
+    backend = MemoryBackend(maxsize=10, timer=timer)
+    rate = Rate(3, 60)
+    for _ in range(3):
+        await backend.acquire("key", rate)
+
+    timer.now = 15
+    assert await backend.acquire("key", rate) == pytest.approx(5)
+    timer.now = 20
+    assert await backend.acquire("key", rate) == 0
+
+
+@pytest.mark.anyio
+async def test_memory_backend_keeps_separate_bucket_for_each_key(timer):
+    backend = MemoryBackend(maxsize=10, timer=timer)
+    rate = Rate(1, 60)
+
+    assert await backend.acquire("first", rate) == 0
+    assert await backend.acquire("second", rate) == 0
+    assert await backend.acquire("first", rate) > 0
+
+
+@pytest.mark.anyio
+async def test_memory_backend_drops_least_recently_used_buckets(timer):
+    backend = MemoryBackend(maxsize=2, timer=timer)
+    rate = Rate(1, 60)
+    for key in ("first", "second", "third"):
+        await backend.acquire(key, rate)
+
+    assert len(backend) == 2
+    assert await backend.acquire("first", rate) == 0
+
+
+@pytest.mark.anyio
+async def test_rate_limiter_raises_429_with_retry_after(timer):
+    limiter = RateLimiter("login", Rate(1, 60), MemoryBackend(10, timer))
+    await limiter.hit("client")
+
+    with pytest.raises(HTTPException) as exception:
+        await limiter.hit("client")
+
+    assert exception.value.status_code == 429
+    assert exception.value.headers == {"Retry-After": "60"}
+    assert limiter.stats() == {"count": 1, "period": 60, "allowed": 1, "limited": 1}
+
+
+@pytest.mark.anyio
+async def test_rate_limiter_with_zero_count_allows_all_hits(timer):
+    backend = MemoryBackend(10, timer)
+    limiter = RateLimiter("login", Rate(0, 60), backend)
+
+    for _ in range(5):
+        await limiter.hit("client")
+
+    assert len(backend) == 0
+
+
+@pytest.mark.integration
+@pytest.mark.anyio
+async def test_mongo_backend_limits_hits_of_key(real_db: AIOSession):
+    backend = MongoBackend(real_db.engine)
+    rate = Rate(2, 60)
+    key = f"test:{uuid4()}"
+
+    results = [await backend.acquire(key, rate) for _ in range(3)]
+
+    assert results[:2] == [0, 0]
+    assert 0 < results[2] <= 30
@@ -8,7 +8,7 @@ from typing import Literal
 import faker
 from odmantic.session import AIOSession
 
-from src.models import Idea, User
+from src.models import Idea, User, Vote
 from tests.data_sample import argon2_password_hash
 
 fake = faker.Faker()
@@ -27,8 +27,6 @@ def create_user(**options) -> User:
         "name": fake.name(),
         "is_active": fake.boolean(),
         "is_admin": fake.boolean(),
-        "upvotes": [],
-        "downvotes": [],
         "hashed_password": argon2_password_hash,
     }
     return User.model_validate(defaults | options)
@@ -39,8 +37,6 @@ def create_idea(creator: User) -> Idea:
         {
             "name": fake.sentence(nb_words=5, variable_nb_words=True),
             "description": fake.paragraph(nb_sentences=5, variable_nb_sentences=True),
-            "upvoted_by": [],
-            "downvoted_by": [],
             "creator_id": creator.id,
         }
     )
@@ -83,11 +79,14 @@ async def setup_idea(
     ):
         [idea] = ideas
 
-        add_votes(voters, idea, max_upvotes)
+        votes = add_votes(voters, idea, max_upvotes)
 
-        await real_db.save_all(voters)
-        await real_db.save(idea)
-        yield idea
+        try:
+            await real_db.save_all(votes)
+            await real_db.save(idea)
+            yield idea
+        finally:
+            await real_db.remove(Vote, Vote.idea_id == idea.id)
 
 
 @asynccontextmanager
@@ -97,41 +96,42 @@ async def setup_votes(
     ideas: list[Idea],
     which: Literal["downvote", "upvote"],
 ):
-    user_id = user.id
+    votes = [Vote(user_id=user.id, idea_id=idea.id, direction=which) for idea in ideas]
     try:
         for idea in ideas:
-            if which == "downvote":
-                idea.downvoted_by.append(user_id)
-                user.downvotes.append(idea.id)
-            else:
-                idea.upvoted_by.append(user_id)
-                user.upvotes.append(idea.id)
-
+            count_votes(idea, which, 1)
+        await real_db.save_all(votes)
         await real_db.save_all(ideas)
-        await real_db.save(user)
-        yield
+        yield votes
     finally:
         for idea in ideas:
-            if which == "downvote":
-                idea.downvoted_by.remove(user_id)
-                user.downvotes.remove(idea.id)
-            else:
-                idea.upvoted_by.remove(user_id)
-                user.upvotes.remove(idea.id)
+            count_votes(idea, which, -1)
+        for vote in votes:
+            await real_db.delete(vote)
         await real_db.save_all(ideas)
-        await real_db.save(user)
 
 
-def add_votes(voters: list[User], idea: Idea, max_upvotes: int):
+def count_votes(idea: Idea, which: Literal["downvote", "upvote"], change: int):
+    if which == "downvote":
+        idea.downvote_count += change
+    else:
+        idea.upvote_count += change
+
+
+def add_votes(voters: list[User], idea: Idea, max_upvotes: int) -> list[Vote]:
     upvotes_count = randint(0, max_upvotes)
     upvoters = voters[:upvotes_count]
     downvoters = voters[upvotes_count:]
-    for upvoter in upvoters:
-        idea.upvoted_by.append(upvoter.id)
-        upvoter.upvotes.append(idea.id)
-    for downvoter in downvoters:
-        idea.downvoted_by.append(downvoter.id)
-        downvoter.downvotes.append(idea.id)
+    votes = [
+        Vote(user_id=upvoter.id, idea_id=idea.id, direction="upvote")
+        for upvoter in upvoters
+    ] + [
+        Vote(user_id=downvoter.id, idea_id=idea.id, direction="downvote")
+        for downvoter in downvoters
+    ]
+    idea.upvote_count = len(upvoters)
+    idea.downvote_count = len(downvoters)
+    return votes
 
 
 def now_plus_delta(delta: timedelta = timedelta()) -> datetime:
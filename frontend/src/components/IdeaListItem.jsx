@@ -4,12 +4,12 @@ import { Link } from 'react-router';
 import { UpvoteButton } from './VoteButtons';
 import { useUser } from '../hooks/useUser';
 
-export const IdeaListItem = ({ id, name, upvoted_by }) => {
+export const IdeaListItem = ({ id, name, upvote_count }) => {
   const { userState, dispatch } = useUser();
   const [idea, setIdea] = useState({
     id,
     name,
-    upvotes: upvoted_by.length,
+    upvotes: upvote_count,
   });
   const [isUpvoted, setIsUpvoted] = useState(userState?.upvotes?.has(id));
 
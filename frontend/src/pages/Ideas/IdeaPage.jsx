@@ -67,8 +67,8 @@ export const IdeaPage = () => {
         creatorId: data?.creator_id,
         name: data?.name,
         description: data?.description,
-        upvotes: data?.upvoted_by?.length,
-        downvotes: data?.downvoted_by?.length,
+        upvotes: data?.upvote_count,
+        downvotes: data?.downvote_count,
       });
       setLoading(false);
     }